@@ -5,6 +5,7 @@ from flask import Flask
 from dotenv import load_dotenv
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from .commands import meals_cli
 from .config_loader import load_settings
 from .db import bootstrap_db_settings, init_db
 from .logging_setup import configure_logging
@@ -47,4 +48,5 @@ def create_app():
     seed_database()
 
     register_routes(app)
+    app.cli.add_command(meals_cli)
     return app
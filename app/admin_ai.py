@@ -1,22 +1,58 @@
 import hashlib
 import json
+import os
 import re
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from uuid import uuid4
 from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
 
 from dotenv import dotenv_values, set_key
 
+from .db import (
+    acquire_app_lock,
+    app_lock_is_held,
+    clear_ai_menu_cache,
+    get_ai_menu_cache,
+    release_app_lock,
+    store_ai_menu_cache,
+)
+from .http_client import verstuur
 from .logging_setup import get_logger
 from .tagging import vernederlands_lijst
 
 logger = get_logger(__name__)
 
 ENV_PATH = Path(".env")
-CACHE_PATH = Path("data/openrouter_menu_cache.json")
+# Vroeger stond de cache in één JSON-bestand; dat wordt bij het wissen van de
+# cache nog opgeruimd. De cache zelf staat nu in de tabel ai_menu_cache.
+LEGACY_CACHE_PATH = Path("data/openrouter_menu_cache.json")
 CACHE_SCHEMA_VERSION = 1
 CACHE_TTL_SECONDS = 6 * 60 * 60
+# Elke combinatie van plannercontext is een eigen sleutel; meer dan dit aantal
+# bewaren heeft geen zin, de minst recent gebruikte vallen eruit.
+CACHE_MAX_ENTRIES = 64
+REQUEST_TIMEOUT_SECONDS = 90
+STREAM_ENV_VALUES = {"1", "true", "yes", "on", "ja"}
+# Een lange set in één completion is traag en wordt soms afgekapt. Opgesplitst
+# in kleinere prompts die tegelijk lopen duurt het ongeveer zo lang als één
+# korte completion. Elke deelprompt krijgt een andere eiwitbron als nadruk
+# (de eiwittags uit MEAT_TAGS, plus vegetarisch), zodat de delen samen
+# gevarieerd blijven.
+MAX_SHARDS = 6
+MAX_PARALLEL_SHARDS = 4
+SHARD_FOCUS = ("kip", "rund", "vis", "vegetarisch")
+# Eén fetch per cachesleutel tegelijk, over alle workers heen. Wie de lock niet
+# krijgt wacht op het resultaat van wie hem wel heeft. Een lock ouder dan dit
+# is van een gecrashte worker en mag overgenomen worden.
+FETCH_LOCK_STALE_SECONDS = REQUEST_TIMEOUT_SECONDS + 30
+FETCH_WAIT_POLL_SECONDS = 0.5
+# Zo lang wacht een aanvraag op de fetch van een andere worker: die mag
+# REQUEST_TIMEOUT_SECONDS duren, plus wat marge om de cache te schrijven.
+FETCH_WAIT_MAX_SECONDS = REQUEST_TIMEOUT_SECONDS + 10
 DEFAULT_OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 DEFAULT_OPENROUTER_MODEL = "openai/gpt-4o-mini"
 DEFAULT_MENU_PROMPT = (
@@ -96,10 +132,22 @@ def get_admin_ai_config():
         "model": (env_values.get("OPENROUTER_MODEL") or DEFAULT_OPENROUTER_MODEL).strip(),
         "prompt": _decode_multiline(env_values.get("MENU_AI_PROMPT") or DEFAULT_MENU_PROMPT),
         "blocked_allergies": _split_tokens(blocked_text or ",".join(DEFAULT_BLOCKED_ALLERGIES)),
+        # Streaming (SSE) levert recepten op zodra ze binnen zijn; een afgebroken
+        # antwoord houdt zo zijn volledige recepten. Enkel via .env aan te zetten.
+        "stream": (env_values.get("OPENROUTER_STREAM") or "").strip().lower() in STREAM_ENV_VALUES,
+        "shards": _clamp_shards(env_values.get("MENU_AI_SHARDS")),
         "configured": bool((env_values.get("OPENROUTER_API_KEY") or "").strip()),
     }
 
 
+def _clamp_shards(value):
+    try:
+        number = int(str(value or "").strip() or 1)
+    except ValueError:
+        return 1
+    return max(1, min(MAX_SHARDS, number))
+
+
 def _save_env_value(key, value):
     ENV_PATH.parent.mkdir(parents=True, exist_ok=True)
     if not ENV_PATH.exists():
@@ -108,8 +156,9 @@ def _save_env_value(key, value):
 
 
 def clear_admin_ai_cache():
-    if CACHE_PATH.exists():
-        CACHE_PATH.unlink()
+    clear_ai_menu_cache()
+    if LEGACY_CACHE_PATH.exists():
+        LEGACY_CACHE_PATH.unlink()
 
 
 def save_admin_ai_config(url, api_token, model, prompt, blocked_allergies):
@@ -229,45 +278,23 @@ def _cache_key(limit, config, planner_context=None):
     return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
 
 
-def _load_cache():
-    if not CACHE_PATH.exists():
-        return {}
-    try:
-        return json.loads(CACHE_PATH.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
-
-
-def _save_cache(payload):
-    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    CACHE_PATH.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
 def _load_cached_items(key, limit):
-    payload = _load_cache()
-    if int(payload.get("schema_version") or 0) != CACHE_SCHEMA_VERSION:
-        return []
-    entries = payload.get("entries") or {}
-    entry = entries.get(key) or {}
-    fetched_at = int(entry.get("fetched_at") or 0)
-    if not fetched_at or (int(time.time()) - fetched_at) >= CACHE_TTL_SECONDS:
+    try:
+        items = get_ai_menu_cache(key, CACHE_SCHEMA_VERSION, CACHE_TTL_SECONDS)
+    except sqlite3.Error:
+        logger.exception("AI-cache niet leesbaar; verder zonder cache.")
         return []
-    return list(entry.get("items") or [])[:limit]
+    return list(items or [])[:limit]
 
 
 def _store_cached_items(key, items):
-    payload = _load_cache()
-    if int(payload.get("schema_version") or 0) != CACHE_SCHEMA_VERSION:
-        payload = {"schema_version": CACHE_SCHEMA_VERSION, "entries": {}}
-    payload.setdefault("entries", {})
-    payload["entries"][key] = {
-        "fetched_at": int(time.time()),
-        "items": items,
-    }
-    _save_cache(payload)
+    try:
+        store_ai_menu_cache(key, CACHE_SCHEMA_VERSION, items, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+    except sqlite3.Error:
+        logger.exception("AI-cache niet schrijfbaar; resultaat niet bewaard.")
 
 
-def _build_prompt(config, limit, planner_context=None):
+def _build_prompt(config, limit, planner_context=None, focus=None):
     blocked = config.get("blocked_allergies") or []
     blocked_text = ", ".join(blocked) if blocked else "geen extra allergieën"
     admin_prompt = (config.get("prompt") or DEFAULT_MENU_PROMPT).strip()
@@ -303,6 +330,12 @@ def _build_prompt(config, limit, planner_context=None):
         f'"servings": {DEFAULT_SERVINGS} in elk item. De app schaalt die hoeveelheden zelf naar het '
         "gekozen aantal personen, dus reken ze niet vooraf om."
     )
+    focus_rule = ""
+    if focus:
+        focus_rule = (
+            f"\n- Deze set is een deel van een groter menu: leg de nadruk op gerechten met {focus} als "
+            "hoofdbestanddeel, maar blijf binnen de set afwisselen."
+        )
     return f"""
 Je bent een meal planner assistent.
 Genereer exact {int(limit)} bruikbare avondmaaltijden voor een meal planner app.
@@ -337,7 +370,7 @@ Belangrijke regels:
 - Wissel binnen de set bewust af in eiwitbron, groente, kookstijl, sausstijl en koolhydraatbron.
 - Zet niet te vaak hetzelfde type gerecht vlak na elkaar: varieer tussen kip, rund, vis, vegetarisch, aardappel, rijst, pasta en lichtere groentegerechten.
 - {planner_rules}
-- {servings_rule}
+- {servings_rule}{focus_rule}
 
 Extra richtlijnen van de admin:
 {admin_prompt}
@@ -392,42 +425,243 @@ def _normalize_recipe(item, index, blocked_allergies):
     }
 
 
-def _request_openrouter(config, limit, planner_context=None):
+def _request_payload(config, limit, planner_context=None, stream=False, focus=None):
     payload = {
         "model": config["model"],
         "messages": [
             {"role": "system", "content": "Je retourneert alleen JSON."},
-            {"role": "user", "content": _build_prompt(config, limit, planner_context)},
+            {"role": "user", "content": _build_prompt(config, limit, planner_context, focus)},
         ],
         "temperature": 0.3,
     }
-    data = json.dumps(payload).encode("utf-8")
-    request = Request(
-        config["url"],
-        data=data,
-        headers={
-            "Authorization": f"Bearer {config['api_token']}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
-    with urlopen(request, timeout=90) as response:
-        raw = json.loads(response.read().decode("utf-8"))
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _request_openrouter(config, limit, planner_context=None, focus=None):
+    data = json.dumps(_request_payload(config, limit, planner_context, focus=focus)).encode("utf-8")
+    headers = {
+        "Authorization": f"Bearer {config['api_token']}",
+        "Content-Type": "application/json",
+    }
+    with verstuur("POST", config["url"], headers, data, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+        raw = json.loads(response.lees().decode("utf-8"))
     return str((((raw.get("choices") or [{}])[0]).get("message") or {}).get("content") or "")
 
 
-def get_ai_menu_recipes(limit=16, force_refresh=False, planner_context=None):
+class _RecipeStreamParser:
+    """Haalt de objecten uit een JSON-array die in stukken binnenkomt.
+
+    feed() krijgt telkens een stuk tekst en geeft de objecten terug die daarin
+    afgesloten werden, als ruwe JSON-tekst. Tekst voor de array (een
+    markdown-hek bijvoorbeeld) wordt genegeerd, net als alles na de array. Een
+    half object aan het einde van een afgebroken antwoord komt er nooit uit.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        self._current = []
+
+    @property
+    def done(self):
+        """True zodra de array gesloten is."""
+        return self._done
+
+    def feed(self, text):
+        found = []
+        for char in text:
+            if self._done:
+                break
+            if self._depth >= 2:
+                self._current.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if self._depth == 0:
+                if char == "[":
+                    self._depth = 1
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if self._depth == 1:
+                    self._current = [char]
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 1:
+                    found.append("".join(self._current))
+                    self._current = []
+                elif self._depth == 0:
+                    self._done = True
+        return found
+
+
+def _iter_sse_content(response):
+    """De content-stukken uit een OpenAI-compatibele SSE-stroom."""
+    for raw_line in response:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("Onleesbaar SSE-fragment van OpenRouter overgeslagen.")
+            continue
+        delta = ((chunk.get("choices") or [{}])[0]).get("delta") or {}
+        content = delta.get("content")
+        if content:
+            yield str(content)
+
+
+def _stream_openrouter(config, limit, planner_context=None, focus=None):
+    """Zelfde vraag als _request_openrouter, maar levert elk item zodra het af is."""
+    data = json.dumps(_request_payload(config, limit, planner_context, stream=True, focus=focus)).encode("utf-8")
+    headers = {
+        "Authorization": f"Bearer {config['api_token']}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream",
+    }
+    parser = _RecipeStreamParser()
+    with verstuur("POST", config["url"], headers, data, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+        for content in _iter_sse_content(response):
+            for raw_object in parser.feed(content):
+                try:
+                    yield json.loads(raw_object)
+                except json.JSONDecodeError:
+                    logger.warning("Onleesbaar recept in de AI-stroom overgeslagen.")
+    if not parser.done:
+        raise ValueError("AI-stroom eindigde voor het einde van de array")
+
+
+def _fetch_recipes(config, limit, planner_context, focus=None):
+    """Vraagt recepten op en normaliseert ze: (recepten, aantal ruwe items, volledig).
+
+    Fouten gaan naar boven, behalve een stroom die afbreekt nadat er al
+    recepten binnen waren: die recepten blijven, met volledig=False.
+    """
+    blocked_allergies = config.get("blocked_allergies") or []
+    if not config.get("stream"):
+        raw_items = _extract_json_array(_request_openrouter(config, limit, planner_context, focus=focus))
+        if not isinstance(raw_items, list):
+            raise ValueError("geen JSON-array")
+        recipes = []
+        for index, item in enumerate(raw_items, start=1):
+            recipe = _normalize_recipe(item, index, blocked_allergies)
+            if recipe:
+                recipes.append(recipe)
+        return recipes, len(raw_items), True
+
+    recipes = []
+    raw_count = 0
+    try:
+        for item in _stream_openrouter(config, limit, planner_context, focus=focus):
+            raw_count += 1
+            recipe = _normalize_recipe(item, raw_count, blocked_allergies)
+            if recipe:
+                recipes.append(recipe)
+    except Exception as exc:
+        if not recipes:
+            raise
+        logger.warning("AI-stroom afgebroken na %d recepten (%s); die blijven behouden.", len(recipes), exc)
+        return recipes, raw_count, False
+    return recipes, raw_count, True
+
+
+def _recipe_identity(recipe):
+    """Slug en digest uit het id, zonder het volgnummer binnen een deelset."""
+    return str(recipe.get("id") or "").rsplit("_", 1)[0]
+
+
+def _fetch_sharded(config, limit, planner_context, shards):
+    """Verdeelt de vraag over deelprompts die tegelijk lopen en voegt ze samen.
+
+    Dubbels (zelfde naam, of zelfde naam- en ingrediëntendigest) tellen één
+    keer. Deelsets die falen laten de rest staan; alleen als alles faalt gaat
+    de eerste fout naar boven. Zonder alle delen is de set niet volledig.
+    """
+    per_shard = -(-int(limit) // shards)
+    foci = [SHARD_FOCUS[index % len(SHARD_FOCUS)] for index in range(shards)]
+    with ThreadPoolExecutor(max_workers=min(shards, MAX_PARALLEL_SHARDS)) as pool:
+        futures = [pool.submit(_fetch_recipes, config, per_shard, planner_context, focus) for focus in foci]
+    recipes = []
+    seen = set()
+    raw_count = 0
+    complete = True
+    errors = []
+    for focus, future in zip(foci, futures):
+        try:
+            shard_recipes, shard_raw, shard_complete = future.result()
+        except Exception as exc:
+            logger.warning("AI-deelset met nadruk op %s mislukt (%s).", focus, exc)
+            errors.append(exc)
+            complete = False
+            continue
+        raw_count += shard_raw
+        complete = complete and shard_complete
+        for recipe in shard_recipes:
+            identities = {_recipe_identity(recipe), str(recipe.get("name") or "").strip().lower()}
+            if seen & identities:
+                continue
+            seen |= identities
+            recipes.append(recipe)
+    if len(errors) == len(futures):
+        raise errors[0]
+    return recipes, raw_count, complete
+
+
+def _fetch_lock_key(key):
+    return f"ai_menu:{key}"
+
+
+def _wait_for_inflight_fetch(key, deadline):
+    """Wacht tot een andere worker klaar is met dezelfde sleutel; False als de deadline eerst komt."""
+    while time.monotonic() < deadline:
+        try:
+            if not app_lock_is_held(_fetch_lock_key(key), FETCH_LOCK_STALE_SECONDS):
+                return True
+        except sqlite3.Error:
+            return True
+        time.sleep(FETCH_WAIT_POLL_SECONDS)
+    return False
+
+
+def get_ai_menu_recipes(limit=16, force_refresh=False, planner_context=None, shards=None):
     """Haalt maaltijden bij OpenRouter, met de cache als vangnet.
 
     Faalt de call, dan vallen we terug op de cache in plaats van de gebruiker met
     een lege planner achter te laten. Dat mag alleen niet stil gebeuren: een
     verlopen API-key of een gewijzigd model is anders onzichtbaar tot iemand het
     toevallig merkt. Elke terugval logt daarom waarom ze plaatsvond.
+
+    Vragen meerdere gebruikers tegelijk hetzelfde menu, dan gaat er maar één
+    call naar OpenRouter; de anderen wachten via een lock-rij in de database op
+    dat resultaat. Bewaarde die fetch niets (een fout of een onvolledige set),
+    dan probeert een wachtende zelf de lock te nemen. Wie langer dan
+    FETCH_WAIT_MAX_SECONDS wacht, krijgt wat er in de cache zit, of haalt bij
+    een lege cache zelf op, zonder lock.
+
+    Met shards > 1 (of MENU_AI_SHARDS in .env) gaat de vraag in zoveel kleinere
+    prompts tegelijk de deur uit.
     """
     config = get_admin_ai_config()
     if not config.get("api_token"):
         logger.warning("Geen OpenRouter API-key geconfigureerd; AI-maaltijden overgeslagen.")
         return []
+    if shards is not None:
+        config["shards"] = _clamp_shards(shards)
 
     key = _cache_key(limit, config, planner_context)
     if not force_refresh:
@@ -436,9 +670,61 @@ def get_ai_menu_recipes(limit=16, force_refresh=False, planner_context=None):
             logger.debug("AI-maaltijden uit cache (%d items).", len(cached))
             return cached
 
+    owner = f"{os.getpid()}:{threading.get_ident()}:{uuid4().hex[:8]}"
+    deadline = time.monotonic() + FETCH_WAIT_MAX_SECONDS
+    while True:
+        try:
+            locked = acquire_app_lock(_fetch_lock_key(key), owner, FETCH_LOCK_STALE_SECONDS)
+        except sqlite3.Error:
+            logger.exception("Fetch-lock niet beschikbaar; OpenRouter wordt zonder coördinatie aangesproken.")
+            return _fetch_and_store(config, key, limit, planner_context)
+        if locked:
+            break
+        logger.info("Zelfde AI-menu wordt al opgehaald; wachten op dat resultaat.")
+        if not _wait_for_inflight_fetch(key, deadline):
+            cached = _load_cached_items(key, limit)
+            if cached:
+                logger.warning("AI-menu na %ss nog niet klaar; terugval op cache.", FETCH_WAIT_MAX_SECONDS)
+                return cached
+            logger.warning("AI-menu na %ss nog niet klaar en geen cache; zelf ophalen.", FETCH_WAIT_MAX_SECONDS)
+            return _fetch_and_store(config, key, limit, planner_context)
+        cached = _load_cached_items(key, limit)
+        if cached:
+            return cached
+        # De andere fetch bewaarde niets: zelf opnieuw proberen.
+    try:
+        if not force_refresh:
+            # Een andere worker kan net klaar zijn tussen onze cachemiss en de lock.
+            cached = _load_cached_items(key, limit)
+            if cached:
+                return cached
+        return _fetch_and_store(config, key, limit, planner_context)
+    finally:
+        try:
+            release_app_lock(_fetch_lock_key(key), owner)
+        except sqlite3.Error:
+            logger.exception("Fetch-lock niet vrijgegeven; hij verloopt vanzelf.")
+
+
+def get_cached_ai_menu_recipes(limit=16):
+    """Wat get_ai_menu_recipes(limit) nu uit de cache zou geven, zonder fetch of wachten.
+
+    Voor opzoekingen op id (de boodschappenlijst, de buren bij een retry) die
+    niet op OpenRouter of op een lopende fetch mogen blijven hangen.
+    """
+    config = get_admin_ai_config()
+    if not config.get("api_token"):
+        return []
+    return _load_cached_items(_cache_key(limit, config), limit)
+
+
+def _fetch_and_store(config, key, limit, planner_context):
+    shards = min(int(config.get("shards") or 1), max(1, int(limit or 1)))
     try:
-        content = _request_openrouter(config, limit, planner_context)
-        raw_items = _extract_json_array(content)
+        if shards > 1:
+            recipes, raw_count, complete = _fetch_sharded(config, limit, planner_context, shards)
+        else:
+            recipes, raw_count, complete = _fetch_recipes(config, limit, planner_context)
     except HTTPError as exc:
         # 401/402/429 zijn de gevallen die je echt wil zien: key ongeldig,
         # krediet op, of rate limit bereikt.
@@ -457,25 +743,19 @@ def get_ai_menu_recipes(limit=16, force_refresh=False, planner_context=None):
         logger.exception("Onverwachte fout bij het ophalen van AI-maaltijden; terugval op cache.")
         return _load_cached_items(key, limit)
 
-    if not isinstance(raw_items, list):
-        logger.error("OpenRouter gaf geen JSON-array terug; terugval op cache.")
-        return _load_cached_items(key, limit)
-
-    blocked_allergies = config.get("blocked_allergies") or []
-    recipes = []
-    for index, item in enumerate(raw_items, start=1):
-        recipe = _normalize_recipe(item, index, blocked_allergies)
-        if recipe:
-            recipes.append(recipe)
-
-    afgekeurd = len(raw_items) - len(recipes)
+    afgekeurd = raw_count - len(recipes)
     if afgekeurd:
-        logger.info("%d van %d AI-recepten afgekeurd bij normalisatie.", afgekeurd, len(raw_items))
+        logger.info("%d van %d AI-recepten afgekeurd bij normalisatie.", afgekeurd, raw_count)
 
     if not recipes:
-        logger.error("Alle %d AI-recepten afgekeurd; terugval op cache.", len(raw_items))
+        logger.error("Alle %d AI-recepten afgekeurd; terugval op cache.", raw_count)
         return _load_cached_items(key, limit)
 
-    _store_cached_items(key, recipes)
+    if complete:
+        _store_cached_items(key, recipes)
+    else:
+        # Een afgebroken set gaat niet in de cache: de volgende aanvraag mag
+        # opnieuw proberen in plaats van uren met een halve set te zitten.
+        logger.info("Onvolledige AI-set niet in de cache bewaard.")
     logger.info("%d AI-maaltijden opgehaald via model %s.", len(recipes), config.get("model"))
     return recipes[:limit]
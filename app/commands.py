@@ -0,0 +1,283 @@
+"""Onderhoudscommando's voor de CLI: `flask --app run meals ...`.
+
+backfill-kcal vult de kcal aan van maaltijden die er geen hebben: eigen
+maaltijden van voor de kcal-schatting bij het importeren, en bewaarde
+AI-maaltijden. Zonder waarde rekent de planner zulke gerechten als
+DOEL_KCAL_PER_PORTIE, en dat vertekent de kcal-straf.
+
+Het werk gebeurt in chunks: lezen, schatten in een procespool, wegschrijven
+in één korte transactie per chunk. Na elke chunk komt er een checkpoint in
+app_settings, zodat een afgebroken run verdergaat waar hij stopte en de
+database nooit lang op slot zit.
+
+picture-variants maakt kleinere varianten (AVIF, WebP) voor eigen foto's van
+voor app/pictures.py; nieuwe uploads krijgen ze meteen.
+
+retag rekent tags en allergenen van eigen maaltijden opnieuw uit na een
+wijziging aan de tagregels. De planner sluit op allergenen uit, dus die labels
+moeten bijblijven. Per maaltijd staat een vingerafdruk van recept en regels;
+alleen waar die niet meer klopt, wordt er gerekend.
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from . import db
+from .logging_setup import get_logger
+from .nutrition import MIN_DEKKING, bereken_kcal, tabel_uit_database
+from .pictures import LIJST_EXTENSIE, fotomap, maak_varianten
+from .tagging import REGELS_VERSIE, verrijk, verrijk_vingerafdruk
+
+logger = get_logger(__name__)
+
+meals_cli = AppGroup("meals", help="Onderhoud van de maaltijden in de database.")
+
+BACKFILL_CHECKPOINT = "backfill_kcal_checkpoint"
+BACKFILL_CHUNK = 200
+# Zoveel chunks per worker tegelijk onderweg: genoeg om de pool bezig te
+# houden, zonder de hele tabel in het geheugen te halen.
+CHUNKS_PER_WORKER = 2
+
+RETAG_CHUNK = 200
+# app_settings-sleutel met de REGELS_VERSIE van de laatste volledige retag.
+RETAG_VERSIE = "retag_rules_version"
+RETAG_LOCK = "retag"
+RETAG_LOCK_STALE_SECONDS = 15 * 60
+
+_SOORTEN = (
+    ("custom", db.custom_meals_without_kcal),
+    ("ai", db.ai_meals_without_kcal),
+)
+
+# De energietabel in een worker-proces; één keer meegegeven bij het starten.
+_tabel = None
+
+
+def _zet_tabel(tabel):
+    global _tabel
+    _tabel = tabel
+
+
+def _schat_chunk(maaltijden, tabel=None):
+    """(id, kcal, dekking) per maaltijd. Draait in een worker-proces."""
+    kcal_tabel, gram_tabel = tabel or _tabel
+    return [(maaltijd["id"], *bereken_kcal(maaltijd, kcal_tabel, gram_tabel)) for maaltijd in maaltijden]
+
+
+def _chunks(checkpoint, grootte):
+    """((soort, laatste_id), maaltijden) per chunk, vanaf het checkpoint."""
+    for soort, lees in _SOORTEN:
+        na = checkpoint.get(soort)
+        while True:
+            maaltijden, laatste = lees(na, grootte)
+            if laatste is None:
+                break
+            yield (soort, laatste), maaltijden
+            na = laatste
+
+
+def _reken_in_chunks(chunks, rekenen, verwerk, workers, initializer=None, initargs=()):
+    """Rekent (sleutel, data)-chunks uit en verwerkt de resultaten in volgorde.
+
+    workers=0 rekent in dit proces, None neemt het aantal CPU's. Resultaten
+    komen in volgorde van indienen bij verwerk(sleutel, resultaat): een
+    checkpoint mag pas voorbij een chunk als alles ervoor weggeschreven is.
+    """
+    if workers == 0:
+        if initializer:
+            initializer(*initargs)
+        for sleutel, data in chunks:
+            verwerk(sleutel, rekenen(data))
+        return
+    aantal = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=aantal, initializer=initializer, initargs=initargs) as pool:
+        onderweg = deque()
+        for sleutel, data in chunks:
+            onderweg.append((sleutel, pool.submit(rekenen, data)))
+            if len(onderweg) >= aantal * CHUNKS_PER_WORKER:
+                sleutel, taak = onderweg.popleft()
+                verwerk(sleutel, taak.result())
+        while onderweg:
+            sleutel, taak = onderweg.popleft()
+            verwerk(sleutel, taak.result())
+
+
+def backfill_kcal(chunk_grootte=BACKFILL_CHUNK, workers=None, opnieuw=False, voortgang=None):
+    """Schat en bewaart de kcal van alle maaltijden zonder; geeft statistieken per soort.
+
+    workers=0 rekent in dit proces (handig voor tests en kleine databases),
+    None neemt het aantal CPU's. opnieuw negeert het checkpoint. voortgang
+    wordt na elke chunk aangeroepen met (soort, statistieken van die soort).
+    """
+    checkpoint = {} if opnieuw else dict(db.get_app_setting(BACKFILL_CHECKPOINT, {}) or {})
+    tabel = tabel_uit_database()
+    stats = {soort: {"bekeken": 0, "ingevuld": 0, "te_weinig_dekking": 0, "dekking": 0.0} for soort, _ in _SOORTEN}
+
+    def verwerk(sleutel, resultaten):
+        soort, laatste = sleutel
+        ingevuld = [(meal_id, kcal) for meal_id, kcal, dekking in resultaten if kcal > 0 and dekking >= MIN_DEKKING]
+        db.set_meal_calories(**{soort: ingevuld})
+        checkpoint[soort] = laatste
+        db.set_app_setting(BACKFILL_CHECKPOINT, checkpoint)
+
+        telling = stats[soort]
+        vorige = telling["bekeken"]
+        telling["bekeken"] += len(resultaten)
+        telling["ingevuld"] += len(ingevuld)
+        telling["te_weinig_dekking"] += len(resultaten) - len(ingevuld)
+        if telling["bekeken"]:
+            som = telling["dekking"] * vorige + sum(dekking for _, _, dekking in resultaten)
+            telling["dekking"] = round(som / telling["bekeken"], 3)
+        if voortgang:
+            voortgang(soort, telling)
+
+    _reken_in_chunks(_chunks(dict(checkpoint), chunk_grootte), _schat_chunk, verwerk, workers, _zet_tabel, (tabel,))
+
+    # Klaar: een volgende run begint weer vooraan.
+    db.set_app_setting(BACKFILL_CHECKPOINT, {})
+    logger.info("kcal-backfill klaar: %s", stats)
+    return stats
+
+
+@meals_cli.command("backfill-kcal")
+@click.option("--chunk-size", default=BACKFILL_CHUNK, show_default=True, help="Maaltijden per chunk en per transactie.")
+@click.option("--workers", type=int, default=None, help="Aantal processen; 0 rekent in dit proces. Standaard het aantal CPU's.")
+@click.option("--restart", is_flag=True, help="Checkpoint negeren en vooraan beginnen.")
+def backfill_kcal_command(chunk_size, workers, restart):
+    """Vult ontbrekende kcal aan voor eigen en bewaarde AI-maaltijden."""
+
+    def voortgang(soort, telling):
+        click.echo(f"{soort}: {telling['bekeken']} bekeken, {telling['ingevuld']} ingevuld", err=True)
+
+    stats = backfill_kcal(max(1, chunk_size), workers, restart, voortgang)
+    for soort, telling in stats.items():
+        click.echo(
+            f"{soort}: {telling['ingevuld']}/{telling['bekeken']} ingevuld, "
+            f"{telling['te_weinig_dekking']} met te weinig dekking (< {MIN_DEKKING:.0%}), "
+            f"gemiddelde dekking {telling['dekking']:.0%}"
+        )
+
+
+def _verrijk_chunk(maaltijden):
+    """(id, tags, allergenen, vingerafdruk, oude vingerafdruk) per maaltijd. Draait in een worker-proces.
+
+    Labels die niet veranderen komen terug als None. verrijk vult aan en haalt
+    niets weg: eigen labels zijn niet te onderscheiden van afgeleide, en een
+    allergeen te veel is veiliger dan een te weinig. De oude vingerafdruk gaat
+    mee zodat set_meal_enrichment een intussen bewerkte maaltijd laat staan.
+    """
+    uit = []
+    for maaltijd in maaltijden:
+        oude_hash = maaltijd.pop("enrich_hash", "")
+        oud = (list(maaltijd.get("tags") or []), list(maaltijd.get("allergens") or []))
+        verrijk(maaltijd)
+        nieuw = (maaltijd["tags"], maaltijd["allergens"])
+        labels = nieuw if nieuw != oud else (None, None)
+        uit.append((maaltijd["id"], *labels, verrijk_vingerafdruk(maaltijd), oude_hash))
+    return uit
+
+
+def _verouderde_chunks(grootte, stats):
+    """(None, maaltijden) per chunk, enkel met maaltijden waarvan de vingerafdruk niet klopt."""
+    na = 0
+    while True:
+        maaltijden, laatste = db.custom_meals_for_enrichment(na, grootte)
+        if laatste is None:
+            break
+        stats["bekeken"] += len(maaltijden)
+        verouderd = [m for m in maaltijden if m["enrich_hash"] != verrijk_vingerafdruk(m)]
+        if verouderd:
+            yield None, verouderd
+        na = laatste
+
+
+def herverrijk(chunk_grootte=RETAG_CHUNK, workers=None):
+    """Rekent tags en allergenen opnieuw uit waar recept of regels wijzigden.
+
+    Geeft {"bekeken", "verouderd", "gewijzigd", "overgeslagen"} terug; overgeslagen
+    zijn maaltijden die tijdens het rekenen bewerkt werden. Geen checkpoint
+    nodig: wat al klaar is heeft een kloppende vingerafdruk en wordt overgeslagen.
+    """
+    stats = {"bekeken": 0, "verouderd": 0, "gewijzigd": 0, "overgeslagen": 0}
+
+    def verwerk(_, resultaten):
+        bijgewerkt = db.set_meal_enrichment(resultaten)
+        stats["verouderd"] += len(resultaten)
+        stats["gewijzigd"] += sum(1 for _, tags, *_ in resultaten if tags is not None)
+        stats["overgeslagen"] += len(resultaten) - bijgewerkt
+
+    _reken_in_chunks(_verouderde_chunks(chunk_grootte, stats), _verrijk_chunk, verwerk, workers)
+    logger.info("Retag klaar: %s", stats)
+    return stats
+
+
+def _herverrijk_met_lock():
+    owner = f"{os.getpid()}:{threading.get_ident()}"
+    try:
+        if not db.acquire_app_lock(RETAG_LOCK, owner, RETAG_LOCK_STALE_SECONDS):
+            return
+        try:
+            # In de achtergrond van een webworker geen procespool: forken vanuit
+            # een proces met threads is vragen om problemen.
+            herverrijk(workers=0)
+            db.set_app_setting(RETAG_VERSIE, {"version": REGELS_VERSIE})
+        finally:
+            db.release_app_lock(RETAG_LOCK, owner)
+    except Exception:
+        logger.exception("Retag op de achtergrond mislukt; volgende start opnieuw.")
+
+
+def herverrijk_als_regels_wijzigden():
+    """Start een retag op de achtergrond als de tagregels wijzigden sinds de vorige.
+
+    Bij het opstarten van een webworker (gunicorn.conf.py), niet in create_app:
+    die loopt ook voor de CLI en de tests. Ongewijzigde regels kosten één
+    query; bij meerdere workers doet de lock dat er maar één rekent.
+    """
+    if (db.get_app_setting(RETAG_VERSIE, {}) or {}).get("version") == REGELS_VERSIE:
+        return None
+    thread = threading.Thread(target=_herverrijk_met_lock, name="retag", daemon=True)
+    thread.start()
+    return thread
+
+
+@meals_cli.command("retag")
+@click.option("--chunk-size", default=RETAG_CHUNK, show_default=True, help="Maaltijden per chunk en per transactie.")
+@click.option("--workers", type=int, default=None, help="Aantal processen; 0 rekent in dit proces. Standaard het aantal CPU's.")
+def retag_command(chunk_size, workers):
+    """Rekent tags en allergenen opnieuw uit voor eigen maaltijden die verouderd zijn."""
+    # Zelfde lock als de retag op de achtergrond: niet twee keer hetzelfde werk.
+    owner = f"cli:{os.getpid()}"
+    if not db.acquire_app_lock(RETAG_LOCK, owner, RETAG_LOCK_STALE_SECONDS):
+        raise click.ClickException("Er loopt al een retag; probeer het straks opnieuw.")
+    try:
+        stats = herverrijk(max(1, chunk_size), workers)
+        db.set_app_setting(RETAG_VERSIE, {"version": REGELS_VERSIE})
+    finally:
+        db.release_app_lock(RETAG_LOCK, owner)
+    click.echo(
+        f"{stats['verouderd']}/{stats['bekeken']} verouderd, {stats['gewijzigd']} met nieuwe labels, "
+        f"{stats['overgeslagen']} overgeslagen want intussen bewerkt"
+    )
+
+
+@meals_cli.command("picture-variants")
+def picture_variants_command():
+    """Maakt varianten voor eigen foto's die er nog geen hebben."""
+    map_ = fotomap(current_app)
+    fotos = sorted(map_.glob("custom_*.*")) if map_.is_dir() else []
+    # Varianten zelf (die eindigen op -<breedte>) en hun lijsten overslaan.
+    fotos = [
+        pad for pad in fotos
+        if not pad.stem.rsplit("-", 1)[-1].isdigit() and pad.suffix != LIJST_EXTENSIE
+    ]
+    gemaakt = 0
+    for pad in fotos:
+        gemaakt += maak_varianten(pad)
+    click.echo(f"{len(fotos)} foto's bekeken, {gemaakt} varianten gemaakt")
@@ -2,12 +2,15 @@ import sqlite3
 from pathlib import Path
 import json
 import re
+import time
 from uuid import uuid4
 from werkzeug.security import check_password_hash, generate_password_hash
 
 
 DB_PATH = Path("data/app.db")
 DEFAULT_GROUP_SLUG = "default-family"
+# Sleutel in cache_versions voor de energietabel (zie nutrition.tabel_uit_database).
+INGREDIENT_ENERGY_CACHE = "ingredient_energy"
 # Porties per maaltijd. Een recept legt zijn hoeveelheden vast voor dit aantal
 # personen; de planner schaalt daarvandaan naar het gekozen aantal.
 DEFAULT_SERVINGS = 2
@@ -245,6 +248,111 @@ def init_db():
         """
     )
 
+    # Cache van AI-maaltijden per cachesleutel (model, prompt, plannercontext).
+    # Eén rij per sleutel, zodat een lookup één rij leest in plaats van het hele
+    # cachebestand, en zodat gelijktijdige workers elkaars schrijfwerk niet
+    # overschrijven.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_menu_cache (
+            cache_key TEXT PRIMARY KEY,
+            schema_version INTEGER NOT NULL DEFAULT 1,
+            items_json TEXT NOT NULL DEFAULT '[]',
+            fetched_at INTEGER NOT NULL,
+            last_used_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ai_menu_cache_used ON ai_menu_cache (last_used_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ai_menu_cache_fetched ON ai_menu_cache (fetched_at)")
+
+    # Locks die over gunicorn-workers heen moeten werken: één rij per lopende
+    # taak. Een rij ouder dan de afgesproken termijn telt als achtergelaten
+    # (worker gecrasht) en mag overgenomen worden.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_locks (
+            lock_key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            acquired_at INTEGER NOT NULL
+        )
+        """
+    )
+
+    # Versienummers van caches die elke worker in het geheugen houdt. Wie de
+    # onderliggende data wijzigt, verhoogt het nummer; een worker die een ander
+    # nummer leest dan hij kent, laadt opnieuw.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            cache_key TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+    # Importjobs: de import van een site loopt op de achtergrond. De job staat in
+    # de DB zodat elke worker de voortgang kan tonen, niet alleen die die hem draait.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            group_id INTEGER NOT NULL DEFAULT 1,
+            email TEXT NOT NULL,
+            url TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            found INTEGER NOT NULL DEFAULT 0,
+            created INTEGER NOT NULL DEFAULT 0,
+            progress_json TEXT NOT NULL DEFAULT '[]',
+            skipped_json TEXT NOT NULL DEFAULT '[]',
+            errors_json TEXT NOT NULL DEFAULT '[]',
+            error TEXT NOT NULL DEFAULT '',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_group ON import_jobs (group_id, created_at)")
+
+    # Tags, allergenen en ingredienten van eigen maaltijden, een rij per waarde,
+    # zodat filteren ("geen maaltijden met noten") in SQL kan. position houdt de
+    # volgorde van de gebruiker vast.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meal_tags (
+            meal_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (meal_id, position)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_meal_tags_tag ON meal_tags (tag, meal_id)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meal_allergens (
+            meal_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            allergen TEXT NOT NULL,
+            PRIMARY KEY (meal_id, position)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_meal_allergens_allergen ON meal_allergens (allergen, meal_id)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meal_ingredients (
+            meal_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            quantity REAL NOT NULL DEFAULT 0,
+            unit TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (meal_id, position)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_meal_ingredients_name ON meal_ingredients (name)")
+
     # Mislukte logins, voor de throttle. Staat in de DB en niet in het geheugen,
     # omdat gunicorn met meerdere workers draait die geen state delen.
     cur.execute(
@@ -290,6 +398,17 @@ def init_db():
         _safe_add_column("ALTER TABLE custom_meals ADD COLUMN preparation_json TEXT NOT NULL DEFAULT '[]'")
     if "rating" not in columns:
         _safe_add_column("ALTER TABLE custom_meals ADD COLUMN rating INTEGER NOT NULL DEFAULT 3")
+    # Vingerafdruk van recept en tagregels bij de laatste verrijking; leeg is
+    # nooit verrijkt. Zie tagging.verrijk_vingerafdruk.
+    if "enrich_hash" not in columns:
+        _safe_add_column("ALTER TABLE custom_meals ADD COLUMN enrich_hash TEXT NOT NULL DEFAULT ''")
+    # Genormaliseerde ingredienten voor de boodschappenlijst (shopping.vector_json);
+    # leeg is nog niet berekend of verouderd.
+    if "shopping_json" not in columns:
+        _safe_add_column("ALTER TABLE custom_meals ADD COLUMN shopping_json TEXT NOT NULL DEFAULT ''")
+    cur.execute("PRAGMA table_info(generated_ai_meals)")
+    if "shopping_json" not in {row["name"] for row in cur.fetchall()}:
+        _safe_add_column("ALTER TABLE generated_ai_meals ADD COLUMN shopping_json TEXT NOT NULL DEFAULT ''")
     cur.execute("PRAGMA table_info(shopping_items)")
     shopping_item_columns = {row["name"] for row in cur.fetchall()}
     if "group_id" not in shopping_item_columns:
@@ -322,6 +441,8 @@ def init_db():
         """
     )
     cur.execute("UPDATE custom_meals SET group_id = 1 WHERE group_id IS NULL OR group_id <= 0")
+    _ensure_unique_custom_meal_names(cur)
+    _backfill_meal_children(cur)
     cur.execute("UPDATE shopping_items SET group_id = 1 WHERE group_id IS NULL OR group_id <= 0")
     cur.execute("UPDATE shopping_history SET group_id = 1 WHERE group_id IS NULL OR group_id <= 0")
     cur.execute("UPDATE generated_ai_meals SET group_id = 1 WHERE group_id IS NULL OR group_id <= 0")
@@ -338,6 +459,75 @@ def init_db():
     conn.close()
 
 
+def _ensure_unique_custom_meal_names(cur):
+    """Eén naam per groep, hoofdletterongevoelig, afgedwongen door een index.
+
+    Bestaande dubbels (van voor de index) krijgen eerst een volgnummer: de
+    oudste houdt zijn naam, de volgende wordt "Soep (2)", "Soep (3)", ...
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_custom_meals_group_name'")
+    if cur.fetchone():
+        return
+    cur.execute("SELECT id, group_id, name, lower(name) AS name_key FROM custom_meals ORDER BY id")
+    rows = cur.fetchall()
+    taken = {(row["group_id"], row["name_key"]) for row in rows}
+    seen = set()
+    for row in rows:
+        key = (row["group_id"], row["name_key"])
+        if key not in seen:
+            seen.add(key)
+            continue
+        number = 2
+        while (row["group_id"], _sql_lower(f"{row['name']} ({number})")) in taken:
+            number += 1
+        new_name = f"{row['name']} ({number})"
+        taken.add((row["group_id"], _sql_lower(new_name)))
+        cur.execute("UPDATE custom_meals SET name = ? WHERE id = ?", (new_name, row["id"]))
+    cur.execute("CREATE UNIQUE INDEX idx_custom_meals_group_name ON custom_meals (group_id, lower(name))")
+
+
+def _backfill_meal_children(cur):
+    """Zet tags, allergenen en ingredienten uit de JSON-kolommen in de kindtabellen.
+
+    Alleen voor maaltijden die nog geen enkele kindrij hebben, dus na de eerste
+    keer is dit één lege query.
+    """
+    cur.execute(
+        """
+        SELECT id, tags_json, allergens_json, ingredients_json
+        FROM custom_meals m
+        WHERE NOT EXISTS (SELECT 1 FROM meal_tags WHERE meal_id = m.id)
+          AND NOT EXISTS (SELECT 1 FROM meal_allergens WHERE meal_id = m.id)
+          AND NOT EXISTS (SELECT 1 FROM meal_ingredients WHERE meal_id = m.id)
+          AND (tags_json NOT IN ('', '[]') OR allergens_json NOT IN ('', '[]') OR ingredients_json NOT IN ('', '[]'))
+        """
+    )
+    rows = cur.fetchall()
+
+    def _loads(value):
+        try:
+            data = json.loads(value or "[]")
+        except Exception:
+            return []
+        return data if isinstance(data, list) else []
+
+    _write_meal_children(
+        cur,
+        [
+            (row["id"], _loads(row["tags_json"]), _loads(row["allergens_json"]), _loads(row["ingredients_json"]))
+            for row in rows
+        ],
+    )
+
+
+def _sql_lower(value):
+    """lower() zoals SQLite het doet: alleen ASCII, zodat sleutels overeenkomen met de index."""
+    return str(value).translate(_ASCII_LOWER)
+
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
 def _is_password_hash(value):
     token = str(value or "")
     return token.startswith("pbkdf2:") or token.startswith("scrypt:")
@@ -390,11 +580,33 @@ def upsert_ingredient_energy(items, source="seed", overschrijven=False):
                 (str(naam).strip().lower(), float(kcal), gram, source),
             )
         aantal += cur.rowcount or 0
+    if aantal:
+        _bump_cache_version(cur, INGREDIENT_ENERGY_CACHE)
     conn.commit()
     conn.close()
     return aantal
 
 
+def _bump_cache_version(cur, cache_key):
+    cur.execute(
+        """
+        INSERT INTO cache_versions (cache_key, version) VALUES (?, 1)
+        ON CONFLICT(cache_key) DO UPDATE SET version = version + 1
+        """,
+        (str(cache_key),),
+    )
+
+
+def get_cache_version(cache_key):
+    """Huidige versie van een gedeelde cache; 0 als er nog nooit iets wijzigde."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM cache_versions WHERE cache_key = ?", (str(cache_key),))
+    row = cur.fetchone()
+    conn.close()
+    return int(row["version"]) if row else 0
+
+
 def _clamp_course(value, fallback=DEFAULT_COURSE):
     token = str(value or "").strip().lower()
     return token if token in COURSES else fallback
@@ -753,6 +965,8 @@ def delete_group(group_id):
     # Cleanup group-scoped data.
     cur.execute("DELETE FROM group_day_plans WHERE group_id = ?", (gid,))
     cur.execute("DELETE FROM group_menu_preferences WHERE group_id = ?", (gid,))
+    for table in _MEAL_CHILD_TABLES:
+        cur.execute(f"DELETE FROM {table} WHERE meal_id IN (SELECT id FROM custom_meals WHERE group_id = ?)", (gid,))
     cur.execute("DELETE FROM custom_meals WHERE group_id = ?", (gid,))
     cur.execute("DELETE FROM shopping_items WHERE group_id = ?", (gid,))
     cur.execute("DELETE FROM shopping_history WHERE group_id = ?", (gid,))
@@ -1160,6 +1374,31 @@ def get_day(group_id, date_str):
     return dict(row) if row else None
 
 
+def get_days_in(group_id, dates):
+    """De dagplannen van deze datums, in één query; dagen zonder plan ontbreken."""
+    dates = sorted({str(d) for d in dates or []})
+    if not dates:
+        return []
+    conn = get_conn()
+    cur = conn.cursor()
+    rows = []
+    for start in range(0, len(dates), 500):
+        chunk = dates[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"""
+            SELECT day_date, cook, meal_id
+            FROM group_day_plans
+            WHERE group_id = ? AND day_date IN ({placeholders})
+            ORDER BY day_date ASC
+            """,
+            (int(group_id or 1), *chunk),
+        )
+        rows.extend(dict(row) for row in cur.fetchall())
+    conn.close()
+    return rows
+
+
 def list_generated_ai_meals(group_id):
     gid = int(group_id or 1)
     if gid <= 0:
@@ -1189,6 +1428,8 @@ def upsert_generated_ai_meals(group_id, items):
     gid = int(group_id or 1)
     if gid <= 0:
         gid = 1
+    from .shopping import vector_json
+
     conn = get_conn()
     cur = conn.cursor()
     for item in items or []:
@@ -1197,19 +1438,149 @@ def upsert_generated_ai_meals(group_id, items):
             continue
         cur.execute(
             """
-            INSERT INTO generated_ai_meals (id, group_id, recipe_json)
-            VALUES (?, ?, ?)
+            INSERT INTO generated_ai_meals (id, group_id, recipe_json, shopping_json)
+            VALUES (?, ?, ?, ?)
             ON CONFLICT(id) DO UPDATE SET
                 group_id=excluded.group_id,
                 recipe_json=excluded.recipe_json,
+                shopping_json=excluded.shopping_json,
                 updated_at=CURRENT_TIMESTAMP
             """,
-            (meal_id, gid, json.dumps(item or {}, ensure_ascii=False)),
+            (
+                meal_id,
+                gid,
+                json.dumps(item or {}, ensure_ascii=False),
+                vector_json(item.get("ingredients"), item.get("servings")),
+            ),
         )
     conn.commit()
     conn.close()
 
 
+def get_ai_menu_cache(cache_key, schema_version, max_age_seconds, now=None):
+    """Items voor één cachesleutel, of None als er niets (vers genoeg) is.
+
+    Een treffer schuift last_used_at op; daarop ruimt store_ai_menu_cache de
+    minst recent gebruikte sleutels op.
+    """
+    moment = int(now if now is not None else time.time())
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT items_json
+        FROM ai_menu_cache
+        WHERE cache_key = ? AND schema_version = ? AND fetched_at > ?
+        """,
+        (str(cache_key), int(schema_version), moment - int(max_age_seconds)),
+    )
+    row = cur.fetchone()
+    if row:
+        cur.execute("UPDATE ai_menu_cache SET last_used_at = ? WHERE cache_key = ?", (moment, str(cache_key)))
+        conn.commit()
+    conn.close()
+    if not row:
+        return None
+    return _load_json_or_default(row["items_json"], [])
+
+
+def store_ai_menu_cache(cache_key, schema_version, items, max_age_seconds, max_entries, now=None):
+    """Bewaart de items voor één sleutel en houdt de tabel begrensd.
+
+    Verlopen rijen gaan weg, en boven max_entries verdwijnen de minst recent
+    gebruikte sleutels. Zo groeit de cache niet mee met elke variant van de
+    plannercontext.
+    """
+    moment = int(now if now is not None else time.time())
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO ai_menu_cache (cache_key, schema_version, items_json, fetched_at, last_used_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(cache_key) DO UPDATE SET
+            schema_version=excluded.schema_version,
+            items_json=excluded.items_json,
+            fetched_at=excluded.fetched_at,
+            last_used_at=excluded.last_used_at
+        """,
+        (str(cache_key), int(schema_version), json.dumps(list(items or []), ensure_ascii=False), moment, moment),
+    )
+    cur.execute(
+        "DELETE FROM ai_menu_cache WHERE fetched_at <= ? OR schema_version != ?",
+        (moment - int(max_age_seconds), int(schema_version)),
+    )
+    cur.execute(
+        """
+        DELETE FROM ai_menu_cache
+        WHERE cache_key IN (
+            SELECT cache_key FROM ai_menu_cache
+            ORDER BY last_used_at DESC, fetched_at DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (max(1, int(max_entries)),),
+    )
+    conn.commit()
+    conn.close()
+
+
+def clear_ai_menu_cache():
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM ai_menu_cache")
+    conn.commit()
+    conn.close()
+
+
+def acquire_app_lock(lock_key, owner, stale_after_seconds, now=None):
+    """Probeert de lock te nemen; True als die nu van owner is.
+
+    Eén statement, zodat twee workers die tegelijk proberen nooit allebei
+    winnen. Een lock ouder dan stale_after_seconds wordt overgenomen.
+    """
+    moment = int(now if now is not None else time.time())
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO app_locks (lock_key, owner, acquired_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(lock_key) DO UPDATE SET
+            owner=excluded.owner,
+            acquired_at=excluded.acquired_at
+        WHERE app_locks.acquired_at <= ?
+        """,
+        (str(lock_key), str(owner), moment, moment - int(stale_after_seconds)),
+    )
+    genomen = (cur.rowcount or 0) > 0
+    conn.commit()
+    conn.close()
+    return genomen
+
+
+def app_lock_is_held(lock_key, stale_after_seconds, now=None):
+    moment = int(now if now is not None else time.time())
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT 1 FROM app_locks WHERE lock_key = ? AND acquired_at > ?",
+        (str(lock_key), moment - int(stale_after_seconds)),
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row is not None
+
+
+def release_app_lock(lock_key, owner):
+    """Geeft de lock vrij, maar alleen als owner hem nog heeft."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM app_locks WHERE lock_key = ? AND owner = ?", (str(lock_key), str(owner)))
+    conn.commit()
+    conn.close()
+
+
 def get_user_allergies(email):
     conn = get_conn()
     cur = conn.cursor()
@@ -1368,127 +1739,525 @@ def set_group_menu_mode(group_id, menu_mode):
     conn.close()
 
 
+# De JSON-kolommen tags_json, allergens_json en ingredients_json worden nog mee
+# geschreven, zodat een oudere versie van de app dezelfde database kan lezen.
+# Gelezen wordt enkel uit de kindtabellen.
+_MEAL_CHILD_TABLES = ("meal_tags", "meal_allergens", "meal_ingredients")
+
+_CUSTOM_MEAL_COLUMNS = """
+    id, email, name, description, image_url, rating,
+    preparation_json, rotation_limit,
+    servings, source_url, course, protein, carbs, calories
+"""
+
+
+def _meal_children(payload):
+    """(tags, allergenen, ingredienten) van een maaltijdpayload, klaar voor de kindtabellen."""
+    ingredients = []
+    for item in payload.get("ingredients") or []:
+        if isinstance(item, str):
+            item = {"name": item}
+        if not isinstance(item, dict) or not str(item.get("name") or "").strip():
+            continue
+        try:
+            quantity = float(item.get("quantity") or 0)
+        except (TypeError, ValueError):
+            quantity = 0.0
+        ingredients.append((str(item["name"]).strip(), quantity, str(item.get("unit") or "").strip()))
+    return (
+        [str(tag) for tag in payload.get("tags") or [] if str(tag).strip()],
+        [str(allergen) for allergen in payload.get("allergens") or [] if str(allergen).strip()],
+        ingredients,
+    )
+
+
+def _write_meal_children(cur, rows):
+    """Vervangt de kindrijen; rows is een lijst (meal_id, tags, allergenen, ingredienten)."""
+    if not rows:
+        return
+    ids = [(meal_id,) for meal_id, *_ in rows]
+    for table in _MEAL_CHILD_TABLES:
+        cur.executemany(f"DELETE FROM {table} WHERE meal_id = ?", ids)
+    # De boodschapvector hoort bij de ingredienten; de porties staan in de rij zelf.
+    from .shopping import vector_json
+
+    cur.executemany(
+        "UPDATE custom_meals SET shopping_json = ? WHERE id = ?",
+        [(vector_json(ingredients), meal_id) for meal_id, _, _, ingredients in rows],
+    )
+    normalized = [(meal_id, *_meal_children({"tags": t, "allergens": a, "ingredients": i})) for meal_id, t, a, i in rows]
+    cur.executemany(
+        "INSERT INTO meal_tags (meal_id, position, tag) VALUES (?, ?, ?)",
+        [(meal_id, pos, tag) for meal_id, tags, _, _ in normalized for pos, tag in enumerate(tags)],
+    )
+    cur.executemany(
+        "INSERT INTO meal_allergens (meal_id, position, allergen) VALUES (?, ?, ?)",
+        [(meal_id, pos, allergen) for meal_id, _, allergens, _ in normalized for pos, allergen in enumerate(allergens)],
+    )
+    cur.executemany(
+        "INSERT INTO meal_ingredients (meal_id, position, name, quantity, unit) VALUES (?, ?, ?, ?, ?)",
+        [
+            (meal_id, pos, *ingredient)
+            for meal_id, _, _, ingredients in normalized
+            for pos, ingredient in enumerate(ingredients)
+        ],
+    )
+
+
+def _set_enrich_hashes(cur, meal_ids):
+    """Zet de vingerafdruk van verrijk bij het wegschrijven, zodat een retag ze overslaat.
+
+    Alleen als verrijk niets meer zou toevoegen; anders leeg, en rekent de
+    volgende retag ze. Berekend op de maaltijd zoals ze terug uit de database
+    komt, want daarmee vergelijkt de retag.
+    """
+    from .tagging import verrijk, verrijk_vingerafdruk
+
+    ids = list(meal_ids)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(f"SELECT {_CUSTOM_MEAL_COLUMNS} FROM custom_meals WHERE id IN ({placeholders})", chunk)
+        hashes = []
+        for meal in _custom_meals_from_rows(cur, cur.fetchall()):
+            labels = (list(meal["tags"]), list(meal["allergens"]))
+            enrich_hash = verrijk_vingerafdruk(meal)
+            verrijk(meal)
+            hashes.append((enrich_hash if (meal["tags"], meal["allergens"]) == labels else "", meal["id"]))
+        cur.executemany("UPDATE custom_meals SET enrich_hash = ? WHERE id = ?", hashes)
+
+
+def _attach_meal_children(cur, meals):
+    """Vult tags, allergenen en ingredienten in vanuit de kindtabellen; meals is {id: maaltijd}."""
+    ids = list(meals)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT meal_id, tag FROM meal_tags WHERE meal_id IN ({placeholders}) ORDER BY meal_id, position",
+            chunk,
+        )
+        for row in cur.fetchall():
+            meals[row["meal_id"]]["tags"].append(row["tag"])
+        cur.execute(
+            f"SELECT meal_id, allergen FROM meal_allergens WHERE meal_id IN ({placeholders}) ORDER BY meal_id, position",
+            chunk,
+        )
+        for row in cur.fetchall():
+            meals[row["meal_id"]]["allergens"].append(row["allergen"])
+        cur.execute(
+            f"""
+            SELECT meal_id, name, quantity, unit FROM meal_ingredients
+            WHERE meal_id IN ({placeholders}) ORDER BY meal_id, position
+            """,
+            chunk,
+        )
+        for row in cur.fetchall():
+            meals[row["meal_id"]]["ingredients"].append(
+                {"name": row["name"], "quantity": float(row["quantity"] or 0), "unit": row["unit"] or ""}
+            )
+
+
+def _custom_meal_from_row(row):
+    """Een maaltijd zonder kindrijen; _attach_meal_children vult die aan."""
+    try:
+        preparation = json.loads(row["preparation_json"] or "[]")
+    except Exception:
+        preparation = []
+
+    return {
+        "id": row["id"],
+        "email": row["email"],
+        "name": row["name"],
+        "description": row["description"] or "",
+        "image_url": row["image_url"] or "",
+        "rating": max(1, min(5, int(row["rating"] or 3))),
+        "tags": [],
+        "allergens": [],
+        "ingredients": [],
+        "preparation": preparation,
+        "rotation_limit": row["rotation_limit"] or "1_per_week",
+        "servings": _clamp_servings(row["servings"]),
+        "source_url": row["source_url"] or "",
+        "course": _clamp_course(row["course"]),
+        "nutrition": {
+            "protein": float(row["protein"] or 0),
+            "carbs": float(row["carbs"] or 0),
+            "calories": float(row["calories"] or 0),
+        },
+    }
+
+
+def _custom_meals_from_rows(cur, rows):
+    meals = {row["id"]: _custom_meal_from_row(row) for row in rows}
+    _attach_meal_children(cur, meals)
+    return list(meals.values())
+
+
 def list_custom_meals(email):
     gid = get_user_group_id(email)
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """
-        SELECT
-            id, email, name, description, image_url, rating,
-            tags_json, allergens_json, ingredients_json, preparation_json, rotation_limit,
-            servings, source_url, course, protein, carbs, calories
+        f"""
+        SELECT {_CUSTOM_MEAL_COLUMNS}
         FROM custom_meals
         WHERE group_id = ?
         ORDER BY id DESC
         """,
         (gid,),
     )
-    rows = cur.fetchall()
+    meals = _custom_meals_from_rows(cur, cur.fetchall())
     conn.close()
+    return meals
 
-    out = []
-    for row in rows:
-        try:
-            tags = json.loads(row["tags_json"] or "[]")
-        except Exception:
-            tags = []
-        try:
-            allergens = json.loads(row["allergens_json"] or "[]")
-        except Exception:
-            allergens = []
-        try:
-            ingredients = json.loads(row["ingredients_json"] or "[]")
-        except Exception:
-            ingredients = []
-        try:
-            preparation = json.loads(row["preparation_json"] or "[]")
-        except Exception:
-            preparation = []
 
-        out.append(
-            {
-                "id": row["id"],
-                "email": row["email"],
-                "name": row["name"],
-                "description": row["description"] or "",
-                "image_url": row["image_url"] or "",
-                "rating": max(1, min(5, int(row["rating"] or 3))),
-                "tags": tags,
-                "allergens": allergens,
-                "ingredients": ingredients,
-                "preparation": preparation,
-                "rotation_limit": row["rotation_limit"] or "1_per_week",
-                "servings": _clamp_servings(row["servings"]),
-                "source_url": row["source_url"] or "",
-                "course": _clamp_course(row["course"]),
-                "nutrition": {
-                    "protein": float(row["protein"] or 0),
-                    "carbs": float(row["carbs"] or 0),
-                    "calories": float(row["calories"] or 0),
-                },
-            }
+def iter_custom_meals(group_id, batch_size=200):
+    """Zelfde maaltijden als list_custom_meals, maar een voor een uit de cursor.
+
+    Voor de export: er staan nooit meer dan batch_size rijen tegelijk in het
+    geheugen. De verbinding blijft open tot de generator uitgeput of gesloten is.
+    """
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        children = conn.cursor()
+        cur.execute(
+            f"SELECT {_CUSTOM_MEAL_COLUMNS} FROM custom_meals WHERE group_id = ? ORDER BY id DESC",
+            (int(group_id),),
         )
-    return out
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from _custom_meals_from_rows(children, rows)
+    finally:
+        conn.close()
 
 
-def create_custom_meal(email, payload):
+def count_custom_meals(email):
     gid = get_user_group_id(email)
-    name = (payload.get("name") or "").strip()
-    description = (payload.get("description") or "").strip()
-    image_url = (payload.get("image_url") or "").strip()
-    rating = max(1, min(5, int(payload.get("rating") or 3)))
-    tags = payload.get("tags") or []
-    allergens = payload.get("allergens") or []
-    ingredients = payload.get("ingredients") or []
-    preparation = payload.get("preparation") or []
-    rotation_limit = (payload.get("rotation_limit") or "1_per_week").strip()
-    servings = _clamp_servings(payload.get("servings"))
-    source_url = str(payload.get("source_url") or "").strip()[:500]
-    course = _clamp_course(payload.get("course"))
-    protein = float(payload.get("protein") or 0)
-    carbs = float(payload.get("carbs") or 0)
-    calories = float(payload.get("calories") or 0)
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM custom_meals WHERE group_id = ?", (gid,))
+    count = int(cur.fetchone()[0] or 0)
+    conn.close()
+    return count
+
+
+def custom_meals_without_kcal(after_id=0, limit=200):
+    """Eigen maaltijden zonder kcal, op id vanaf after_id; voor de kcal-backfill.
 
+    Geeft (maaltijden, laatste_id) terug, met per maaltijd alleen wat de
+    schatting nodig heeft. laatste_id is None als er niets meer volgt.
+    """
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """
-        INSERT INTO custom_meals (
-            email, name, description, image_url,
-            group_id,
-            rating,
-            tags_json, allergens_json, ingredients_json, preparation_json, rotation_limit,
-            servings, source_url, course, protein, carbs, calories
+        "SELECT id, servings FROM custom_meals WHERE calories <= 0 AND id > ? ORDER BY id LIMIT ?",
+        (int(after_id or 0), int(limit)),
+    )
+    meals = {
+        row["id"]: {"id": row["id"], "servings": row["servings"], "tags": [], "allergens": [], "ingredients": []}
+        for row in cur.fetchall()
+    }
+    _attach_meal_children(cur, meals)
+    conn.close()
+    return list(meals.values()), (max(meals) if meals else None)
+
+
+def _ai_meal_calories(payload):
+    nutrition = payload.get("nutrition")
+    try:
+        return float(nutrition.get("calories") or 0) if isinstance(nutrition, dict) else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def ai_meals_without_kcal(after_id="", limit=200):
+    """Bewaarde AI-maaltijden zonder kcal, op id vanaf after_id; voor de kcal-backfill.
+
+    De kcal zit in recipe_json, dus er wordt per limit rijen gescand en in
+    Python gefilterd. laatste_id is de laatst gescande id (None aan het einde),
+    ook als geen enkele rij in de reeks zonder kcal was.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, recipe_json FROM generated_ai_meals WHERE id > ? ORDER BY id LIMIT ?",
+        (str(after_id or ""), int(limit)),
+    )
+    rows = cur.fetchall()
+    conn.close()
+    meals = []
+    for row in rows:
+        payload = _load_json_or_default(row["recipe_json"], {})
+        if not isinstance(payload, dict):
+            continue
+        if _ai_meal_calories(payload) <= 0:
+            meals.append({"id": row["id"], "servings": payload.get("servings"), "ingredients": payload.get("ingredients") or []})
+    return meals, (rows[-1]["id"] if rows else None)
+
+
+def custom_meals_for_enrichment(after_id=0, limit=200):
+    """Volledige eigen maaltijden op id vanaf after_id, met hun enrich_hash.
+
+    Voor het herverrijken over alle groepen heen; geeft (maaltijden,
+    laatste_id) terug, laatste_id None aan het einde.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT {_CUSTOM_MEAL_COLUMNS}, enrich_hash FROM custom_meals WHERE id > ? ORDER BY id LIMIT ?",
+        (int(after_id or 0), int(limit)),
+    )
+    rows = cur.fetchall()
+    meals = _custom_meals_from_rows(cur, rows)
+    conn.close()
+    hashes = {row["id"]: row["enrich_hash"] or "" for row in rows}
+    for meal in meals:
+        meal["enrich_hash"] = hashes[meal["id"]]
+    return meals, (rows[-1]["id"] if rows else None)
+
+
+def set_meal_enrichment(rows):
+    """Schrijft herberekende labels en vingerafdrukken weg, in één transactie; geeft het aantal bijgewerkt.
+
+    rows is een lijst (id, tags, allergenen, enrich_hash, oude_enrich_hash).
+    tags en allergenen None betekent: labels ongewijzigd, alleen de
+    vingerafdruk bijwerken. Een maaltijd waarvan de vingerafdruk intussen niet
+    meer oude_enrich_hash is, werd na het lezen bewerkt of opnieuw
+    geïmporteerd: die blijft zoals ze is, want de labels hier zijn verouderd.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    updated, labels = 0, []
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        for meal_id, tags, allergens, enrich_hash, old_hash in rows:
+            cur.execute(
+                "UPDATE custom_meals SET enrich_hash = ? WHERE id = ? AND enrich_hash = ?",
+                (str(enrich_hash), int(meal_id), str(old_hash or "")),
+            )
+            if not cur.rowcount:
+                continue
+            updated += 1
+            if tags is not None:
+                labels.append((int(meal_id), tags, allergens))
+        cur.executemany(
+            "UPDATE custom_meals SET tags_json = ?, allergens_json = ? WHERE id = ?",
+            [(json.dumps(tags), json.dumps(allergens), meal_id) for meal_id, tags, allergens in labels],
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ids = [(meal_id,) for meal_id, _, _ in labels]
+        cur.executemany("DELETE FROM meal_tags WHERE meal_id = ?", ids)
+        cur.executemany("DELETE FROM meal_allergens WHERE meal_id = ?", ids)
+        cur.executemany(
+            "INSERT INTO meal_tags (meal_id, position, tag) VALUES (?, ?, ?)",
+            [(meal_id, pos, tag) for meal_id, tags, _ in labels for pos, tag in enumerate(tags)],
+        )
+        cur.executemany(
+            "INSERT INTO meal_allergens (meal_id, position, allergen) VALUES (?, ?, ?)",
+            [(meal_id, pos, allergen) for meal_id, _, allergens in labels for pos, allergen in enumerate(allergens)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return updated
+
+
+def set_meal_calories(custom=(), ai=()):
+    """Schrijft geschatte kcal weg, in één korte transactie.
+
+    custom en ai zijn lijsten (id, kcal). Een waarde die intussen wel ingevuld
+    werd (door de gebruiker, of een import) blijft staan.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.executemany(
+            "UPDATE custom_meals SET calories = ? WHERE id = ? AND calories <= 0",
+            [(float(kcal), int(meal_id)) for meal_id, kcal in custom],
+        )
+        for meal_id, kcal in ai:
+            cur.execute("SELECT recipe_json FROM generated_ai_meals WHERE id = ?", (str(meal_id),))
+            row = cur.fetchone()
+            payload = _load_json_or_default(row["recipe_json"], {}) if row else None
+            if not isinstance(payload, dict):
+                continue
+            if _ai_meal_calories(payload) > 0:
+                continue
+            nutrition = payload.get("nutrition") if isinstance(payload.get("nutrition"), dict) else {}
+            payload["nutrition"] = {**nutrition, "calories": float(kcal)}
+            # updated_at blijft staan: daarop sorteert list_generated_ai_meals.
+            cur.execute(
+                "UPDATE generated_ai_meals SET recipe_json = ? WHERE id = ?",
+                (json.dumps(payload, ensure_ascii=False), str(meal_id)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def list_planner_candidates(group_id, excluded_allergens=(), main_only=True, excluded_ids=()):
+    """De eigen maaltijden die de planner mag kiezen, in compacte vorm.
+
+    Filtert in SQL wat zonder de recepttekst te bekijken al vaststaat: de gang,
+    maaltijden die al gepland zijn (excluded_ids, zonder of met "custom_"-prefix)
+    en maaltijden met een uitgesloten allergeen als label. Een allergeen dat
+    enkel in de ingredienten schuilt vangt de planner zelf nog op. De bereiding
+    wordt niet geladen: de planner heeft ze niet nodig.
+    """
+    where = ["m.group_id = ?"]
+    params = [int(group_id)]
+    if main_only:
+        where.append("m.course = ?")
+        params.append(DEFAULT_COURSE)
+    ids = sorted({int(str(x).removeprefix("custom_")) for x in excluded_ids or [] if str(x).removeprefix("custom_").isdigit()})
+    if ids:
+        where.append(f"m.id NOT IN ({', '.join(['?'] * len(ids))})")
+        params.extend(ids)
+    allergens = sorted({str(a).strip().lower() for a in excluded_allergens or [] if str(a).strip()})
+    if allergens:
+        where.append(
+            f"""NOT EXISTS (
+                SELECT 1 FROM meal_allergens a
+                WHERE a.meal_id = m.id AND a.allergen IN ({', '.join(['?'] * len(allergens))})
+            )"""
+        )
+        params.extend(allergens)
+
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT
+            m.id, m.email, m.name, m.description, m.image_url, m.rating,
+            '[]' AS preparation_json, m.rotation_limit,
+            m.servings, m.source_url, m.course, m.protein, m.carbs, m.calories
+        FROM custom_meals m
+        WHERE {" AND ".join(where)}
+        ORDER BY m.id DESC
         """,
-        (
-            email,
-            name,
-            description,
-            image_url,
-            gid,
-            rating,
-            json.dumps(tags),
-            json.dumps(allergens),
-            json.dumps(ingredients),
-            json.dumps(preparation),
-            rotation_limit,
-            servings,
-            source_url,
-            course,
-            protein,
-            carbs,
-            calories,
-        ),
-    )
-    meal_id = cur.lastrowid
-    conn.commit()
+        params,
+    )
+    meals = _custom_meals_from_rows(cur, cur.fetchall())
     conn.close()
+    for meal in meals:
+        del meal["preparation"]
+    return meals
+
+
+_CUSTOM_MEAL_INSERT = """
+    INSERT {or_ignore}INTO custom_meals (
+        email, name, description, image_url,
+        group_id,
+        rating,
+        tags_json, allergens_json, ingredients_json, preparation_json, rotation_limit,
+        servings, source_url, course, protein, carbs, calories
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _custom_meal_values(email, gid, payload):
+    return (
+        email,
+        (payload.get("name") or "").strip(),
+        (payload.get("description") or "").strip(),
+        (payload.get("image_url") or "").strip(),
+        gid,
+        max(1, min(5, int(payload.get("rating") or 3))),
+        json.dumps(payload.get("tags") or []),
+        json.dumps(payload.get("allergens") or []),
+        json.dumps(payload.get("ingredients") or []),
+        json.dumps(payload.get("preparation") or []),
+        (payload.get("rotation_limit") or "1_per_week").strip(),
+        _clamp_servings(payload.get("servings")),
+        str(payload.get("source_url") or "").strip()[:500],
+        _clamp_course(payload.get("course")),
+        float(payload.get("protein") or 0),
+        float(payload.get("carbs") or 0),
+        float(payload.get("calories") or 0),
+    )
+
+
+def create_custom_meal(email, payload):
+    """Voegt één maaltijd toe; sqlite3.IntegrityError als de naam al bestaat in de groep."""
+    gid = get_user_group_id(email)
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute(_CUSTOM_MEAL_INSERT.format(or_ignore=""), _custom_meal_values(email, gid, payload))
+        meal_id = cur.lastrowid
+        _write_meal_children(cur, [(meal_id, payload.get("tags"), payload.get("allergens"), payload.get("ingredients"))])
+        _set_enrich_hashes(cur, [meal_id])
+        conn.commit()
+    finally:
+        conn.close()
     return meal_id
 
 
+def create_custom_meals_bulk(group_id, items, email):
+    """Voegt een reeks maaltijden toe in één transactie: (aantal toegevoegd, indexen van dubbels).
+
+    Een naam die al in de groep bestaat, of eerder in dezelfde reeks staat,
+    wordt overgeslagen. Enkel de namen uit de reeks worden opgezocht, niet de
+    hele tabel. De transactie neemt meteen het schrijfslot (BEGIN IMMEDIATE),
+    zodat er tussen die controle en de insert niemand dezelfde naam toevoegt;
+    de unieke index op (group_id, lower(name)) is het vangnet. Een rij die die
+    index toch weigert, telt ook als dubbel.
+    """
+    gid = int(group_id)
+    items = list(items or [])
+    values = [_custom_meal_values(email, gid, item) for item in items]
+    if not values:
+        return 0, []
+
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        keys = [_sql_lower(row[1]) for row in values]
+        existing = _existing_name_keys(cur, gid, list(dict.fromkeys(keys)))
+
+        created, duplicates, children = 0, [], []
+        insert = _CUSTOM_MEAL_INSERT.format(or_ignore="OR IGNORE ")
+        for index, (key, row) in enumerate(zip(keys, values)):
+            if key in existing:
+                duplicates.append(index)
+                continue
+            existing[key] = None
+            cur.execute(insert, row)
+            if cur.rowcount == 0:
+                # De unieke index vond toch een dubbel die de controle hierboven miste.
+                duplicates.append(index)
+                continue
+            created += 1
+            item = items[index]
+            children.append((cur.lastrowid, item.get("tags"), item.get("allergens"), item.get("ingredients")))
+        _write_meal_children(cur, children)
+        _set_enrich_hashes(cur, [meal_id for meal_id, *_ in children])
+        conn.commit()
+    finally:
+        conn.close()
+    return created, duplicates
+
+
+def _existing_name_keys(cur, gid, keys):
+    """{lower(naam): id} voor de namen uit keys die al in de groep bestaan."""
+    found = {}
+    for start in range(0, len(keys), 500):
+        chunk = keys[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT id, lower(name) AS name_key FROM custom_meals WHERE group_id = ? AND lower(name) IN ({placeholders})",
+            [gid, *chunk],
+        )
+        found.update((row["name_key"], row["id"]) for row in cur.fetchall())
+    return found
+
+
 def delete_custom_meals(email, meal_ids):
     gid = get_user_group_id(email)
     ids = [int(x) for x in (meal_ids or []) if str(x).isdigit()]
@@ -1498,6 +2267,14 @@ def delete_custom_meals(email, meal_ids):
     conn = get_conn()
     cur = conn.cursor()
     placeholders = ", ".join(["?"] * len(ids))
+    for table in _MEAL_CHILD_TABLES:
+        cur.execute(
+            f"""
+            DELETE FROM {table}
+            WHERE meal_id IN (SELECT id FROM custom_meals WHERE group_id = ? AND id IN ({placeholders}))
+            """,
+            [gid, *ids],
+        )
     cur.execute(
         f"DELETE FROM custom_meals WHERE group_id = ? AND id IN ({placeholders})",
         [gid, *ids],
@@ -1534,50 +2311,55 @@ def update_custom_meal(email, meal_id, payload):
 
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE custom_meals
-        SET
-            name = ?,
-            description = ?,
-            image_url = ?,
-            rating = ?,
-            tags_json = ?,
-            allergens_json = ?,
-            ingredients_json = ?,
-            preparation_json = ?,
-            rotation_limit = ?,
-            servings = ?,
-            source_url = ?,
-            course = ?,
-            protein = ?,
-            carbs = ?,
-            calories = ?
-        WHERE group_id = ? AND id = ?
-        """,
-        (
-            name,
-            description,
-            image_url,
-            rating,
-            json.dumps(tags),
-            json.dumps(allergens),
-            json.dumps(ingredients),
-            json.dumps(preparation),
-            rotation_limit,
-            servings,
-            source_url,
-            course,
-            protein,
-            carbs,
-            calories,
-            gid,
-            int(meal_id),
-        ),
-    )
-    updated = (cur.rowcount or 0) > 0
-    conn.commit()
-    conn.close()
+    try:
+        cur.execute(
+            """
+            UPDATE custom_meals
+            SET
+                name = ?,
+                description = ?,
+                image_url = ?,
+                rating = ?,
+                tags_json = ?,
+                allergens_json = ?,
+                ingredients_json = ?,
+                preparation_json = ?,
+                rotation_limit = ?,
+                servings = ?,
+                source_url = ?,
+                course = ?,
+                protein = ?,
+                carbs = ?,
+                calories = ?
+            WHERE group_id = ? AND id = ?
+            """,
+            (
+                name,
+                description,
+                image_url,
+                rating,
+                json.dumps(tags),
+                json.dumps(allergens),
+                json.dumps(ingredients),
+                json.dumps(preparation),
+                rotation_limit,
+                servings,
+                source_url,
+                course,
+                protein,
+                carbs,
+                calories,
+                gid,
+                int(meal_id),
+            ),
+        )
+        updated = (cur.rowcount or 0) > 0
+        if updated:
+            _write_meal_children(cur, [(int(meal_id), tags, allergens, ingredients)])
+            _set_enrich_hashes(cur, [int(meal_id)])
+        conn.commit()
+    finally:
+        conn.close()
     return updated
 
 
@@ -1588,57 +2370,117 @@ def get_custom_meal(email, meal_id):
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        """
-        SELECT
-            id, email, name, description, image_url, rating,
-            tags_json, allergens_json, ingredients_json, preparation_json, rotation_limit,
-            servings, source_url, course, protein, carbs, calories
+        f"""
+        SELECT {_CUSTOM_MEAL_COLUMNS}
         FROM custom_meals
         WHERE group_id = ? AND id = ?
         """,
         (gid, int(meal_id)),
     )
     row = cur.fetchone()
+    meal = _custom_meals_from_rows(cur, [row])[0] if row else None
     conn.close()
-    if not row:
-        return None
-    try:
-        tags = json.loads(row["tags_json"] or "[]")
-    except Exception:
-        tags = []
-    try:
-        allergens = json.loads(row["allergens_json"] or "[]")
-    except Exception:
-        allergens = []
-    try:
-        ingredients = json.loads(row["ingredients_json"] or "[]")
-    except Exception:
-        ingredients = []
+    return meal
+
+
+def get_meals_by_ids(group_id, custom_ids=(), ai_ids=()):
+    """Eigen en bewaarde AI-maaltijden op id, over één verbinding.
+
+    Geeft (eigen maaltijden, AI-payloads) terug. Voor wie alleen de maaltijden
+    van een planning nodig heeft, in plaats van alles van de groep te laden.
+    """
+    gid = int(group_id or 1)
+    custom_ids = sorted({int(i) for i in custom_ids or []})
+    ai_ids = sorted({str(i) for i in ai_ids or []})
+    custom, ai = [], []
+    conn = get_conn()
+    cur = conn.cursor()
+    for start in range(0, len(custom_ids), 500):
+        chunk = custom_ids[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT {_CUSTOM_MEAL_COLUMNS} FROM custom_meals WHERE group_id = ? AND id IN ({placeholders})",
+            (gid, *chunk),
+        )
+        custom.extend(_custom_meals_from_rows(cur, cur.fetchall()))
+    for start in range(0, len(ai_ids), 500):
+        chunk = ai_ids[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT recipe_json FROM generated_ai_meals WHERE group_id = ? AND id IN ({placeholders})",
+            (gid, *chunk),
+        )
+        for row in cur.fetchall():
+            payload = _load_json_or_default(row["recipe_json"], {})
+            if isinstance(payload, dict) and payload.get("id"):
+                ai.append(payload)
+    conn.close()
+    return custom, ai
+
+
+def get_shopping_vectors(group_id, custom_ids=(), ai_ids=()):
+    """Bewaarde boodschapvectoren op id: ({eigen id: (porties, json)}, {AI-id: json}).
+
+    Alleen de vectorkolom (en de porties van eigen maaltijden), geen recepten
+    of kindrijen. Zie shopping.vector_json.
+    """
+    gid = int(group_id or 1)
+    custom_ids = sorted({int(i) for i in custom_ids or []})
+    ai_ids = sorted({str(i) for i in ai_ids or []})
+    custom, ai = {}, {}
+    conn = get_conn()
+    cur = conn.cursor()
+    for start in range(0, len(custom_ids), 500):
+        chunk = custom_ids[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT id, servings, shopping_json FROM custom_meals WHERE group_id = ? AND id IN ({placeholders})",
+            (gid, *chunk),
+        )
+        custom.update((row["id"], (row["servings"], row["shopping_json"] or "")) for row in cur.fetchall())
+    for start in range(0, len(ai_ids), 500):
+        chunk = ai_ids[start : start + 500]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT id, shopping_json FROM generated_ai_meals WHERE group_id = ? AND id IN ({placeholders})",
+            (gid, *chunk),
+        )
+        ai.update((row["id"], row["shopping_json"] or "") for row in cur.fetchall())
+    conn.close()
+    return custom, ai
+
+
+def set_shopping_vectors(custom=(), ai=()):
+    """Bewaart herberekende vectoren; custom en ai zijn lijsten (id, nieuw, oud).
+
+    Alleen waar de kolom nog de oude waarde heeft: wie intussen het recept
+    wijzigde, schreef zelf al een verse vector.
+    """
+    if not custom and not ai:
+        return
+    conn = get_conn()
     try:
-        preparation = json.loads(row["preparation_json"] or "[]")
-    except Exception:
-        preparation = []
-    return {
-        "id": row["id"],
-        "email": row["email"],
-        "name": row["name"],
-        "description": row["description"] or "",
-        "image_url": row["image_url"] or "",
-        "rating": max(1, min(5, int(row["rating"] or 3))),
-        "tags": tags,
-        "allergens": allergens,
-        "ingredients": ingredients,
-        "preparation": preparation,
-        "rotation_limit": row["rotation_limit"] or "1_per_week",
-        "servings": _clamp_servings(row["servings"]),
-        "source_url": row["source_url"] or "",
-        "course": _clamp_course(row["course"]),
-        "nutrition": {
-            "protein": float(row["protein"] or 0),
-            "carbs": float(row["carbs"] or 0),
-            "calories": float(row["calories"] or 0),
-        },
-    }
+        cur = conn.cursor()
+        cur.executemany(
+            "UPDATE custom_meals SET shopping_json = ? WHERE id = ? AND shopping_json = ?",
+            [(str(nieuw), int(meal_id), str(oud)) for meal_id, nieuw, oud in custom],
+        )
+        cur.executemany(
+            "UPDATE generated_ai_meals SET shopping_json = ? WHERE id = ? AND shopping_json = ?",
+            [(str(nieuw), str(meal_id), str(oud)) for meal_id, nieuw, oud in ai],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def has_generated_ai_meals(group_id):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM generated_ai_meals WHERE group_id = ? LIMIT 1", (int(group_id or 1),))
+    found = cur.fetchone() is not None
+    conn.close()
+    return found
 
 
 def update_custom_meal_image(email, meal_id, image_url):
@@ -1988,3 +2830,84 @@ def clear_day_meals_between(group_id, start_date, end_date):
     )
     conn.commit()
     conn.close()
+
+
+# Een job die zo lang niets meer liet horen, hoort bij een worker die gestopt
+# is (herstart, crash). Die wordt als mislukt getoond in plaats van eeuwig "bezig".
+IMPORT_JOB_STALE_MINUTES = 10
+IMPORT_JOB_STATUSES = ("queued", "running", "done", "failed")
+_IMPORT_JOB_JSON_FIELDS = {"progress": "progress_json", "skipped": "skipped_json", "errors": "errors_json"}
+_IMPORT_JOB_FIELDS = {"status", "found", "created", "error"}
+
+
+def create_import_job(email, group_id, url):
+    job_id = uuid4().hex
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO import_jobs (id, group_id, email, url) VALUES (?, ?, ?, ?)",
+        (job_id, int(group_id or 1), str(email or ""), str(url or "")),
+    )
+    conn.commit()
+    conn.close()
+    return job_id
+
+
+def update_import_job(job_id, **fields):
+    """Werkt de gegeven velden bij; progress, skipped en errors zijn lijsten."""
+    sets, values = [], []
+    for key, value in fields.items():
+        if key in _IMPORT_JOB_JSON_FIELDS:
+            sets.append(f"{_IMPORT_JOB_JSON_FIELDS[key]} = ?")
+            values.append(json.dumps(list(value or []), ensure_ascii=False))
+        elif key in _IMPORT_JOB_FIELDS:
+            if key == "status" and value not in IMPORT_JOB_STATUSES:
+                raise ValueError(f"onbekende jobstatus: {value}")
+            sets.append(f"{key} = ?")
+            values.append(value)
+    if not sets:
+        return
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"UPDATE import_jobs SET {', '.join(sets)}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (*values, str(job_id)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_import_job(job_id, group_id):
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT id, url, status, found, created, progress_json, skipped_json, errors_json, error,
+               created_at, updated_at,
+               updated_at < datetime('now', ?) AS stale
+        FROM import_jobs
+        WHERE id = ? AND group_id = ?
+        """,
+        (f"-{IMPORT_JOB_STALE_MINUTES} minutes", str(job_id), int(group_id or 1)),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    job = {
+        "id": row["id"],
+        "url": row["url"],
+        "status": row["status"],
+        "found": int(row["found"] or 0),
+        "created": int(row["created"] or 0),
+        "progress": _load_json_or_default(row["progress_json"], []),
+        "skipped": _load_json_or_default(row["skipped_json"], []),
+        "errors": _load_json_or_default(row["errors_json"], []),
+        "error": row["error"] or "",
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+    if job["status"] in ("queued", "running") and row["stale"]:
+        job["status"] = "failed"
+        job["error"] = "De import werd onderbroken. Probeer het opnieuw."
+    return job
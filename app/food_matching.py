@@ -16,7 +16,8 @@ als bij het labelen van een recept.
 
 import re
 
-from .tagging import _ALLERGEEN_REGELS, vernederlands
+from .ingredients import matchnaam as normaliseer
+from .tagging import _ALLERGEEN_REGELS
 
 # Zelfde zaak, andere naam. Wederzijds uitwisselbaar.
 SYNONIEMEN = [
@@ -77,13 +78,6 @@ SOORTEN = {
 _ALLERGEEN_PATRONEN = dict(_ALLERGEEN_REGELS)
 
 
-def normaliseer(term):
-    """Kleine letters, geen dubbele spaties, meervoud eraf waar dat veilig kan."""
-    token = re.sub(r"\s+", " ", str(term or "").strip().lower())
-    # "soya" en "chicken" komen nog uit oudere profielen.
-    return vernederlands(token)
-
-
 def _synoniemen_van(token):
     for groep in SYNONIEMEN:
         if token in groep:
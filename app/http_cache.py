@@ -0,0 +1,132 @@
+"""Schijfcache voor pagina's die de receptimport ophaalt.
+
+Wie een overzichtspagina een uur later opnieuw importeert, haalt grotendeels
+dezelfde pagina's op. Met deze cache gaat er dan per pagina een voorwaardelijk
+verzoek uit (If-None-Match / If-Modified-Since); antwoordt de site met 304,
+dan komt de pagina van schijf. Dat is sneller en vriendelijker voor de site.
+
+Per URL twee bestanden in CACHE_DIR: de body en een klein JSON-bestand met
+ETag en Last-Modified. Alleen antwoorden met zo'n validator worden bewaard,
+want zonder valt er niets te hervalideren. De map blijft onder MAX_CACHE_BYTES:
+daarboven verdwijnen de minst recent gebruikte pagina's (mtime van het
+metabestand, dat bij elke treffer wordt bijgewerkt).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from .http_client import verstuur
+from .logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = Path("data/http_cache")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_schrijf_lock = threading.Lock()
+
+
+def _paden(url):
+    sleutel = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{sleutel}.json", CACHE_DIR / f"{sleutel}.body"
+
+
+def _lees(url):
+    meta_pad, body_pad = _paden(url)
+    try:
+        meta = json.loads(meta_pad.read_text(encoding="utf-8"))
+        if meta.get("url") != url:
+            return None, None
+        return meta, body_pad.read_bytes()
+    except (OSError, ValueError):
+        return None, None
+
+
+def _schrijf_atomair(pad, data):
+    tijdelijk = pad.with_name(f"{pad.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tijdelijk.write_bytes(data)
+    os.replace(tijdelijk, pad)
+
+
+def _bewaar(url, body, etag, last_modified):
+    meta_pad, body_pad = _paden(url)
+    meta = {"url": url, "etag": etag or "", "last_modified": last_modified or "", "size": len(body)}
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Body eerst: een metabestand zonder body telt als missende cache.
+        _schrijf_atomair(body_pad, body)
+        _schrijf_atomair(meta_pad, json.dumps(meta).encode("utf-8"))
+    except OSError:
+        logger.warning("HTTP-cache niet schrijfbaar voor %s", url, exc_info=True)
+        return
+    _ruim_op()
+
+
+def _raak_aan(url):
+    """Markeert een treffer, voor de LRU-volgorde."""
+    try:
+        os.utime(_paden(url)[0])
+    except OSError:
+        pass
+
+
+def _ruim_op():
+    """Houdt de cache onder MAX_CACHE_BYTES door de oudste treffers te wissen."""
+    with _schrijf_lock:
+        try:
+            metas = list(CACHE_DIR.glob("*.json"))
+        except OSError:
+            return
+        items = []
+        totaal = 0
+        for meta_pad in metas:
+            body_pad = meta_pad.with_suffix(".body")
+            try:
+                grootte = body_pad.stat().st_size + meta_pad.stat().st_size
+                gebruikt = meta_pad.stat().st_mtime
+            except OSError:
+                continue
+            items.append((gebruikt, grootte, meta_pad, body_pad))
+            totaal += grootte
+        if totaal <= MAX_CACHE_BYTES:
+            return
+        for _, grootte, meta_pad, body_pad in sorted(items, key=lambda item: item[0]):
+            for pad in (meta_pad, body_pad):
+                try:
+                    pad.unlink()
+                except OSError:
+                    pass
+            totaal -= grootte
+            if totaal <= MAX_CACHE_BYTES:
+                break
+
+
+def haal_op(url, headers=None, timeout=25, max_bytes=None):
+    """GET met hervalidatie tegen de schijfcache; geeft de body terug.
+
+    Fouten van de HTTP-client (HTTPError, URLError) gaan naar boven; een 304
+    levert de bewaarde body. max_bytes geldt voor de uitgepakte body.
+    """
+    meta, body = _lees(url)
+    verzoek_headers = dict(headers or {})
+    if meta:
+        if meta.get("etag"):
+            verzoek_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            verzoek_headers["If-Modified-Since"] = meta["last_modified"]
+
+    with verstuur("GET", url, verzoek_headers, timeout=timeout) as antwoord:
+        if antwoord.status == 304 and meta:
+            antwoord.lees()
+            _raak_aan(url)
+            return body
+        inhoud = antwoord.lees(max_bytes)
+        etag = antwoord.headers.get("ETag")
+        last_modified = antwoord.headers.get("Last-Modified")
+
+    if etag or last_modified:
+        _bewaar(url, inhoud, etag, last_modified)
+    return inhoud
@@ -0,0 +1,350 @@
+"""Gedeelde HTTP-client voor de receptimport en de AI-calls.
+
+urllib.request.urlopen opent per verzoek een nieuwe verbinding: voor een
+import van twintig recepten van dezelfde site twintig keer een TCP- en
+TLS-handshake, en zonder compressie. Deze client houdt per host een kleine
+pool open verbindingen bij (keep-alive), vraagt gzip (en brotli, als die
+bibliotheek er is) en pakt dat gaandeweg uit.
+
+Het gedrag naar de aanroepers blijft dat van urlopen:
+  - statussen vanaf 400 worden urllib.error.HTTPError
+  - netwerkfouten en time-outs worden urllib.error.URLError
+  - redirects worden gevolgd (hoogstens MAX_REDIRECTS)
+
+Een uitzondering: 304 komt gewoon terug als antwoord, want die vraagt de
+HTTP-cache zelf aan.
+
+Zoals urlopen volgen we HTTP_PROXY, HTTPS_PROXY en NO_PROXY
+(urllib.request.getproxies): http gaat met de volledige URL naar de proxy,
+https door een CONNECT-tunnel. Gebruikersnaam en wachtwoord in de proxy-URL
+gaan mee als Proxy-Authorization.
+
+max_bytes begrenst de *uitgepakte* bytes. Een gecomprimeerde pagina van 400
+kB kan uitgepakt 40 MB zijn; het plafond moet gelden voor wat we in het
+geheugen krijgen, niet voor wat over de lijn kwam. Daarom pakken we uit in
+stukken van hoogstens LEESBLOK en stoppen we zodra het plafond bereikt is: ook
+een blok van 64 kB dat uitgepakt honderden MB zou worden, kost dan niet meer.
+"""
+
+import base64
+import http.client
+import io
+import select
+import ssl
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+
+try:  # optionele dependency: zonder brotli vragen we alleen gzip
+    import brotli
+except ImportError:  # pragma: no cover - alleen zonder dependency
+    brotli = None
+# Pas vanaf brotli 1.2 kan de uitvoer per stap begrensd worden; een oudere
+# versie gebruiken we niet, want daarmee geldt het plafond niet.
+if brotli is not None and not hasattr(brotli.Decompressor, "can_accept_more_data"):  # pragma: no cover
+    brotli = None
+
+MAX_IDLE_PER_HOST = 4
+MAX_REDIRECTS = 5
+LEESBLOK = 64 * 1024
+ACCEPT_ENCODING = "gzip, br" if brotli else "gzip"
+_REDIRECTS = {301, 302, 303, 307, 308}
+# Alleen deze mogen na een weggevallen antwoord opnieuw: een POST kan de server
+# al verwerkt hebben (bij OpenRouter: een betaalde completion).
+_HERHAALBAAR = {"GET", "HEAD"}
+
+_pool = {}
+_pool_lock = threading.Lock()
+_ssl_context = ssl.create_default_context()
+
+
+def _proxy(onderdelen):
+    """De proxy-URL voor deze URL volgens de omgeving, of ""."""
+    proxy = urllib.request.getproxies().get(onderdelen.scheme) or ""
+    if not proxy or urllib.request.proxy_bypass(onderdelen.hostname or ""):
+        return ""
+    return proxy if "://" in proxy else f"http://{proxy}"
+
+
+def _proxy_headers(proxy):
+    onderdelen = urllib.parse.urlsplit(proxy)
+    if not onderdelen.username:
+        return {}
+    gebruiker = urllib.parse.unquote(onderdelen.username)
+    wachtwoord = urllib.parse.unquote(onderdelen.password or "")
+    sleutel = base64.b64encode(f"{gebruiker}:{wachtwoord}".encode("utf-8")).decode("ascii")
+    return {"Proxy-Authorization": f"Basic {sleutel}"}
+
+
+def _pool_sleutel(onderdelen):
+    poort = onderdelen.port or (443 if onderdelen.scheme == "https" else 80)
+    return onderdelen.scheme, onderdelen.hostname or "", poort, _proxy(onderdelen)
+
+
+def _neem_verbinding(sleutel, timeout):
+    """Een vrije verbinding uit de pool, of een nieuwe: (verbinding, hergebruikt)."""
+    with _pool_lock:
+        vrij = _pool.get(sleutel) or []
+        while vrij:
+            verbinding = vrij.pop()
+            if _nog_open(verbinding):
+                verbinding.sock.settimeout(timeout)
+                verbinding.timeout = timeout
+                return verbinding, True
+    schema, host, poort, proxy = sleutel
+    if proxy:
+        via = urllib.parse.urlsplit(proxy)
+        if schema == "https":
+            verbinding = http.client.HTTPSConnection(
+                via.hostname, via.port or 80, timeout=timeout, context=_ssl_context
+            )
+            verbinding.set_tunnel(host, poort, headers=_proxy_headers(proxy))
+            return verbinding, False
+        return http.client.HTTPConnection(via.hostname, via.port or 80, timeout=timeout), False
+    if schema == "https":
+        return http.client.HTTPSConnection(host, poort, timeout=timeout, context=_ssl_context), False
+    return http.client.HTTPConnection(host, poort, timeout=timeout), False
+
+
+def _nog_open(verbinding):
+    """False als de server een vrije verbinding intussen sloot.
+
+    Een gesloten socket is leesbaar (EOF), en op een vrije verbinding hoort
+    niets te wachten; beide gevallen zijn niet meer bruikbaar.
+    """
+    if verbinding.sock is None:
+        return False
+    try:
+        leesbaar, _, _ = select.select([verbinding.sock], [], [], 0)
+    except (OSError, ValueError):
+        leesbaar = True
+    if leesbaar:
+        verbinding.close()
+        return False
+    return True
+
+
+def _geef_terug(sleutel, verbinding):
+    with _pool_lock:
+        vrij = _pool.setdefault(sleutel, [])
+        if len(vrij) < MAX_IDLE_PER_HOST:
+            vrij.append(verbinding)
+            return
+    verbinding.close()
+
+
+def sluit_alles():
+    """Sluit alle open verbindingen; voor tests en bij afsluiten."""
+    with _pool_lock:
+        verbindingen = [v for vrij in _pool.values() for v in vrij]
+        _pool.clear()
+    for verbinding in verbindingen:
+        verbinding.close()
+
+
+def _uitpakker(codering):
+    codering = (codering or "").strip().lower()
+    if codering in ("gzip", "x-gzip"):
+        return _ZlibUitpakker(16 + zlib.MAX_WBITS)
+    if codering == "deflate":
+        return _ZlibUitpakker(zlib.MAX_WBITS)
+    if codering == "br" and brotli is not None:
+        return _BrotliUitpakker()
+    return None
+
+
+class _ZlibUitpakker:
+    """gzip en deflate, met begrensde uitvoer per stap."""
+
+    def __init__(self, wbits):
+        self._decompressor = zlib.decompressobj(wbits)
+
+    def stukken(self, data):
+        """De uitgepakte stukken van data, elk hoogstens LEESBLOK bytes."""
+        while True:
+            blok = self._decompressor.decompress(data, LEESBLOK)
+            data = self._decompressor.unconsumed_tail
+            if blok:
+                yield blok
+            # Een vol blok kan nog uitvoer achter zich hebben, ook zonder invoer.
+            if not data and len(blok) < LEESBLOK:
+                return
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+# brotli laat zijn uitvoerbuffer in stappen van zo'n 32 kB groeien en stopt pas
+# als die de grens haalt; met een kwart LEESBLOK blijft elk stuk eronder.
+_BROTLI_GRENS = LEESBLOK // 4
+
+
+class _BrotliUitpakker:
+    """Zelfde interface als _ZlibUitpakker."""
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def stukken(self, data):
+        blok = self._decompressor.process(data, output_buffer_limit=_BROTLI_GRENS)
+        # De rest van de uitvoer komt met lege invoer, tot er niets meer klaarstaat.
+        while blok:
+            yield blok
+            blok = self._decompressor.process(b"", output_buffer_limit=_BROTLI_GRENS)
+
+    def flush(self):
+        return b""
+
+
+class Antwoord:
+    """Een HTTP-antwoord waarvan de body gaandeweg en uitgepakt gelezen wordt.
+
+    Na het volledig lezen gaat de verbinding terug naar de pool; wie stopt
+    voor het einde (plafond bereikt, stroom afgebroken) sluit haar.
+    """
+
+    def __init__(self, url, antwoord, verbinding, sleutel):
+        self.url = url
+        self.status = antwoord.status
+        self.reason = antwoord.reason
+        self.headers = antwoord.headers
+        self._antwoord = antwoord
+        self._verbinding = verbinding
+        self._sleutel = sleutel
+        self._uitpakker = _uitpakker(antwoord.headers.get("Content-Encoding"))
+
+    def _blokken(self):
+        """Uitgepakte stukken body van hoogstens LEESBLOK, zoals ze binnenkomen.
+
+        Lui: wie stopt met lezen, laat de rest ook ongepakt.
+        """
+        while True:
+            ruw = self._antwoord.read1(LEESBLOK)
+            if not ruw:
+                break
+            if self._uitpakker:
+                yield from self._uitpakker.stukken(ruw)
+            else:
+                yield ruw
+        if self._uitpakker:
+            rest = self._uitpakker.flush()
+            if rest:
+                yield rest
+        self._klaar()
+
+    def lees(self, max_bytes=None):
+        """De hele body, uitgepakt; met max_bytes afgekapt op zoveel bytes."""
+        buffer = io.BytesIO()
+        try:
+            for blok in self._blokken():
+                if max_bytes is not None and buffer.tell() + len(blok) >= max_bytes:
+                    buffer.write(blok[:max_bytes - buffer.tell()])
+                    self.sluit()
+                    break
+                buffer.write(blok)
+        except (OSError, http.client.HTTPException, zlib.error) as exc:
+            self.sluit()
+            raise urllib.error.URLError(exc) from exc
+        return buffer.getvalue()
+
+    def __iter__(self):
+        """Regel per regel, voor streams zoals SSE."""
+        rest = b""
+        try:
+            for blok in self._blokken():
+                rest += blok
+                *regels, rest = rest.split(b"\n")
+                for regel in regels:
+                    yield regel + b"\n"
+        except (OSError, http.client.HTTPException, zlib.error) as exc:
+            self.sluit()
+            raise urllib.error.URLError(exc) from exc
+        if rest:
+            yield rest
+
+    def _klaar(self):
+        verbinding, self._verbinding = self._verbinding, None
+        if verbinding is None:
+            return
+        # Sluit alleen het antwoord; de socket blijft open voor het volgende verzoek.
+        self._antwoord.close()
+        if self._antwoord.will_close:
+            verbinding.close()
+        else:
+            _geef_terug(self._sleutel, verbinding)
+
+    def sluit(self):
+        verbinding, self._verbinding = self._verbinding, None
+        if verbinding is not None:
+            verbinding.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.sluit()
+
+
+def _stuur_een_keer(methode, url, headers, body, timeout):
+    onderdelen = urllib.parse.urlsplit(url)
+    if onderdelen.scheme not in ("http", "https") or not onderdelen.hostname:
+        raise urllib.error.URLError(f"ongeldige URL: {url}")
+    pad = urllib.parse.urlunsplit(("", "", onderdelen.path or "/", onderdelen.query, ""))
+    sleutel = _pool_sleutel(onderdelen)
+    alle_headers = {"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive", **(headers or {})}
+    proxy = sleutel[3]
+    if proxy and onderdelen.scheme == "http":
+        # Zonder tunnel krijgt de proxy de volledige URL.
+        pad = f"http://{onderdelen.netloc.rpartition('@')[2]}{pad}"
+        alle_headers.update(_proxy_headers(proxy))
+
+    for poging in range(2):
+        verbinding, hergebruikt = _neem_verbinding(sleutel, timeout)
+        # Een verbinding uit de pool die de server intussen sloot: één keer
+        # opnieuw met een verse. Een verse verbinding die faalt is een echte fout.
+        opnieuw = hergebruikt and poging == 0
+        try:
+            verbinding.request(methode, pad, body=body, headers=alle_headers)
+        except (ConnectionResetError, BrokenPipeError) as exc:
+            # Het verzoek kwam niet aan: ook een POST mag opnieuw.
+            verbinding.close()
+            if opnieuw:
+                continue
+            raise urllib.error.URLError(exc) from exc
+        except (OSError, http.client.HTTPException) as exc:
+            verbinding.close()
+            raise urllib.error.URLError(exc) from exc
+        try:
+            return Antwoord(url, verbinding.getresponse(), verbinding, sleutel)
+        except (http.client.RemoteDisconnected, ConnectionResetError) as exc:
+            # Het verzoek is verstuurd: alleen herhalen als dat geen kwaad kan.
+            verbinding.close()
+            if opnieuw and methode in _HERHAALBAAR:
+                continue
+            raise urllib.error.URLError(exc) from exc
+        except (OSError, http.client.HTTPException) as exc:
+            verbinding.close()
+            raise urllib.error.URLError(exc) from exc
+    raise urllib.error.URLError("verbinding mislukt")  # pragma: no cover
+
+
+def verstuur(methode, url, headers=None, body=None, timeout=30):
+    """Verstuurt een verzoek en geeft een Antwoord terug; te gebruiken met `with`."""
+    for _ in range(MAX_REDIRECTS + 1):
+        antwoord = _stuur_een_keer(methode, url, headers, body, timeout)
+        if antwoord.status in _REDIRECTS and antwoord.headers.get("Location"):
+            antwoord.lees(LEESBLOK)
+            antwoord.sluit()
+            url = urllib.parse.urljoin(url, antwoord.headers["Location"])
+            # Zoals browsers en urllib: na 303, of na 301/302 op een POST, wordt het een GET.
+            if antwoord.status == 303 or (antwoord.status in (301, 302) and methode == "POST"):
+                methode, body = "GET", None
+                headers = {k: v for k, v in (headers or {}).items() if k.lower() != "content-type"}
+            continue
+        if antwoord.status >= 400:
+            inhoud = antwoord.lees(LEESBLOK)
+            raise urllib.error.HTTPError(url, antwoord.status, antwoord.reason, antwoord.headers, io.BytesIO(inhoud))
+        return antwoord
+    raise urllib.error.URLError(f"te veel redirects voor {url}")
@@ -0,0 +1,159 @@
+"""Ingredientnamen normaliseren, op één plek.
+
+Drie delen van de app kijken naar ingredientnamen, elk met hun eigen doel:
+
+  - de boodschappenlijst voegt "olive oil" en "olijfolie" samen (boodschapnaam)
+  - de kcal-schatting zoekt een naam op in de energietabel (opzoeknaam)
+  - de allergiecontrole vergelijkt met wat de gebruiker opgaf (matchnaam)
+
+Ze delen dezelfde basisstap (kleine letters, één spatie ertussen) en krijgen
+steeds dezelfde paar honderd namen te zien: een boodschappenlijst van een week
+of een import van twintig recepten herhaalt "ui" en "olijfolie" tientallen
+keren. Daarom staan de tabellen en patronen hier klaar bij het laden, en
+onthoudt elke functie haar laatste uitkomsten in een begrensde LRU.
+"""
+
+import re
+from functools import lru_cache
+
+from .tagging import vernederlands
+
+# Genoeg voor alle namen uit de receptenbank en de eigen gerechten; daarboven
+# vallen de minst gebruikte eruit.
+CACHE_GROOTTE = 4096
+
+# Engelse en afwijkende namen op de boodschappenlijst, naar de naam waaronder
+# ze samengeteld worden.
+BOODSCHAP_ALIASSEN = {
+    "look": "knoflook",
+    "garlic": "knoflook",
+    "clove garlic": "knoflook",
+    "olive oil": "olijfolie",
+    "olijf olie": "olijfolie",
+    "bay leaf": "laurierblad",
+    "bay leaves": "laurierblad",
+    "carrot": "wortel",
+    "carrots": "wortelen",
+    "onion": "ui",
+    "red onion": "rode ui",
+    "white onion": "witte ui",
+    "potato": "aardappel",
+    "potatoes": "aardappelen",
+    "tomato": "tomaat",
+    "tomatoes": "tomaten",
+    "cherry tomatoes": "cherrytomaten",
+    "bell pepper": "paprika",
+    "cucumber": "komkommer",
+    "zucchini": "courgette",
+    "spinach": "spinazie",
+    "broccoli": "broccoli",
+    "mushroom": "champignon",
+    "mushrooms": "champignons",
+    "parsley": "peterselie",
+    "coriander": "koriander",
+    "basil": "basilicum",
+    "oregano": "oregano",
+    "thyme": "tijm",
+    "rosemary": "rozemarijn",
+    "mint": "munt",
+    "cumin": "komijn",
+    "paprika": "paprikapoeder",
+    "chili powder": "chilipoeder",
+    "black pepper": "zwarte peper",
+    "pepper": "peper",
+    "salt": "zout",
+    "rice": "rijst",
+    "pasta": "pasta",
+    "spaghetti": "spaghetti",
+    "noodles": "noedels",
+    "couscous": "couscous",
+    "bread": "brood",
+    "flour": "bloem",
+    "chickpeas": "kikkererwten",
+    "lentils": "linzen",
+    "beans": "bonen",
+    "chicken stock": "kippenbouillon",
+    "vegetable stock": "groentebouillon",
+    "beef stock": "runderbouillon",
+    "milk": "melk",
+    "cream": "room",
+    "butter": "boter",
+    "cheese": "kaas",
+    "egg": "ei",
+    "eggs": "eieren",
+    "salmon": "zalm",
+    "cod": "kabeljauw",
+    "tuna": "tonijn",
+    "prawns": "garnalen",
+    "shrimp": "garnalen",
+    "beef": "rundvlees",
+    "ground beef": "rundergehakt",
+    "minced beef": "rundergehakt",
+    "turkey": "kalkoen",
+    "chicken": "kipfilet",
+    "chicken breast": "kipfilet",
+    "kip": "kipfilet",
+    "lemon": "citroen",
+    "lemon juice": "citroensap",
+    "lime": "limoen",
+    "lime juice": "limoensap",
+}
+
+# Woorden die iets zeggen over de bereiding, niet over wat het is.
+_RUIS = re.compile(
+    r"\b(vers(e)?|fijn(gesneden|gehakt)?|grof(gesneden)?|geraspt(e)?|gesneden|gehakt|"
+    r"gepeld(e)?|geschild(e)?|gewassen|gekookt(e)?|rauw(e)?|gedroogd(e)?|"
+    r"in blokjes|in reepjes|in plakjes|naar smaak|optioneel|om te|voor de|voor het|"
+    r"op kamertemperatuur|ongezouten|gezouten|extra|groot|grote|klein(e)?|middelgrote)\b",
+    re.I,
+)
+_HAAKJES = re.compile(r"\([^)]*\)")
+_GEEN_LETTER = re.compile(r"[^a-zà-ÿ\s-]")
+_SPATIES = re.compile(r"\s+")
+
+
+def token(naam):
+    """Kleine letters, zonder witruimte rond en met één spatie ertussen."""
+    return " ".join(str(naam or "").strip().lower().split())
+
+
+@lru_cache(maxsize=CACHE_GROOTTE)
+def _boodschapnaam(tekst):
+    schoon = token(tekst)
+    return BOODSCHAP_ALIASSEN.get(schoon, schoon)
+
+
+@lru_cache(maxsize=CACHE_GROOTTE)
+def _opzoeknaam(tekst):
+    tekst = _HAAKJES.sub(" ", tekst.lower())   # haakjes weg
+    tekst = tekst.split(",")[0]                 # alles na de eerste komma weg
+    tekst = _RUIS.sub(" ", tekst)
+    tekst = _GEEN_LETTER.sub(" ", tekst)
+    return _SPATIES.sub(" ", tekst).strip()
+
+
+@lru_cache(maxsize=CACHE_GROOTTE)
+def _matchnaam(tekst):
+    # "soya" en "chicken" komen nog uit oudere profielen.
+    return vernederlands(token(tekst))
+
+
+def boodschapnaam(naam):
+    """De naam waaronder een ingredient op de boodschappenlijst samengeteld wordt."""
+    return _boodschapnaam(str(naam or ""))
+
+
+def opzoeknaam(naam):
+    """Maakt van een ingredientregel een naam die we in de energietabel kunnen opzoeken."""
+    return _opzoeknaam(str(naam or ""))
+
+
+def matchnaam(term):
+    """Kleine letters, geen dubbele spaties, Engelse termen naar het Nederlands."""
+    return _matchnaam(str(term or ""))
+
+
+def wis_caches():
+    """Leegt de LRU's; voor tests en na het wijzigen van de tabellen."""
+    for functie in (_boodschapnaam, _opzoeknaam, _matchnaam):
+        functie.cache_clear()
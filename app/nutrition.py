@@ -15,6 +15,7 @@ zichtbaar blijft hoe compleet de schatting is.
 
 import re
 
+from .ingredients import opzoeknaam as normaliseer
 from .logging_setup import get_logger
 
 logger = get_logger(__name__)
@@ -57,6 +58,9 @@ PORTIE_GRENS = 12
 # Bovengrens per ingredient, zodat een verkeerd gelezen regel de hele schatting
 # niet onbruikbaar maakt.
 MAX_GRAM_PER_INGREDIENT = 5000.0
+# Onder deze dekking (aandeel herkende ingredienten) is een schatting te
+# onbetrouwbaar om op te slaan.
+MIN_DEKKING = 0.6
 # Frituurolie blijft grotendeels in de pan; ongeveer dit deel wordt opgenomen.
 OLIE_OPNAME = 0.12
 _IS_FRITUUROLIE = re.compile(r"frituur|frituren|frying|fryer|deep[- ]?fry", re.I)
@@ -186,15 +190,6 @@ KCAL_PER_100G = {
     "shaoxing-wijn": 130, "water": 0, "karnemelk": 40, "shirodashi": 50,
 }
 
-# Woorden die niets over het ingredient zeggen en het matchen in de weg zitten.
-_RUIS = re.compile(
-    r"\b(vers(e)?|fijn(gesneden|gehakt)?|grof(gesneden)?|geraspt(e)?|gesneden|gehakt|"
-    r"gepeld(e)?|geschild(e)?|gewassen|gekookt(e)?|rauw(e)?|gedroogd(e)?|"
-    r"in blokjes|in reepjes|in plakjes|naar smaak|optioneel|om te|voor de|voor het|"
-    r"op kamertemperatuur|ongezouten|gezouten|extra|groot|grote|klein(e)?|middelgrote)\b",
-    re.I,
-)
-
 
 def seed_database():
     """Zet de ingebouwde tabel in de database, zonder eigen correcties te overschrijven."""
@@ -206,19 +201,25 @@ def seed_database():
     return toegevoegd
 
 
-def tabel_uit_database():
-    """Leest de energietabel uit de database; valt terug op de ingebouwde tabel."""
-    from .db import list_ingredient_energy
+class _Energietabel:
+    """De energietabel uit de database zoals één worker hem in het geheugen houdt.
 
-    try:
-        rijen = list_ingredient_energy()
-    except Exception:
-        logger.exception("Energietabel niet leesbaar; ingebouwde waarden gebruikt.")
-        return dict(KCAL_PER_100G), dict(GRAM_PER_STUK)
+    sleutel is (databasepad, versie uit cache_versions). De zoekindexen horen
+    bij de tabel en worden pas gebouwd als ze nodig zijn.
+    """
 
+    def __init__(self, sleutel, kcal, gram):
+        self.sleutel = sleutel
+        self.tabellen = {"kcal": kcal, "gram": gram}
+        self.indexen = {}
+
+
+_energietabel = None
+
+
+def _tabellen_uit_rijen(rijen):
     if not rijen:
         return dict(KCAL_PER_100G), dict(GRAM_PER_STUK)
-
     kcal = {naam: waarde[0] for naam, waarde in rijen.items()}
     # Stukgewichten zijn omrekening, geen voedingsdata: die blijven in code staan.
     # Wat in de database is ingevuld gaat er wel overheen.
@@ -227,24 +228,94 @@ def tabel_uit_database():
     return kcal, gram
 
 
-def normaliseer(naam):
-    """Maakt van een ingredientregel een naam die we kunnen opzoeken."""
-    tekst = str(naam or "").lower()
-    tekst = re.sub(r"\([^)]*\)", " ", tekst)      # haakjes weg
-    tekst = tekst.split(",")[0]                    # alles na de eerste komma weg
-    tekst = _RUIS.sub(" ", tekst)
-    tekst = re.sub(r"[^a-zà-ÿ\s-]", " ", tekst)
-    return re.sub(r"\s+", " ", tekst).strip()
+def tabel_uit_database():
+    """Leest de energietabel uit de database; valt terug op de ingebouwde tabel.
+
+    Per worker gecachet: zolang de versie in cache_versions niet wijzigt (dat
+    doet upsert_ingredient_energy), kost een aanroep één kleine query in plaats
+    van de hele tabel. De teruggegeven dicts worden gedeeld; niet wijzigen.
+    """
+    global _energietabel
+    from . import db
+
+    try:
+        sleutel = (str(db.DB_PATH), db.get_cache_version(db.INGREDIENT_ENERGY_CACHE))
+        huidig = _energietabel
+        if huidig is not None and huidig.sleutel == sleutel:
+            return huidig.tabellen["kcal"], huidig.tabellen["gram"]
+        rijen = db.list_ingredient_energy()
+    except Exception:
+        logger.exception("Energietabel niet leesbaar; ingebouwde waarden gebruikt.")
+        return dict(KCAL_PER_100G), dict(GRAM_PER_STUK)
+
+    kcal, gram = _tabellen_uit_rijen(rijen)
+    _energietabel = _Energietabel(sleutel, kcal, gram)
+    return kcal, gram
+
+
+# Een sleutel past als (deel van een) woord dat erop eindigt. Nederlands plakt
+# samenstellingen aan elkaar, dus "frietaardappelen" mag op "aardappel" matchen.
+# Maar letters erna zijn niet toegestaan, anders vindt de sleutel "ui" ook
+# "ruimtevaartsoep". Een meervouds- of verkleinuitgang mag wel.
+_ACHTERVOEGSELS = r"(?:s|en|es|je|jes|tje|tjes)?(?![a-z])"
 
 
-def _past_als_woord(sleutel, tekst):
-    """True als de sleutel als (deel van een) woord eindigt in de tekst.
+class _SleutelIndex:
+    """Alle sleutels van een tabel in één regex, om de langste treffer te vinden.
 
-    Nederlands plakt samenstellingen aan elkaar, dus "frietaardappelen" mag op
-    "aardappel" matchen. Maar letters erna zijn niet toegestaan, anders vindt de
-    sleutel "ui" ook "ruimtevaartsoep".
+    Voorheen werd per sleutel een eigen regex gezocht: bij ~400 sleutels
+    duizenden zoekopdrachten per recept. Nu staan ze in één alternatie, langste
+    eerst, in een lookahead: op elke positie in de tekst levert die de langste
+    sleutel die daar past. Over alle posities wint de langste; bij gelijke
+    lengte de sleutel die eerst in de tabel staat, zoals vroeger.
     """
-    return re.search(rf"{re.escape(sleutel)}(?:s|en|es|je|jes|tje|tjes)?(?![a-z])", tekst) is not None
+
+    def __init__(self, sleutels):
+        self.volgorde = {sleutel: positie for positie, sleutel in enumerate(sleutels)}
+        gesorteerd = sorted((s for s in self.volgorde if s), key=len, reverse=True)
+        self.patroon = None
+        if gesorteerd:
+            alternatie = "|".join(re.escape(sleutel) for sleutel in gesorteerd)
+            self.patroon = re.compile(rf"(?=({alternatie}){_ACHTERVOEGSELS})")
+        # Een lege sleutel past overal, dus alleen als niets anders past.
+        self.leeg = "" in self.volgorde
+
+    def langste(self, tekst):
+        beste = None
+        if self.patroon is not None:
+            for treffer in self.patroon.finditer(tekst):
+                sleutel = treffer.group(1)
+                if (
+                    beste is None
+                    or len(sleutel) > len(beste)
+                    or (len(sleutel) == len(beste) and self.volgorde[sleutel] < self.volgorde[beste])
+                ):
+                    beste = sleutel
+        if beste is None and self.leeg:
+            return ""
+        return beste
+
+
+# Per soort tabel de laatst gebruikte tabel en haar index, voor tabellen die
+# niet uit tabel_uit_database komen (die dragen hun indexen zelf mee). De tabel
+# zelf wordt vastgehouden, zodat een nieuwe tabel nooit het id() van de oude
+# kan krijgen.
+_INDEXEN = {}
+
+
+def _index_voor(soort, tabel, sleutels):
+    gedeeld = _energietabel
+    if gedeeld is not None and gedeeld.tabellen[soort] is tabel:
+        index = gedeeld.indexen.get(soort)
+        if index is None:
+            index = gedeeld.indexen[soort] = _SleutelIndex(sleutels)
+        return index
+    vorige = _INDEXEN.get(soort)
+    if vorige is not None and vorige[0] is tabel and vorige[1] == len(tabel):
+        return vorige[2]
+    index = _SleutelIndex(sleutels)
+    _INDEXEN[soort] = (tabel, len(tabel), index)
+    return index
 
 
 def kcal_per_100g(naam, tabel=None):
@@ -260,12 +331,9 @@ def kcal_per_100g(naam, tabel=None):
     # Samenstellingen: "frietaardappelen" bevat "aardappel", "kipfilets" bevat
     # "kipfilet". Langste treffer wint, zodat "zoete aardappel" niet op
     # "aardappel" uitkomt.
-    beste = None
-    for sleutel, waarde in tabel.items():
-        if _past_als_woord(sleutel, schoon) and (beste is None or len(sleutel) > len(beste[0])):
-            beste = (sleutel, waarde)
-    if beste:
-        return beste[1]
+    sleutel = _index_voor("kcal", tabel, tabel).langste(schoon)
+    if sleutel is not None:
+        return tabel[sleutel]
 
     # Laatste poging op het hoofdwoord.
     woorden = schoon.split()
@@ -297,16 +365,11 @@ def gram_van(ingredient, gram_tabel=None):
     # in plaats van op "briochebroodje" (70 g).
     schoon = normaliseer((ingredient or {}).get("name"))
     tabel = gram_tabel if gram_tabel is not None else GRAM_PER_STUK
-    beste = None
-    for sleutel, gram in tabel.items():
-        if not gram:
-            continue
-        if sleutel == schoon:
-            beste = (sleutel, gram)
-            break
-        if _past_als_woord(sleutel, schoon) and (beste is None or len(sleutel) > len(beste[0])):
-            beste = (sleutel, gram)
-    per_stuk = beste[1] if beste else STUK_STANDAARD
+    if tabel.get(schoon):
+        per_stuk = tabel[schoon]
+    else:
+        sleutel = _index_voor("gram", tabel, [s for s, gram in tabel.items() if gram]).langste(schoon)
+        per_stuk = tabel[sleutel] if sleutel is not None else STUK_STANDAARD
     return min(hoeveelheid * per_stuk, MAX_GRAM_PER_INGREDIENT)
 
 
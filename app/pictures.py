@@ -0,0 +1,176 @@
+"""Eigen foto's van maaltijden: verkleinen, opschonen en varianten maken.
+
+Een foto van een gsm is al snel 4000 px breed en enkele MB groot, terwijl de
+kalender en de maaltijdkaarten hem tonen op een paar honderd pixels. Bij het
+uploaden maken we daarom:
+
+  - het hoofdbeeld: JPEG, hoogstens MAX_ZIJDE px, rechtgezet volgens de
+    EXIF-oriëntatie en zonder EXIF (geen GPS-locatie van je keuken online)
+  - varianten op BREEDTES in WebP, en in AVIF als Pillow dat kan schrijven
+
+De varianten heten zoals het hoofdbeeld met de breedte erachter:
+custom_3_ab12.jpg krijgt custom_3_ab12-320.webp, custom_3_ab12-640.avif, ...
+Is de foto smaller dan een breedte, dan is die variant even breed als de foto.
+Daarom staat naast de varianten custom_3_ab12.json met per formaat de namen
+en hun echte breedtes; die wordt als laatste geschreven, dus bestaat hij, dan
+zijn de varianten compleet. De frontend zet ze in een srcset en de browser
+kiest zelf formaat en breedte.
+Bestandsnamen zijn uniek per upload, dus alles mag onbeperkt gecachet worden.
+
+Pillow is optioneel, zoals brotli in http_client: zonder wordt de foto
+bewaard zoals hij binnenkwam, zonder varianten.
+"""
+
+import json
+import os
+from pathlib import Path
+
+try:  # optionele dependency: zonder Pillow geen varianten
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - alleen zonder dependency
+    Image = None
+
+from .logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+MAX_ZIJDE = 2048
+BREEDTES = (320, 640, 1280)
+JPEG_KWALITEIT = 85
+# Per extensie: Pillow-formaat en opties. AVIF schrijft traag; speed 8 is
+# gemeten vier keer sneller dan 6 voor nagenoeg hetzelfde aantal bytes.
+FORMATEN = {"webp": ("WEBP", {"quality": 80, "method": 4})}
+if Image is not None and features.check("avif"):
+    FORMATEN["avif"] = ("AVIF", {"quality": 60, "speed": 8})
+
+PAD_PREFIX = "/pictures/"
+LIJST_EXTENSIE = ".json"
+
+
+def fotomap(app):
+    """De map met eigen foto's: data/pictures naast de app."""
+    return Path(app.root_path).parent / "data" / "pictures"
+
+
+class OnleesbareFoto(ValueError):
+    """De upload is geen afbeelding die we kunnen openen."""
+
+
+def _naar_rgb(beeld):
+    """RGB voor JPEG; transparantie op een witte achtergrond."""
+    if beeld.mode in ("RGBA", "LA") or (beeld.mode == "P" and "transparency" in beeld.info):
+        beeld = beeld.convert("RGBA")
+        achtergrond = Image.new("RGB", beeld.size, (255, 255, 255))
+        achtergrond.paste(beeld, mask=beeld.getchannel("A"))
+        return achtergrond
+    return beeld.convert("RGB")
+
+
+def _lijst(doelmap, stam):
+    return doelmap / f"{stam}{LIJST_EXTENSIE}"
+
+
+def _schrijf_varianten(beeld, doelmap, stam):
+    """Schrijft de varianten van een RGB-beeld en hun lijst; geeft de bestandsnamen terug."""
+    per_formaat = {extensie: [] for extensie in FORMATEN}
+    for breedte in BREEDTES:
+        kopie = beeld.copy()
+        kopie.thumbnail((breedte, breedte * 4))
+        for extensie, (formaat, opties) in FORMATEN.items():
+            naam = f"{stam}-{breedte}.{extensie}"
+            kopie.save(doelmap / naam, formaat, **opties)
+            per_formaat[extensie].append((naam, kopie.width))
+        # Niet groter maken dan het origineel: de volgende breedte zou hetzelfde beeld zijn.
+        if kopie.width < breedte:
+            break
+    tijdelijk = doelmap / f".{stam}{LIJST_EXTENSIE}"
+    tijdelijk.write_text(json.dumps(per_formaat), encoding="utf-8")
+    os.replace(tijdelijk, _lijst(doelmap, stam))
+    return [naam for varianten in per_formaat.values() for naam, _ in varianten]
+
+
+def bewaar_upload(bestand, doelmap, stam, extensie):
+    """Bewaart een geüploade foto met zijn varianten; geeft de bestandsnaam van het hoofdbeeld.
+
+    bestand is een bestandsobject (zoals werkzeug's FileStorage). Zonder Pillow
+    komt het bestand ongewijzigd onder stam + extensie. OnleesbareFoto als
+    Pillow het bestand niet kan openen.
+    """
+    doelmap = Path(doelmap)
+    doelmap.mkdir(parents=True, exist_ok=True)
+    if Image is None:
+        naam = f"{stam}{extensie}"
+        bestand.save(doelmap / naam)
+        return naam
+
+    try:
+        with Image.open(bestand) as origineel:
+            # JPEG kan al verkleind decoderen: veel sneller voor gsm-foto's.
+            origineel.draft("RGB", (MAX_ZIJDE, MAX_ZIJDE))
+            beeld = ImageOps.exif_transpose(origineel)
+            beeld.thumbnail((MAX_ZIJDE, MAX_ZIJDE))
+            beeld = _naar_rgb(beeld)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise OnleesbareFoto(str(exc)) from exc
+
+    naam = f"{stam}.jpg"
+    # Zonder exif= schrijft Pillow geen EXIF mee.
+    beeld.save(doelmap / naam, "JPEG", quality=JPEG_KWALITEIT, optimize=True, progressive=True)
+    namen = _schrijf_varianten(beeld, doelmap, stam)
+    logger.info("Foto %s bewaard (%dx%d) met %d varianten.", naam, beeld.width, beeld.height, len(namen))
+    return naam
+
+
+# Gevonden srcsets per stam. Alleen wat bestaat wordt onthouden: een foto van
+# voor de varianten kan ze later nog krijgen (flask meals picture-variants),
+# ook vanuit een ander proces. Een foto zonder kost zo één open van de lijst.
+_gevonden = {}
+
+
+def _srcsets(doelmap, stam):
+    sleutel = (str(doelmap), stam)
+    if sleutel in _gevonden:
+        return _gevonden[sleutel]
+    try:
+        lijst = json.loads(_lijst(doelmap, stam).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    per_formaat = {}
+    for extensie in ("avif", "webp"):
+        delen = [f"{PAD_PREFIX}{naam} {breedte}w" for naam, breedte in lijst.get(extensie) or []]
+        if delen:
+            per_formaat[extensie] = ", ".join(delen)
+    _gevonden[sleutel] = per_formaat or None
+    return _gevonden[sleutel]
+
+
+def varianten(image_url, doelmap):
+    """{"avif": srcset, "webp": srcset} voor een eigen foto, of None als er geen zijn.
+
+    Enkel voor foto's onder /pictures/; externe URL's hebben geen varianten.
+    Een bestandsnaam wordt nooit hergebruikt, dus gevonden varianten blijven
+    kloppen en hoeven maar één keer gezocht.
+    """
+    naam = str(image_url or "").removeprefix(PAD_PREFIX)
+    if naam == str(image_url or "") or not naam or "/" in naam:
+        return None
+    return _srcsets(Path(doelmap), Path(naam).stem)
+
+
+def maak_varianten(pad):
+    """Varianten voor een bestaande foto, zonder het origineel aan te raken; geeft hun aantal.
+
+    Voor foto's van voor deze module. Bestaan ze al met hun lijst, dan gebeurt
+    er niets; zonder lijst worden ze opnieuw gemaakt.
+    """
+    pad = Path(pad)
+    if Image is None or _lijst(pad.parent, pad.stem).is_file():
+        return 0
+    try:
+        with Image.open(pad) as origineel:
+            origineel.draft("RGB", (BREEDTES[-1], BREEDTES[-1]))
+            beeld = _naar_rgb(ImageOps.exif_transpose(origineel))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Geen varianten voor %s: onleesbaar.", pad.name)
+        return 0
+    return len(_schrijf_varianten(beeld, pad.parent, pad.stem))
@@ -6,8 +6,11 @@ Twee vormen, allebei door de gebruiker gestart:
   2. Een overzichtspagina of site: verzamel de receptlinks die erop staan en
      importeer die in één keer.
 
-De zware parsing komt van `recipe-scrapers`, dat honderden sites kent en per site
-weet waar de ingredienten en stappen staan. Waar dat tekortschiet vult
+De meeste receptpagina's geven het recept als schema.org-JSON-LD mee. Dat lezen
+we eerst rechtstreeks: alleen de <script>-blokken, zonder de hele pagina te
+parsen. Ontbreekt er iets wezenlijks (titel, ingredienten, stappen), dan neemt
+`recipe-scrapers` het over; dat kent honderden sites en weet per site waar de
+ingredienten en stappen staan. Waar allebei tekortschieten vult
 `_SITE_AANVULLINGEN` aan.
 
 Wat de import bewust *niet* doet:
@@ -17,19 +20,30 @@ Wat de import bewust *niet* doet:
     bereidingsteksten en fotos zijn werk van de auteur; die horen niet in een
     publieke repository terecht te komen.
   - Geen paden ophalen die robots.txt verbiedt bij het verzamelen van links.
-  - Niet hameren op een site: één verzoek tegelijk, met pauze ertussen.
+  - Niet hameren op een site: hoogstens twee verzoeken tegelijk per site, en
+    een minimale tijd tussen twee verzoeken (of de Crawl-delay uit robots.txt,
+    als die langer is). Binnen die grenzen lopen de recepten van een
+    overzichtspagina wel tegelijk, zodat één trage pagina de rest niet ophoudt.
+  - Niet alles opnieuw downloaden: pagina's en robots.txt gaan via een
+    schijfcache die met ETag/Last-Modified hervalideert (zie http_cache), en
+    de robots-regels per site blijven een uur in het geheugen.
 """
 
 import json
 import re
+import threading
 import time
 import urllib.error
 import urllib.parse
-import urllib.request
 import urllib.robotparser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from html import unescape
 
+from .http_cache import haal_op
 from .logging_setup import get_logger
-from .units import metriek_uit_haakjes, naar_metriek, parse_getal, tekst_naar_metriek
+from .units import ontleed_regel as _ingredient_ontleden
+from .units import tekst_naar_metriek
 
 logger = get_logger(__name__)
 
@@ -38,9 +52,14 @@ USER_AGENT = (
     "(KHTML, like Gecko) Chrome/122 Safari/537.36"
 )
 TIMEOUT_SECONDEN = 25
-PAUZE_TUSSEN_VERZOEKEN = 1.0
+# Minimale tijd tussen twee verzoeken naar dezelfde site. Een langere
+# Crawl-delay in robots.txt gaat voor.
+PAUZE_TUSSEN_VERZOEKEN = 0.5
+MAX_GELIJKTIJDIG_PER_SITE = 2
+MAX_WERKERS = 4
 MAX_PER_IMPORT = 20
 MAX_PAGINA_BYTES = 4 * 1024 * 1024
+ROBOTS_TTL_SECONDEN = 60 * 60
 
 # Paden die op een receptpagina wijzen. Bewust breed: liever een pagina te veel
 # proberen dan een recept missen; wat geen recept blijkt valt vanzelf af.
@@ -51,14 +70,75 @@ class ImportFout(Exception):
     """Import mislukt om een reden die de gebruiker moet zien."""
 
 
+# --- Beleefdheid per site ---
+
+
+class _SiteLimiet:
+    """Hoogstens `gelijktijdig` verzoeken tegelijk naar één site, met een token bucket.
+
+    De bucket vult aan met één token per `interval` seconden en houdt er
+    hoogstens `gelijktijdig`. Zet robots.txt een Crawl-delay, dan wordt dat het
+    interval en gaat de bucket naar één token: dan mag er echt maar één
+    verzoek per Crawl-delay vertrekken.
+    """
+
+    def __init__(self, gelijktijdig=MAX_GELIJKTIJDIG_PER_SITE, interval=PAUZE_TUSSEN_VERZOEKEN):
+        self._semafoor = threading.BoundedSemaphore(gelijktijdig)
+        self._lock = threading.Lock()
+        self._capaciteit = float(gelijktijdig)
+        self._interval = float(interval)
+        self._tokens = self._capaciteit
+        self._laatst = time.monotonic()
+
+    def stel_crawl_delay_in(self, seconden):
+        if not seconden or float(seconden) <= self._interval:
+            return
+        with self._lock:
+            self._interval = float(seconden)
+            self._capaciteit = 1.0
+            self._tokens = min(self._tokens, self._capaciteit)
+
+    def _wacht_op_token(self):
+        with self._lock:
+            nu = time.monotonic()
+            self._tokens = min(self._capaciteit, self._tokens + (nu - self._laatst) / self._interval)
+            self._laatst = nu
+            # Onder nul is een reservering: wie na ons komt wacht ook op ons token.
+            self._tokens -= 1
+            wachttijd = -self._tokens * self._interval if self._tokens < 0 else 0.0
+        if wachttijd > 0:
+            time.sleep(wachttijd)
+
+    @contextmanager
+    def verzoek(self):
+        with self._semafoor:
+            self._wacht_op_token()
+            yield
+
+
+_SITE_LIMIETEN = {}
+_SITE_LIMIETEN_LOCK = threading.Lock()
+_ROBOTS_CACHE = {}
+_ROBOTS_LOCK = threading.Lock()
+
+
+def _limiet_voor(url):
+    """Eén limiet per host, gedeeld door alle imports in dit proces."""
+    host = urllib.parse.urlsplit(url).netloc.lower()
+    with _SITE_LIMIETEN_LOCK:
+        limiet = _SITE_LIMIETEN.get(host)
+        if limiet is None:
+            limiet = _SITE_LIMIETEN[host] = _SiteLimiet()
+        return limiet
+
+
 # --- Ophalen ---
 
 
 def _haal_pagina(url):
-    verzoek = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
     try:
-        with urllib.request.urlopen(verzoek, timeout=TIMEOUT_SECONDEN) as antwoord:
-            return antwoord.read(MAX_PAGINA_BYTES)
+        with _limiet_voor(url).verzoek():
+            return haal_op(url, {"User-Agent": USER_AGENT}, timeout=TIMEOUT_SECONDEN, max_bytes=MAX_PAGINA_BYTES)
     except urllib.error.HTTPError as exc:
         raise ImportFout(f"Server gaf HTTP {exc.code} voor {url}") from exc
     except urllib.error.URLError as exc:
@@ -67,15 +147,48 @@ def _haal_pagina(url):
         raise ImportFout(f"Onverwachte fout bij {url}: {exc}") from exc
 
 
+def _lees_robots(robots_url):
+    """Haalt robots.txt op zoals RobotFileParser.read, maar via de HTTP-cache."""
+    parser = urllib.robotparser.RobotFileParser(robots_url)
+    try:
+        with _limiet_voor(robots_url).verzoek():
+            inhoud = haal_op(robots_url, {"User-Agent": USER_AGENT}, timeout=TIMEOUT_SECONDEN)
+    except urllib.error.HTTPError as exc:
+        # Zelfde regels als de standaardbibliotheek: afgeschermd is alles verboden,
+        # ontbrekend is alles toegestaan.
+        if exc.code in (401, 403):
+            parser.disallow_all = True
+        elif 400 <= exc.code < 500:
+            parser.allow_all = True
+        else:
+            return None
+        return parser
+    except Exception:
+        return None
+    parser.parse(inhoud.decode("utf-8", "replace").splitlines())
+    return parser
+
+
 def _robots_voor(url):
+    """De robots.txt-parser van de site, per host een uur bewaard in het geheugen."""
     onderdelen = urllib.parse.urlsplit(url)
     basis = f"{onderdelen.scheme}://{onderdelen.netloc}"
-    parser = urllib.robotparser.RobotFileParser()
-    parser.set_url(f"{basis}/robots.txt")
+    nu = time.monotonic()
+    with _ROBOTS_LOCK:
+        bewaard = _ROBOTS_CACHE.get(basis)
+    if bewaard and nu - bewaard[1] < ROBOTS_TTL_SECONDEN:
+        return bewaard[0]
+
+    parser = _lees_robots(f"{basis}/robots.txt")
+    if parser is None:
+        # Niet bewaren: een netwerkfout mag de volgende import niet blokkeren.
+        return None
     try:
-        parser.read()
+        _limiet_voor(url).stel_crawl_delay_in(parser.crawl_delay(USER_AGENT))
     except Exception:
-        return None
+        pass
+    with _ROBOTS_LOCK:
+        _ROBOTS_CACHE[basis] = (parser, nu)
     return parser
 
 
@@ -142,6 +255,60 @@ def _porties_uit(waarde, standaard=2):
     return min(6, max(1, int(getallen[0])))
 
 
+_JSONLD_OPEN = re.compile(r"<script\b([^>]*)>", re.I)
+_SCRIPT_SLUIT = re.compile(r"</script\s*>", re.I)
+_JSONLD_TYPE = re.compile(r"""type\s*=\s*["']?application/ld\+json""", re.I)
+
+
+def _jsonld_blokken(html):
+    """Geeft de JSON-LD-blokken van een pagina, een voor een en al ingelezen.
+
+    Loopt enkel langs de <script>-tags; de rest van de pagina wordt niet
+    geparst. Een generator, zodat wie het recept in het eerste blok vindt de
+    rest niet meer hoeft te lezen.
+    """
+    tekst = html.decode("utf-8", "replace") if isinstance(html, bytes) else str(html or "")
+    positie = 0
+    while True:
+        opening = _JSONLD_OPEN.search(tekst, positie)
+        if not opening:
+            return
+        sluiting = _SCRIPT_SLUIT.search(tekst, opening.end())
+        if not sluiting:
+            return
+        positie = sluiting.end()
+        if not _JSONLD_TYPE.search(opening.group(1)):
+            continue
+        try:
+            yield json.loads(tekst[opening.end():sluiting.start()].strip())
+        except ValueError:
+            continue
+
+
+def _is_recept(knoop):
+    soort = knoop.get("@type")
+    return "Recipe" in (soort if isinstance(soort, list) else [soort])
+
+
+def _recept_uit_jsonld(html):
+    """Het eerste schema.org-Recipe-object op de pagina, of None.
+
+    Sites verpakken het op verschillende manieren: los, in een lijst, in een
+    @graph of als mainEntity van een WebPage.
+    """
+    for data in _jsonld_blokken(html):
+        te_bekijken = [data]
+        while te_bekijken:
+            knoop = te_bekijken.pop(0)
+            if isinstance(knoop, list):
+                te_bekijken.extend(knoop)
+            elif isinstance(knoop, dict):
+                if _is_recept(knoop):
+                    return knoop
+                te_bekijken.extend(knoop[sleutel] for sleutel in ("@graph", "mainEntity") if sleutel in knoop)
+    return None
+
+
 def _porties_uit_jsonld(html):
     """Leest recipeYield rechtstreeks uit de schema.org-data van de pagina.
 
@@ -149,77 +316,76 @@ def _porties_uit_jsonld(html):
     waarde gewoon in de JSON-LD staat. Zonder deze terugval kregen die recepten
     de standaard van 2 porties, wat de kcal-schatting per portie verdubbelt.
     """
-    tekst = html.decode("utf-8", "replace") if isinstance(html, bytes) else str(html or "")
-    for blok in re.finditer(
-        r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', tekst, re.S
-    ):
-        try:
-            data = json.loads(blok.group(1).strip())
-        except Exception:
-            continue
-        kandidaten = data if isinstance(data, list) else (data.get("@graph") or [data])
-        for kandidaat in kandidaten:
-            if not isinstance(kandidaat, dict):
-                continue
-            soort = kandidaat.get("@type")
-            soort = soort if isinstance(soort, list) else [soort]
-            if "Recipe" not in soort:
-                continue
-            opbrengst = kandidaat.get("recipeYield")
-            if isinstance(opbrengst, list):
-                opbrengst = opbrengst[0] if opbrengst else None
-            if opbrengst is not None and re.search(r"\d", str(opbrengst)):
-                return opbrengst
+    recept = _recept_uit_jsonld(html)
+    opbrengst = (recept or {}).get("recipeYield")
+    if isinstance(opbrengst, list):
+        opbrengst = opbrengst[0] if opbrengst else None
+    if opbrengst is not None and re.search(r"\d", str(opbrengst)):
+        return opbrengst
     return None
 
 
-_EENHEDEN = (
-    r"kg|g|gram|grams|l|liter|liters|dl|cl|ml|milliliters?|el|tl|eetlepels?|theelepels?|"
-    r"snuf(?:je)?|teen(?:tje)?s?|stuks?|blik(?:je)?|zak(?:je)?|bosje|takje|handvol|"
-    r"cups?|tbsp|tbs|tablespoons?|tsp|teaspoons?|oz|ounces?|lbs?|pounds?|"
-    r"cloves?|pinch(?:es)?|slices?|pieces?|bunch(?:es)?|cans?|handful"
-)
+def _schone_tekst(waarde):
+    """JSON-LD-tekst zoals recipe-scrapers ze teruggeeft: zonder tags, entiteiten of dubbele witruimte."""
+    tekst = re.sub(r"<[^>]+>", " ", str(waarde or ""))
+    # Eén keer: een letterlijke "&amp;lt;" in het recept is "&lt;", geen "<".
+    return re.sub(r"\s+", " ", unescape(tekst)).strip()
+
+
+def _stappen_uit_jsonld(waarde):
+    """recipeInstructions is tekst, een lijst tekst, HowToSteps of HowToSections."""
+    if isinstance(waarde, str):
+        return [regel for regel in (_schone_tekst(r) for r in re.split(r"\n+", waarde)) if regel]
+    stappen = []
+    for item in waarde if isinstance(waarde, list) else [waarde]:
+        if isinstance(item, str):
+            stappen.append(_schone_tekst(item))
+        elif isinstance(item, dict):
+            if "itemListElement" in item:
+                stappen.extend(_stappen_uit_jsonld(item["itemListElement"]))
+            else:
+                stappen.append(_schone_tekst(item.get("text") or item.get("name")))
+    return [stap for stap in stappen if stap]
 
 
-def _ingredient_ontleden(regel):
-    """Splitst een ingredientregel in hoeveelheid, eenheid en naam, metrisch.
+def _afbeelding_uit_jsonld(waarde):
+    if isinstance(waarde, list):
+        waarde = waarde[0] if waarde else ""
+    if isinstance(waarde, dict):
+        waarde = waarde.get("url") or ""
+    return str(waarde or "")
 
-    Volgorde is belangrijk. Staat er al een metrische waarde tussen haakjes
-    ("2 lbs (908g) cream cheese"), dan wint die: exacter dan zelf omrekenen, en
-    het haalt de haakjes uit de naam. Anders lezen we de imperiale hoeveelheid en
-    rekenen die om.
 
-    Lukt ontleden niet, dan komt de hele regel als naam binnen. Dat is beter dan
-    raden: de gebruiker ziet het staan en kan het corrigeren.
-    """
-    tekst = re.sub(r"\s+", " ", str(regel or "")).strip()
-    if not tekst:
-        return None
+def _lijst_uit_jsonld(waarde):
+    if isinstance(waarde, str):
+        return [deel.strip() for deel in waarde.split(",") if deel.strip()]
+    return [_schone_tekst(item) for item in waarde or [] if isinstance(item, str)]
 
-    # 1. Metrische waarde die de site zelf al meegaf.
-    uit_haakjes = metriek_uit_haakjes(tekst)
-    if uit_haakjes:
-        hoeveelheid, eenheid, rest = uit_haakjes
-        # De imperiale hoeveelheid vooraan is nu overbodig.
-        rest = re.sub(rf"^\s*[\d\s./½¼¾⅓⅔⅛⅜⅝⅞,-]*\s*(?:(?:{_EENHEDEN})\b)?\.?\s*", "", rest, flags=re.I)
-        naam = rest.strip(" ,-")
-        if naam:
-            return {"name": naam, "quantity": hoeveelheid, "unit": eenheid}
-
-    # 2. Zelf ontleden en omrekenen.
-    treffer = re.match(
-        rf"^([\d.,/½¼¾⅓⅔⅛⅜⅝⅞\s]+?)\s*(?:({_EENHEDEN})\b)?\.?\s+(.*)$",
-        tekst,
-        re.I,
-    )
-    if treffer:
-        hoeveelheid = parse_getal(treffer.group(1))
-        naam = treffer.group(3).strip(" ,-")
-        if hoeveelheid is not None and naam:
-            hoeveelheid, eenheid = naar_metriek(hoeveelheid, treffer.group(2) or "")
-            return {"name": naam, "quantity": hoeveelheid, "unit": eenheid}
 
-    return {"name": tekst, "quantity": 0, "unit": ""}
+def _velden_uit_jsonld(recept):
+    """De velden voor _maaltijd_bouwen uit een schema.org-Recipe, of None als er wat ontbreekt."""
+    naam = _schone_tekst(recept.get("name"))
+    regels = recept.get("recipeIngredient") or recept.get("ingredients") or []
+    regels = [_schone_tekst(regel) for regel in regels if isinstance(regel, str)] if isinstance(regels, list) else []
+    stappen = _stappen_uit_jsonld(recept.get("recipeInstructions") or [])
+    if not (naam and regels and stappen):
+        return None
+    categorie = recept.get("recipeCategory")
+    if isinstance(categorie, list):
+        categorie = categorie[0] if categorie else None
+    opbrengst = recept.get("recipeYield")
+    if isinstance(opbrengst, list):
+        opbrengst = opbrengst[0] if opbrengst else None
+    return {
+        "naam": naam,
+        "ingredient_regels": regels,
+        "stappen": stappen,
+        "beschrijving": _schone_tekst(recept.get("description")),
+        "afbeelding": _afbeelding_uit_jsonld(recept.get("image")),
+        "categorie": _schone_tekst(categorie) if categorie else None,
+        "trefwoorden": _lijst_uit_jsonld(recept.get("keywords")),
+        "opbrengst": opbrengst,
+    }
 
 
 # Woorden die een gang verraden. Dagelijkse Kost geeft de gang zelf mee in
@@ -309,7 +475,7 @@ def _stappen_opschonen(stappen):
     return uit
 
 
-def _naar_maaltijd(scraper, url, html):
+def _velden_uit_scraper(scraper, html):
     from recipe_scrapers._exceptions import SchemaOrgException  # lokaal: optionele dependency
 
     def veilig(functie, standaard=None):
@@ -318,17 +484,26 @@ def _naar_maaltijd(scraper, url, html):
         except (SchemaOrgException, Exception):
             return standaard
 
-    naam = veilig(scraper.title) or ""
+    return {
+        "naam": veilig(scraper.title) or "",
+        "ingredient_regels": veilig(scraper.ingredients, []) or [],
+        "stappen": veilig(scraper.instructions_list, []) or [],
+        "beschrijving": veilig(scraper.description, "") or "",
+        "afbeelding": veilig(scraper.image, "") or "",
+        "categorie": veilig(scraper.category),
+        "trefwoorden": veilig(scraper.keywords, []) or [],
+        "opbrengst": veilig(scraper.yields) or _porties_uit_jsonld(html),
+    }
+
+
+def _maaltijd_bouwen(velden, url, html):
+    naam = velden["naam"]
     if not naam:
         raise ImportFout("Geen recepttitel gevonden op deze pagina.")
 
-    ingredienten = []
-    for regel in veilig(scraper.ingredients, []) or []:
-        ontleed = _ingredient_ontleden(regel)
-        if ontleed:
-            ingredienten.append(ontleed)
+    ingredienten = [i for i in map(_ingredient_ontleden, velden["ingredient_regels"] or []) if i]
 
-    stappen = _stappen_opschonen(veilig(scraper.instructions_list, []) or [])
+    stappen = _stappen_opschonen(velden["stappen"])
 
     host = urllib.parse.urlsplit(url).netloc.lower().removeprefix("www.")
     aanvulling = _SITE_AANVULLINGEN.get(host, {})
@@ -338,20 +513,20 @@ def _naar_maaltijd(scraper, url, html):
         if len(extra) > len(stappen):
             stappen = extra
 
-    beschrijving = (veilig(scraper.description, "") or "")[:400]
+    beschrijving = velden["beschrijving"][:400]
     gang = _classificeer_gang(
         naam,
-        categorie=veilig(scraper.category),
-        trefwoorden=veilig(scraper.keywords, []) or [],
+        categorie=velden["categorie"],
+        trefwoorden=velden["trefwoorden"],
         beschrijving=beschrijving,
     )
 
     return {
         "name": naam,
         "description": beschrijving,
-        "image_url": veilig(scraper.image, "") or "",
+        "image_url": velden["afbeelding"],
         "course": gang,
-        "servings": _porties_uit(veilig(scraper.yields) or _porties_uit_jsonld(html)),
+        "servings": _porties_uit(velden["opbrengst"]),
         "ingredients": ingredienten,
         "preparation": stappen,
         "tags": [],
@@ -366,7 +541,19 @@ def _naar_maaltijd(scraper, url, html):
 
 
 def importeer_recept(url, html=None):
-    """Haalt één receptpagina op en zet die om naar een maaltijd-payload."""
+    """Haalt één receptpagina op en zet die om naar een maaltijd-payload.
+
+    Eerst de JSON-LD van de pagina; is die er niet of onvolledig, dan
+    recipe-scrapers.
+    """
+    if html is None:
+        html = _haal_pagina(url)
+
+    recept = _recept_uit_jsonld(html)
+    velden = _velden_uit_jsonld(recept) if recept else None
+    if velden:
+        return _maaltijd_bouwen(velden, url, html)
+
     try:
         from recipe_scrapers import scrape_html
     except ImportError as exc:  # pragma: no cover - alleen zonder dependency
@@ -374,15 +561,12 @@ def importeer_recept(url, html=None):
             "De import-bibliotheek ontbreekt. Installeer recipe-scrapers."
         ) from exc
 
-    if html is None:
-        html = _haal_pagina(url)
-
     try:
         scraper = scrape_html(html, org_url=url)
     except Exception as exc:
         raise ImportFout(f"Deze pagina kon niet als recept gelezen worden: {exc}") from exc
 
-    return _naar_maaltijd(scraper, url, html)
+    return _maaltijd_bouwen(_velden_uit_scraper(scraper, html), url, html)
 
 
 # --- Meerdere recepten van één site ---
@@ -457,11 +641,38 @@ def verzamel_recept_urls(start_url, limiet=MAX_PER_IMPORT, robots=None):
     return urls[:limiet], html
 
 
-def importeer_van_url(url, limiet=MAX_PER_IMPORT):
+def _importeer_kandidaat(kandidaat):
+    """Eén gelinkt recept: (maaltijd, None) of (None, fout)."""
+    try:
+        maaltijd = importeer_recept(kandidaat)
+        if maaltijd["ingredients"]:
+            return maaltijd, None
+        return None, {"url": kandidaat, "reden": "geen ingredienten gevonden"}
+    except ImportFout as exc:
+        return None, {"url": kandidaat, "reden": str(exc)}
+    except Exception as exc:
+        logger.exception("Onverwachte fout bij importeren van %s", kandidaat)
+        return None, {"url": kandidaat, "reden": f"onverwachte fout: {exc}"}
+
+
+def _meld(voortgang, url, status, reden=""):
+    if voortgang is None:
+        return
+    try:
+        voortgang(url, status, reden)
+    except Exception:
+        logger.exception("Voortgangsmelding voor %s mislukt", url)
+
+
+def importeer_van_url(url, limiet=MAX_PER_IMPORT, voortgang=None):
     """Importeert één recept, of alle recepten waar de pagina naar linkt.
 
     Geeft (maaltijden, fouten) terug. Fouten zijn per URL, zodat één kapotte
     pagina de rest van de batch niet tegenhoudt.
+
+    voortgang(url, status, reden) wordt per URL aangeroepen: "wachtend" zodra
+    de links bekend zijn, daarna "geimporteerd" of "mislukt". Ze kan vanuit
+    meerdere threads tegelijk komen.
     """
     url = str(url or "").strip()
     if not url.startswith(("http://", "https://")):
@@ -479,6 +690,7 @@ def importeer_van_url(url, limiet=MAX_PER_IMPORT):
         maaltijd = importeer_recept(url, html=html)
         if maaltijd["ingredients"]:
             logger.info("Recept geimporteerd: %s (%s)", maaltijd["name"], url)
+            _meld(voortgang, url, "geimporteerd")
             return [maaltijd], []
     except ImportFout:
         pass
@@ -491,21 +703,25 @@ def importeer_van_url(url, limiet=MAX_PER_IMPORT):
             "Probeer een receptpagina of een overzichtspagina met recepten."
         )
 
+    for kandidaat in kandidaten:
+        _meld(voortgang, kandidaat, "wachtend")
+
+    def _met_melding(kandidaat):
+        maaltijd, fout = _importeer_kandidaat(kandidaat)
+        if fout:
+            _meld(voortgang, kandidaat, "mislukt", fout["reden"])
+        else:
+            _meld(voortgang, kandidaat, "geimporteerd")
+        return maaltijd, fout
+
     maaltijden, fouten = [], []
-    for index, kandidaat in enumerate(kandidaten):
-        if index:
-            time.sleep(PAUZE_TUSSEN_VERZOEKEN)
-        try:
-            maaltijd = importeer_recept(kandidaat)
-            if maaltijd["ingredients"]:
+    with ThreadPoolExecutor(max_workers=min(MAX_WERKERS, len(kandidaten))) as pool:
+        # map houdt de volgorde van de pagina aan, ook al lopen ze tegelijk.
+        for maaltijd, fout in pool.map(_met_melding, kandidaten):
+            if maaltijd:
                 maaltijden.append(maaltijd)
-            else:
-                fouten.append({"url": kandidaat, "reden": "geen ingredienten gevonden"})
-        except ImportFout as exc:
-            fouten.append({"url": kandidaat, "reden": str(exc)})
-        except Exception as exc:
-            logger.exception("Onverwachte fout bij importeren van %s", kandidaat)
-            fouten.append({"url": kandidaat, "reden": f"onverwachte fout: {exc}"})
+            if fout:
+                fouten.append(fout)
 
     logger.info("Import van %s: %d recepten, %d fouten", url, len(maaltijden), len(fouten))
     return maaltijden, fouten
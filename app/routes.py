@@ -1,3 +1,10 @@
+import gzip
+import json
+import sqlite3
+import threading
+import zlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from urllib.parse import urlsplit
@@ -5,6 +12,7 @@ from uuid import uuid4
 from zoneinfo import ZoneInfo
 
 from flask import (
+    Response,
     abort,
     current_app,
     jsonify,
@@ -22,12 +30,16 @@ from .admin_ai import (
     LEGACY_ROTATION_LIMITS,
     get_admin_ai_config,
     get_ai_menu_recipes,
+    get_cached_ai_menu_recipes,
     save_admin_ai_config,
 )
+from .ingredients import boodschapnaam
 from .logging_setup import get_logger
-from .nutrition import bereken_kcal, tabel_uit_database
+from .nutrition import MIN_DEKKING, bereken_kcal, tabel_uit_database
 from .tagging import verrijk, vernederlands
 from .recipe_import import MAX_PER_IMPORT, ImportFout, importeer_van_url
+from .pictures import OnleesbareFoto, bewaar_upload, fotomap, varianten
+from .shopping import VECTOR_VERSIE, boodschapvector, naar_canoniek, tel_samen, vector_json, vector_uit_json
 from .db import (
     COURSES,
     DEFAULT_COURSE,
@@ -43,32 +55,44 @@ from .db import (
     record_failed_login,
     complete_shopping_items,
     create_group,
+    create_import_job,
     delete_group,
     delete_auth_user,
     get_auth_user,
     get_group_menu_mode,
+    get_user_group_id,
     get_user_group_ids,
     group_exists,
+    has_generated_ai_meals,
     get_runtime_settings,
     list_auth_users,
     list_generated_ai_meals,
     list_groups,
     create_custom_meal,
+    count_custom_meals,
+    create_custom_meals_bulk,
+    iter_custom_meals,
     delete_shopping_item,
     delete_shopping_history_entry,
     delete_custom_meals,
     get_custom_meal,
     get_day,
     get_days_between,
+    get_days_in,
+    get_meals_by_ids,
+    get_shopping_vectors,
+    get_import_job,
     get_shopping_history_counts_between,
     list_shopping_history_for_day,
     get_user_allergies,
     get_user_dislikes,
     get_user_likes,
     list_custom_meals,
+    list_planner_candidates,
     list_shopping_items,
     replace_shopping_items,
     set_shopping_items_order,
+    set_shopping_vectors,
     set_shopping_item_checked,
     set_day_cook,
     set_day_meal,
@@ -86,6 +110,7 @@ from .db import (
     update_custom_meal,
     update_custom_meal_image,
     update_custom_meal_rating,
+    update_import_job,
     upsert_generated_ai_meals,
     upsert_user,
     upsert_auth_user,
@@ -96,6 +121,14 @@ from .meal_engine import generate_plan, recipes_by_id, select_best_recipe
 
 logger = get_logger(__name__)
 
+# Imports van een site lopen buiten de request om. Twee tegelijk per worker is
+# genoeg: binnen één import lopen de pagina's al parallel (zie recipe_import).
+IMPORT_WORKERS = 2
+_import_pool = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+
+# Foto's onder /pictures wijzigen nooit; een jaar is de gangbare bovengrens.
+PICTURE_MAX_AGE = 365 * 24 * 3600
+
 
 def _client_ip():
     """Het IP van de bezoeker.
@@ -159,7 +192,12 @@ def _normalize_allergies(values):
 
 
 def _pictures_dir():
-    return Path(current_app.root_path).parent / "data" / "pictures"
+    return fotomap(current_app)
+
+
+def _image_variants(image_url):
+    """srcsets per formaat voor een eigen foto, of None; zie app/pictures.py."""
+    return varianten(image_url, _pictures_dir())
 
 
 def _runtime_settings(app):
@@ -337,7 +375,7 @@ def _planner_ai_context(options, settings):
 def _effective_menu_mode(user_email):
     gid = int((get_auth_user(user_email) or {}).get("group_id") or 1)
     requested = _normalize_menu_mode(get_group_menu_mode(gid))
-    count = len(list_custom_meals(user_email))
+    count = count_custom_meals(user_email)
     if requested == "custom_only" and count < 8:
         return ("ai_and_custom" if count >= 1 else "ai_only"), count
     if requested == "ai_and_custom" and count < 1:
@@ -388,11 +426,27 @@ def alleen_hoofdgerechten(recipes):
     ]
 
 
-def _extra_recipes_for_mode(user_email, planner_context=None):
+def _extra_recipes_for_mode(user_email, planner_context=None, allergies=None, excluded_ids=None):
+    """De eigen en AI-recepten waaruit de planner kiest, enkel hoofdgerechten.
+
+    De eigen maaltijden komen voorgefilterd uit de database: geen andere gangen,
+    niets uit excluded_ids en niets met een van deze allergenen als label. Wat
+    de planner daarna nog zelf filtert (allergenen in de ingredienten) blijft
+    hetzelfde; hij krijgt alleen minder rijen te verwerken.
+    """
     mode, _ = _effective_menu_mode(user_email)
-    custom = [] if mode == "ai_only" else _custom_recipes_for_user(user_email)
+    custom = []
+    if mode != "ai_only":
+        group_id = int((get_auth_user(user_email) or {}).get("group_id") or 1)
+        candidates = list_planner_candidates(
+            group_id,
+            excluded_allergens=allergies or [],
+            main_only=True,
+            excluded_ids=excluded_ids or [],
+        )
+        custom = [_custom_recipe(item) for item in candidates]
     external = [] if mode == "custom_only" else _external_ai_recipes_for_mode(user_email, planner_context)
-    return alleen_hoofdgerechten(custom + external)
+    return custom + alleen_hoofdgerechten(external)
 
 
 def _include_base_recipes_for_mode(user_email):
@@ -435,131 +489,18 @@ def _format_day_long_nl(day_iso):
     return f"{weekdays[d.weekday()]} {d.day} {months[d.month - 1]} {d.year}"
 
 
-def _normalize_token(value):
-    return " ".join(str(value or "").strip().lower().split())
-
-
-def _normalize_ingredient_name(name):
-    token = _normalize_token(name)
-    aliases = {
-        "look": "knoflook",
-        "garlic": "knoflook",
-        "clove garlic": "knoflook",
-        "olive oil": "olijfolie",
-        "olijf olie": "olijfolie",
-        "bay leaf": "laurierblad",
-        "bay leaves": "laurierblad",
-        "carrot": "wortel",
-        "carrots": "wortelen",
-        "onion": "ui",
-        "red onion": "rode ui",
-        "white onion": "witte ui",
-        "potato": "aardappel",
-        "potatoes": "aardappelen",
-        "tomato": "tomaat",
-        "tomatoes": "tomaten",
-        "cherry tomatoes": "cherrytomaten",
-        "bell pepper": "paprika",
-        "cucumber": "komkommer",
-        "zucchini": "courgette",
-        "spinach": "spinazie",
-        "broccoli": "broccoli",
-        "mushroom": "champignon",
-        "mushrooms": "champignons",
-        "parsley": "peterselie",
-        "coriander": "koriander",
-        "basil": "basilicum",
-        "oregano": "oregano",
-        "thyme": "tijm",
-        "rosemary": "rozemarijn",
-        "mint": "munt",
-        "cumin": "komijn",
-        "paprika": "paprikapoeder",
-        "chili powder": "chilipoeder",
-        "black pepper": "zwarte peper",
-        "pepper": "peper",
-        "salt": "zout",
-        "rice": "rijst",
-        "pasta": "pasta",
-        "spaghetti": "spaghetti",
-        "noodles": "noedels",
-        "couscous": "couscous",
-        "bread": "brood",
-        "flour": "bloem",
-        "chickpeas": "kikkererwten",
-        "lentils": "linzen",
-        "beans": "bonen",
-        "chicken stock": "kippenbouillon",
-        "vegetable stock": "groentebouillon",
-        "beef stock": "runderbouillon",
-        "milk": "melk",
-        "cream": "room",
-        "butter": "boter",
-        "cheese": "kaas",
-        "egg": "ei",
-        "eggs": "eieren",
-        "salmon": "zalm",
-        "cod": "kabeljauw",
-        "tuna": "tonijn",
-        "prawns": "garnalen",
-        "shrimp": "garnalen",
-        "beef": "rundvlees",
-        "ground beef": "rundergehakt",
-        "minced beef": "rundergehakt",
-        "turkey": "kalkoen",
-        "chicken": "kipfilet",
-        "chicken breast": "kipfilet",
-        "kip": "kipfilet",
-        "lemon": "citroen",
-        "lemon juice": "citroensap",
-        "lime": "limoen",
-        "lime juice": "limoensap",
-    }
-    return aliases.get(token, token)
-
-
-def _normalize_unit(quantity, unit):
-    qty = float(quantity or 0)
-    raw = _normalize_token(unit)
-
-    # normalize to a compact canonical unit set
-    if any(marker in raw for marker in ("kilogram", "kilograms", "kilo", "kg")):
-        return qty * 1000.0, "g"
-    if any(marker in raw for marker in ("gram", "grams", "g")):
-        return qty, "g"
-    # Check millilitres before litres: "liter" is a substring of "milliliter".
-    if any(marker in raw for marker in ("milliliter", "millilitre", "ml")):
-        return qty, "ml"
-    if any(marker in raw for marker in ("liter", "litre", "liters", "litres", " l")) or raw == "l":
-        return qty * 1000.0, "ml"
-    if any(marker in raw for marker in ("clove", "cloves", "teen", "teentje", "teentjes")):
-        return qty, "teentje"
-    if any(marker in raw for marker in ("stuk", "stuks", "piece", "pieces", "pc", "pcs")):
-        return qty, "stuk"
-    if any(marker in raw for marker in ("tbsp", "tbs", "tblsp", "tablespoon", "tablespoons", "el", "eetlepel", "eetlepels")):
-        return qty, "eetlepel"
-    if any(marker in raw for marker in ("tsp", "tl", "theelepel", "theelepels")):
-        return qty, "theelepel"
-    if any(marker in raw for marker in ("splash", "scheut")):
-        return qty, "scheut"
-    if any(marker in raw for marker in ("handful", "handvol")):
-        return qty, "handvol"
-    if any(marker in raw for marker in ("pinch", "snufje")):
-        return qty, "snufje"
-    return qty, raw
-
-
-def _vul_calorieen_aan(maaltijd):
+def _vul_calorieen_aan(maaltijd, tabel=None):
     """Schat de kcal per portie als het recept zelf geen waarde meegaf.
 
     Een eigen ingevulde waarde blijft staan; alleen een lege of nul-waarde wordt
     aangevuld. Bij te lage dekking (te veel onbekende ingredienten) laten we het
-    veld leeg in plaats van een misleidend getal te tonen.
+    veld leeg in plaats van een misleidend getal te tonen. Wie een reeks
+    maaltijden aanvult, geeft de tabel van tabel_uit_database() één keer mee.
     """
     if float(maaltijd.get("calories") or 0) > 0:
         return maaltijd
-    kcal, dekking = bereken_kcal(maaltijd, *tabel_uit_database())
-    if kcal > 0 and dekking >= 0.6:
+    kcal, dekking = bereken_kcal(maaltijd, *(tabel or tabel_uit_database()))
+    if kcal > 0 and dekking >= MIN_DEKKING:
         maaltijd["calories"] = float(kcal)
     return maaltijd
 
@@ -593,29 +534,25 @@ def _recipe_servings(recipe, fallback=DEFAULT_SERVINGS):
     return value
 
 
-def _build_shopping_items(user_email, group_id, dates, person_count, base_servings):
-    recipe_map = _recipe_map_for_user(user_email)
-    ingredients = {}
+def _build_shopping_items(group_id, dates, person_count, base_servings):
+    # Eén query voor de planning en één ronde voor de recepten, hoe lang de
+    # periode ook is; niet per dag een verbinding.
+    rows = [row for row in get_days_in(group_id, dates) if row.get("meal_id")]
+    vectoren = _shopping_vectors(group_id, {row["meal_id"] for row in rows})
+    regels = []
 
-    for day in dates:
-        row = get_day(group_id, day)
-        if not row or not row.get("meal_id"):
-            continue
-
-        recipe = recipe_map.get(row["meal_id"])
-        if not recipe:
+    for row in rows:
+        vector = vectoren.get(row["meal_id"])
+        if not vector:
             continue
 
         # Elk recept schaalt vanaf zijn eigen porties: een gerecht voor 4 personen
         # moet gehalveerd worden als je voor 2 plant, een gerecht voor 2 niet.
-        scale = person_count / _recipe_servings(recipe, base_servings)
+        servings, recipe_regels = vector
+        scale = person_count / _recipe_servings({"servings": servings}, base_servings)
+        regels.extend((name, quantity * scale, unit) for name, unit, quantity in recipe_regels)
 
-        for ing in recipe.get("ingredients", []):
-            name = _normalize_ingredient_name(ing.get("name", ""))
-            quantity = float(ing.get("quantity", 0)) * scale
-            quantity, unit = _normalize_unit(quantity, ing.get("unit", ""))
-            key = (name, unit)
-            ingredients[key] = ingredients.get(key, 0) + quantity
+    ingredients = tel_samen(regels, al_canoniek=True)
 
     output = [
         {"name": key[0], "quantity": qty, "unit": key[1], "checked": False, "sort_order": idx}
@@ -641,8 +578,8 @@ def _normalize_stored_shopping_items(items):
     order = {}
     checked_state = {}
     for idx, item in enumerate(items or []):
-        name = _normalize_ingredient_name(item.get("name", ""))
-        quantity, unit = _normalize_unit(item.get("quantity", 0), item.get("unit", ""))
+        name = boodschapnaam(item.get("name", ""))
+        quantity, unit = naar_canoniek(item.get("quantity", 0), item.get("unit", ""))
         key = (name, unit)
         merged[key] = merged.get(key, 0) + float(quantity or 0)
         if key not in order:
@@ -867,6 +804,82 @@ def _custom_meal_bulk_item(item):
     }
 
 
+# Export en NDJSON-import lopen rij per rij; zoveel maaltijden tegelijk uit de
+# cursor of in één transactie.
+EXPORT_BATCH_SIZE = 200
+IMPORT_BATCH_SIZE = 200
+
+
+def _export_chunks(group_id, ndjson=False):
+    """De export als stukken tekst, zonder alles eerst in het geheugen te zetten.
+
+    Standaard hetzelfde {"items": [...]} als vroeger, maar element per element
+    geschreven; met ndjson één maaltijd per regel.
+    """
+    items = (_custom_meal_bulk_item(item) for item in iter_custom_meals(group_id, EXPORT_BATCH_SIZE))
+    if ndjson:
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        return
+    yield '{"items": ['
+    for index, item in enumerate(items):
+        yield ("," if index else "") + json.dumps(item, ensure_ascii=False)
+    yield "]}"
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _import_ndjson(lines, group_id, email, batch_size=IMPORT_BATCH_SIZE):
+    """Zet NDJSON-regels om naar maaltijden en bewaart ze per batch: (toegevoegd, fouten).
+
+    Elke batch is een eigen transactie, dus een lange import houdt nooit meer
+    dan batch_size maaltijden vast. De index in een fout is het regelnummer.
+    """
+    created, errors = 0, []
+    batch, positions = [], []
+
+    def _flush():
+        nonlocal created
+        if not batch:
+            return
+        added, duplicates = create_custom_meals_bulk(group_id, batch, email)
+        created += added
+        errors.extend({"index": positions[i], "error": "name already exists"} for i in duplicates)
+        batch.clear()
+        positions.clear()
+
+    for idx, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            errors.append({"index": idx, "error": "invalid json"})
+            continue
+        if not isinstance(item, dict):
+            errors.append({"index": idx, "error": "item must be an object"})
+            continue
+        normalized, error = _normalize_custom_meal_payload(item)
+        if error:
+            errors.append({"index": idx, "error": error})
+            continue
+        batch.append(normalized)
+        positions.append(idx)
+        if len(batch) >= batch_size:
+            _flush()
+    _flush()
+    errors.sort(key=lambda e: e["index"])
+    return created, errors
+
+
 def _normalize_custom_meal_id_token(meal_id):
     token = str(meal_id).strip()
     if token.startswith("custom_"):
@@ -876,29 +889,89 @@ def _normalize_custom_meal_id_token(meal_id):
     return token
 
 
+def _custom_recipe(item):
+    """Een eigen maaltijd uit de DB in de receptvorm van de planner en de frontend."""
+    return {
+        "id": f"custom_{item['id']}",
+        "name": item["name"],
+        "description": item.get("description", ""),
+        "image_url": item.get("image_url", ""),
+        "rating": int(item.get("rating") or 3),
+        "tags": item.get("tags", []),
+        "allergens": item.get("allergens", []),
+        "ingredients": item.get("ingredients", []),
+        "preparation": item.get("preparation", []),
+        "nutrition": item.get("nutrition", {}),
+        "rotation_limit": item.get("rotation_limit", "1_per_week"),
+        "servings": _recipe_servings(item),
+        "source_url": item.get("source_url", ""),
+        "course": item.get("course", DEFAULT_COURSE),
+    }
+
+
 def _custom_recipes_for_user(user_email):
-    custom_meals = list_custom_meals(user_email)
-    out = []
-    for item in custom_meals:
-        out.append(
-            {
-                "id": f"custom_{item['id']}",
-                "name": item["name"],
-                "description": item.get("description", ""),
-                "image_url": item.get("image_url", ""),
-                "rating": int(item.get("rating") or 3),
-                "tags": item.get("tags", []),
-                "allergens": item.get("allergens", []),
-                "ingredients": item.get("ingredients", []),
-                "preparation": item.get("preparation", []),
-                "nutrition": item.get("nutrition", {}),
-                "rotation_limit": item.get("rotation_limit", "1_per_week"),
-                "servings": _recipe_servings(item),
-                "source_url": item.get("source_url", ""),
-                "course": item.get("course", DEFAULT_COURSE),
-            }
-        )
-    return out
+    return [_custom_recipe(item) for item in list_custom_meals(user_email)]
+
+
+def _run_import_job(job_id, user_email, url, limit):
+    """Draait een importjob: ophalen, kcal, tags, opslaan, met voortgang in de DB.
+
+    Loopt in de importpool, dus los van de request die hem startte: een
+    gebruiker die de pagina sluit verliest niets.
+    """
+    lock = threading.Lock()
+    progress = {}
+
+    def _meld(item_url, status, reden=""):
+        # Onder de lock, zodat een oudere stand nooit een nieuwere overschrijft.
+        with lock:
+            progress[item_url] = {"url": item_url, "status": status, "reden": reden}
+            update_import_job(job_id, progress=list(progress.values()))
+
+    update_import_job(job_id, status="running")
+    try:
+        meals, import_errors = importeer_van_url(url, limiet=limit, voortgang=_meld)
+
+        skipped, valid = [], []
+        tabel = tabel_uit_database()
+        for meal in meals:
+            bron = meal.get("source_url", "")
+            normalized, error = _normalize_custom_meal_payload(meal)
+            if error:
+                import_errors.append({"url": bron, "reden": error})
+                _meld(bron, "mislukt", error)
+                continue
+            _vul_calorieen_aan(normalized, tabel)
+            verrijk(normalized)
+            valid.append(normalized)
+
+        created, duplicates = create_custom_meals_bulk(get_user_group_id(user_email), valid, user_email)
+        duplicates = set(duplicates)
+        for index, normalized in enumerate(valid):
+            bron = normalized.get("source_url", "")
+            if index in duplicates:
+                skipped.append({"url": bron, "reden": "bestaat al"})
+                _meld(bron, "bestaat al")
+            else:
+                _meld(bron, "toegevoegd")
+    except ImportFout as exc:
+        update_import_job(job_id, status="failed", error=str(exc))
+        return
+    except Exception:
+        # De future van de pool wordt nergens gelezen: wat hier niet gelogd
+        # wordt, is weg, en de job bleef anders op "running" staan.
+        logger.exception("Onverwachte fout bij importeren van %s", url)
+        update_import_job(job_id, status="failed", error="Import mislukt door een onverwachte fout.")
+        return
+
+    update_import_job(
+        job_id,
+        status="done",
+        found=len(meals),
+        created=created,
+        skipped=skipped,
+        errors=import_errors,
+    )
 
 
 def _recipe_map_for_user(user_email):
@@ -915,12 +988,115 @@ def _recipe_map_for_user(user_email):
     return {r["id"]: r for r in combined}
 
 
+def _recipes_for_ids(group_id, meal_ids):
+    """Zelfde opzoektabel als _recipe_map_for_user, maar alleen voor deze ids.
+
+    Basisrecepten komen uit het geheugen, eigen en bewaarde AI-maaltijden in
+    één keer uit de database. De AI-cache is alleen nog nodig voor een groep
+    zonder bewaarde AI-maaltijden, zoals in _recipe_map_for_user; die lezen we
+    enkel, zonder een fetch te starten of op een lopende te wachten.
+    """
+    base = recipes_by_id()
+    found = {mid: base[mid] for mid in meal_ids if mid in base}
+    custom_ids, ai_ids = [], []
+    for mid in set(meal_ids) - set(found):
+        token = _normalize_custom_meal_id_token(mid) if str(mid).startswith("custom_") else None
+        if token:
+            custom_ids.append(token)
+        else:
+            ai_ids.append(mid)
+    if not custom_ids and not ai_ids:
+        return found
+
+    custom, ai = get_meals_by_ids(group_id, custom_ids, ai_ids)
+    found.update((recipe["id"], recipe) for recipe in map(_custom_recipe, custom))
+    found.update((recipe["id"], recipe) for recipe in ai)
+    missing = set(ai_ids) - set(found)
+    if missing and not has_generated_ai_meals(group_id):
+        found.update((r["id"], r) for r in get_cached_ai_menu_recipes(limit=24) if r.get("id") in missing)
+    return found
+
+
+@lru_cache(maxsize=1)
+def _base_shopping_vectors():
+    """Boodschapvectoren van de basisrecepten; recipes.json wijzigt alleen bij een deploy."""
+    return {rid: (r.get("servings"), boodschapvector(r.get("ingredients"))) for rid, r in recipes_by_id().items()}
+
+
+# Vectoren van AI-maaltijden die enkel in de menucache staan: daar is geen
+# rij om ze in te bewaren. Het id bevat een hash van de ingrediënten, dus een
+# vector per (id, VECTOR_VERSIE) blijft kloppen. Begrensd: vol is leegmaken.
+_AI_CACHE_VECTOREN_MAX = 512
+_ai_cache_vectoren = {}
+
+
+def _shopping_vectors(group_id, meal_ids):
+    """{meal_id: (porties, boodschapvector)} voor deze ids.
+
+    De vectoren staan klaar: bij de basisrecepten in het geheugen, bij eigen en
+    AI-maaltijden in de database (berekend bij het wegschrijven). Ontbreekt er
+    een of is hij verouderd, dan rekenen we hem hier uit en bewaren hem; voor
+    een AI-maaltijd zonder rij in _ai_cache_vectoren.
+    """
+    base = _base_shopping_vectors()
+    found = {mid: base[mid] for mid in meal_ids if mid in base}
+    custom_ids, ai_ids = {}, []
+    for mid in set(meal_ids) - set(found):
+        token = _normalize_custom_meal_id_token(mid) if str(mid).startswith("custom_") else None
+        if token:
+            custom_ids[int(token)] = mid
+        else:
+            ai_ids.append(mid)
+    if not custom_ids and not ai_ids:
+        return found
+
+    stored_custom, stored_ai = get_shopping_vectors(group_id, custom_ids, ai_ids)
+    for meal_id, (servings, stored) in stored_custom.items():
+        vector = vector_uit_json(stored)
+        if vector:
+            found[custom_ids[meal_id]] = (servings, vector[1])
+    for mid, stored in stored_ai.items():
+        vector = vector_uit_json(stored)
+        if vector:
+            found[mid] = vector
+
+    for mid in ai_ids:
+        if mid not in found and (mid, VECTOR_VERSIE) in _ai_cache_vectoren:
+            found[mid] = _ai_cache_vectoren[(mid, VECTOR_VERSIE)]
+
+    missing = set(custom_ids.values()) | set(ai_ids)
+    missing -= set(found)
+    if not missing:
+        return found
+    # Van voor de vectoren, of met een oudere normalisatie: eenmalig uitrekenen.
+    custom_updates, ai_updates = [], []
+    for mid, recipe in _recipes_for_ids(group_id, missing).items():
+        found[mid] = (recipe.get("servings"), boodschapvector(recipe.get("ingredients")))
+        token = _normalize_custom_meal_id_token(mid) if str(mid).startswith("custom_") else None
+        if token and int(token) in stored_custom:
+            nieuw = vector_json(recipe.get("ingredients"))
+            custom_updates.append((int(token), nieuw, stored_custom[int(token)][1]))
+        elif mid in stored_ai:
+            nieuw = vector_json(recipe.get("ingredients"), recipe.get("servings"))
+            ai_updates.append((mid, nieuw, stored_ai[mid]))
+        elif not token:
+            if len(_ai_cache_vectoren) >= _AI_CACHE_VECTOREN_MAX:
+                _ai_cache_vectoren.clear()
+            _ai_cache_vectoren[(mid, VECTOR_VERSIE)] = found[mid]
+    set_shopping_vectors(custom_updates, ai_updates)
+    return found
+
+
 def register_routes(app):
     @app.get("/pictures/<path:filename>")
     def pictures_file(filename):
         pictures_dir = _pictures_dir()
         pictures_dir.mkdir(parents=True, exist_ok=True)
-        return send_from_directory(pictures_dir, filename)
+        # Elke upload krijgt een nieuwe naam, dus een bestand wijzigt nooit.
+        response = send_from_directory(pictures_dir, filename, max_age=PICTURE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
 
     @app.get("/sw.js")
     def service_worker():
@@ -957,6 +1133,7 @@ def register_routes(app):
             meal_id=meal_id,
             editable=meal_id.startswith("custom_"),
             meal_image=_meal_image_for_detail(recipe),
+            meal_image_variants=_image_variants(recipe.get("image_url")),
             date_label=request.args.get("date", ""),
             servings=_recipe_servings(recipe),
             source_label=_source_label(recipe),
@@ -1750,13 +1927,15 @@ def register_routes(app):
         result = []
         for day in _date_range(start, end):
             row = by_day.get(day)
+            planned = recipe_map.get(row["meal_id"], {}) if row and row["cook"] and row["meal_id"] else None
             result.append(
                 {
                     "date": day,
                     "cook": bool(row["cook"]) if row else True,
                     "meal_id": row["meal_id"] if row else None,
-                    "meal_name": recipe_map.get(row["meal_id"], {}).get("name") if row and row["cook"] and row["meal_id"] else None,
-                    "meal_image": recipe_map.get(row["meal_id"], {}).get("image_url") if row and row["cook"] and row["meal_id"] else None,
+                    "meal_name": planned.get("name") if planned is not None else None,
+                    "meal_image": planned.get("image_url") if planned is not None else None,
+                    "image_variants": _image_variants(planned.get("image_url")) if planned is not None else None,
                     "shopping_done": int(shopping_history_counts.get(day, 0)) > 0,
                     "shopping_count": int(shopping_history_counts.get(day, 0)),
                 }
@@ -1804,20 +1983,36 @@ def register_routes(app):
         user_settings = _settings_for_user(user["email"], _runtime_settings(app))
         planner_context = _planner_ai_context(options, user_settings)
         effective_allergies = _effective_allergies(user["email"], user_settings)
-        extra_recipes = _extra_recipes_for_mode(user["email"], planner_context)
-        include_base_recipes = _include_base_recipes_for_mode(user["email"])
-        if not include_base_recipes and not extra_recipes:
-            return jsonify({"error": "Geen AI maaltijden beschikbaar. Controleer de Admin AI-configuratie of pas je planneropties aan."}), 400
-        recipe_map = _recipe_map_for_user(user["email"])
-        prev_day = get_day(user["group_id"], _shift_iso(day, -1)) or {}
-        next_day = get_day(user["group_id"], _shift_iso(day, 1)) or {}
-        prev_recipe = recipe_map.get(prev_day.get("meal_id")) if prev_day.get("meal_id") else None
-        next_recipe = recipe_map.get(next_day.get("meal_id")) if next_day.get("meal_id") else None
         # Alles wat al in deze planning staat is uitgesloten, niet alleen het
         # gerecht van vandaag: anders zet "Opnieuw" er iets neer dat verderop in
         # de week al gepland is.
         al_gepland = _geplande_maaltijden_rond(user["group_id"], day)
         uitgesloten = list(dict.fromkeys([*al_gepland, *([current_meal_id] if current_meal_id else [])]))
+        extra_recipes = _extra_recipes_for_mode(
+            user["email"], planner_context, allergies=effective_allergies, excluded_ids=uitgesloten
+        )
+        include_base_recipes = _include_base_recipes_for_mode(user["email"])
+        alles_gepland = (
+            "Geen ander gerecht beschikbaar: al je passende recepten staan "
+            "al in deze planning. Voeg er een toe of kies zelf een gerecht."
+        )
+        if not include_base_recipes and not extra_recipes:
+            # Zonder uitsluitingen wel kandidaten: dan staat alles al gepland, en
+            # dat is geen configuratiefout. Anders leverde geen enkele bron iets.
+            mode, _ = _effective_menu_mode(user["email"])
+            if uitgesloten and mode != "ai_only" and list_planner_candidates(
+                user["group_id"], excluded_allergens=effective_allergies
+            ):
+                logger.info("Opnieuw voor %s: alle kandidaten staan al in de planning.", day)
+                return jsonify({"error": alles_gepland}), 400
+            logger.warning("Opnieuw voor %s: geen kandidaten in menu_mode %s.", day, mode)
+            return jsonify({"error": "Geen AI maaltijden beschikbaar. Controleer de Admin AI-configuratie of pas je planneropties aan."}), 400
+        prev_day = get_day(user["group_id"], _shift_iso(day, -1)) or {}
+        next_day = get_day(user["group_id"], _shift_iso(day, 1)) or {}
+        # Alleen de buren opzoeken, niet elke maaltijd van de groep.
+        buren = _recipes_for_ids(user["group_id"], [d["meal_id"] for d in (prev_day, next_day) if d.get("meal_id")])
+        prev_recipe = buren.get(prev_day.get("meal_id"))
+        next_recipe = buren.get(next_day.get("meal_id"))
 
         recipe = select_best_recipe(
             user_settings,
@@ -1832,10 +2027,7 @@ def register_routes(app):
             include_base_recipes=include_base_recipes,
         )
         if not recipe:
-            return jsonify(
-                {"error": "Geen ander gerecht beschikbaar: al je passende recepten staan "
-                          "al in deze planning. Voeg er een toe of kies zelf een gerecht."}
-            ), 400
+            return jsonify({"error": alles_gepland}), 400
 
         set_day_meal(user["group_id"], day, recipe["id"])
         clear_shopping_items(user["email"])
@@ -1849,6 +2041,7 @@ def register_routes(app):
                     "person_count": person_count,
                     "nutrition": recipe.get("nutrition", {}),
                     "image_url": recipe.get("image_url", ""),
+                    "image_variants": _image_variants(recipe.get("image_url")),
                     "explanation": _meal_explanation(recipe, options, person_count),
                 },
             }
@@ -1857,13 +2050,27 @@ def register_routes(app):
     @app.get("/api/custom-meals")
     def api_custom_meals_get():
         user = _require_auth()
-        return jsonify({"items": _custom_recipes_for_user(user["email"])})
+        items = _custom_recipes_for_user(user["email"])
+        for item in items:
+            item["image_variants"] = _image_variants(item["image_url"])
+        return jsonify({"items": items})
 
     @app.get("/api/custom-meals/export")
     def api_custom_meals_export():
+        """Export van alle eigen maaltijden, gestreamd.
+
+        ?format=ndjson geeft één maaltijd per regel, anders {"items": [...]}.
+        Met Accept-Encoding: gzip komt het gecomprimeerd.
+        """
         user = _require_auth()
-        items = [_custom_meal_bulk_item(item) for item in list_custom_meals(user["email"])]
-        return jsonify({"items": items})
+        ndjson = request.args.get("format") == "ndjson"
+        chunks = _export_chunks(user["group_id"], ndjson=ndjson)
+        headers = {"Vary": "Accept-Encoding"}
+        if "gzip" in request.accept_encodings:
+            chunks = _gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+        mimetype = "application/x-ndjson" if ndjson else "application/json"
+        return Response(chunks, mimetype=mimetype, headers=headers)
 
     @app.post("/api/custom-meals")
     def api_custom_meals_post():
@@ -1873,78 +2080,86 @@ def register_routes(app):
         if error:
             return jsonify({"error": error}), 400
 
-        meal_id = create_custom_meal(
-            user["email"],
-            normalized,
-        )
+        # Meteen verrijkt, zoals de retag het zou doen: dan is ze bij de
+        # volgende retag niet verouderd.
+        try:
+            meal_id = create_custom_meal(
+                user["email"],
+                verrijk(normalized),
+            )
+        except sqlite3.IntegrityError:
+            return jsonify({"error": "name already exists"}), 409
         return jsonify({"ok": True, "id": meal_id})
 
     @app.post("/api/custom-meals/bulk")
     def api_custom_meals_bulk_post():
+        """Voegt maaltijden in bulk toe: een JSON-body {"items": [...]} of NDJSON.
+
+        NDJSON (Content-Type application/x-ndjson, eventueel met
+        Content-Encoding: gzip) wordt regel per regel gelezen en per batch
+        bewaard, zodat ook een grote export terugzetten weinig geheugen vraagt.
+        """
         user = _require_auth()
+        if request.mimetype == "application/x-ndjson":
+            stream = request.stream
+            if request.headers.get("Content-Encoding", "").lower() == "gzip":
+                stream = gzip.GzipFile(fileobj=stream)
+            try:
+                created, errors = _import_ndjson(stream, user["group_id"], user["email"])
+            except (OSError, EOFError):
+                return jsonify({"error": "invalid gzip body"}), 400
+            return jsonify({"ok": True, "created": created, "errors": errors})
+
         payload = request.get_json(force=True, silent=True) or {}
         items = payload.get("items", [])
         if not isinstance(items, list) or not items:
             return jsonify({"error": "items must be a non-empty list"}), 400
 
-        created = 0
         errors = []
+        valid, positions = [], []
         for idx, item in enumerate(items, start=1):
             normalized, error = _normalize_custom_meal_payload(item or {})
             if error:
                 errors.append({"index": idx, "error": error})
                 continue
-            create_custom_meal(user["email"], normalized)
-            created += 1
+            valid.append(normalized)
+            positions.append(idx)
 
+        created, duplicates = create_custom_meals_bulk(user["group_id"], valid, user["email"])
+        errors.extend({"index": positions[i], "error": "name already exists"} for i in duplicates)
+        errors.sort(key=lambda e: e["index"])
         return jsonify({"ok": True, "created": created, "errors": errors})
 
     @app.post("/api/custom-meals/import")
     def api_custom_meals_import():
-        """Importeert recepten van een publieke website.
+        """Start een import van recepten van een publieke website.
 
         Werkt zowel voor één receptpagina als voor een overzichtspagina: in dat
         tweede geval worden de receptlinks op die pagina afgelopen. De import
-        gebeurt synchroon, dus met een bovengrens op het aantal.
+        loopt als job op de achtergrond; dit geeft meteen een job-id terug en
+        de voortgang is op te vragen via GET /api/custom-meals/import/<job_id>.
         """
         user = _require_auth()
         payload = request.get_json(force=True, silent=True) or {}
         url = str(payload.get("url") or "").strip()
         if not url:
             return jsonify({"error": "Geef een link op."}), 400
+        if not url.startswith(("http://", "https://")):
+            return jsonify({"error": "Geef een volledige link op, beginnend met https://"}), 400
         limit = _parse_int(payload.get("limit"), default=MAX_PER_IMPORT, min_value=1, max_value=MAX_PER_IMPORT)
 
-        try:
-            meals, import_errors = importeer_van_url(url, limiet=limit)
-        except ImportFout as exc:
-            return jsonify({"error": str(exc)}), 400
-        except Exception:
-            logger.exception("Onverwachte fout bij importeren van %s", url)
-            return jsonify({"error": "Import mislukt door een onverwachte fout."}), 500
-
-        created, skipped = 0, []
-        bestaande = {str(m.get("name", "")).strip().lower() for m in _custom_recipes_for_user(user["email"])}
-        for meal in meals:
-            if str(meal.get("name", "")).strip().lower() in bestaande:
-                skipped.append({"url": meal.get("source_url", ""), "reden": "bestaat al"})
-                continue
-            normalized, error = _normalize_custom_meal_payload(meal)
-            if error:
-                import_errors.append({"url": meal.get("source_url", ""), "reden": error})
-                continue
-            _vul_calorieen_aan(normalized)
-            verrijk(normalized)
-            create_custom_meal(user["email"], normalized)
-            bestaande.add(str(meal.get("name", "")).strip().lower())
-            created += 1
-
-        return jsonify({
-            "ok": True,
-            "created": created,
-            "found": len(meals),
-            "skipped": skipped,
-            "errors": import_errors,
-        })
+        job_id = create_import_job(user["email"], user["group_id"], url)
+        _import_pool.submit(_run_import_job, job_id, user["email"], url, limit)
+        return jsonify({"ok": True, "job_id": job_id, "status": "queued"}), 202
+
+    @app.get("/api/custom-meals/import/<job_id>")
+    def api_custom_meals_import_status(job_id):
+        """Voortgang van een importjob: status, per URL wat er gebeurde, en het resultaat."""
+        user = _require_auth()
+        job = get_import_job(job_id, user["group_id"])
+        if not job:
+            return jsonify({"error": "import niet gevonden"}), 404
+        return jsonify({"ok": True, **job})
 
     @app.put("/api/custom-meals/<meal_id>")
     def api_custom_meals_put(meal_id):
@@ -1959,7 +2174,10 @@ def register_routes(app):
         if error:
             return jsonify({"error": error}), 400
 
-        ok = update_custom_meal(user["email"], meal_token, normalized)
+        try:
+            ok = update_custom_meal(user["email"], meal_token, verrijk(normalized))
+        except sqlite3.IntegrityError:
+            return jsonify({"error": "name already exists"}), 409
         if not ok:
             return jsonify({"error": "meal not found"}), 404
         return jsonify({"ok": True})
@@ -1999,15 +2217,14 @@ def register_routes(app):
         if ext not in {".jpg", ".jpeg", ".png", ".webp", ".gif"}:
             ext = ".jpg"
 
-        target_dir = _pictures_dir()
-        target_dir.mkdir(parents=True, exist_ok=True)
-        filename = f"custom_{meal_token}_{uuid4().hex[:12]}{ext}"
-        target_path = target_dir / filename
-        photo.save(target_path)
+        try:
+            filename = bewaar_upload(photo, _pictures_dir(), f"custom_{meal_token}_{uuid4().hex[:12]}", ext)
+        except OnleesbareFoto:
+            return jsonify({"error": "Deze foto kunnen we niet lezen. Probeer een JPEG of PNG."}), 400
 
         image_url = f"/pictures/{filename}"
         update_custom_meal_image(user["email"], meal_token, image_url)
-        return jsonify({"ok": True, "image_url": image_url})
+        return jsonify({"ok": True, "image_url": image_url, "image_variants": _image_variants(image_url)})
 
     @app.delete("/api/custom-meals")
     def api_custom_meals_delete():
@@ -2047,7 +2264,7 @@ def register_routes(app):
         user_settings = _settings_for_user(user["email"], _runtime_settings(app))
         planner_context = _planner_ai_context(options, user_settings)
         effective_allergies = _effective_allergies(user["email"], user_settings)
-        extra_recipes = _extra_recipes_for_mode(user["email"], planner_context)
+        extra_recipes = _extra_recipes_for_mode(user["email"], planner_context, allergies=effective_allergies)
         include_base_recipes = _include_base_recipes_for_mode(user["email"])
         if not include_base_recipes and not extra_recipes:
             return jsonify({"error": "Geen AI maaltijden beschikbaar. Controleer de Admin AI-configuratie of pas je planneropties aan."}), 400
@@ -2086,6 +2303,7 @@ def register_routes(app):
                     "person_count": person_count,
                     "nutrition": recipe.get("nutrition", {}),
                     "image_url": recipe.get("image_url", ""),
+                    "image_variants": _image_variants(recipe.get("image_url")),
                     "explanation": _meal_explanation(recipe, options, person_count),
                 }
             )
@@ -2159,7 +2377,7 @@ def register_routes(app):
                 return jsonify({"error": "dates or start/end are required"}), 400
             dates = list(_date_range(start, end))
 
-        output = _build_shopping_items(user["email"], user["group_id"], dates, person_count, base_servings)
+        output = _build_shopping_items(user["group_id"], dates, person_count, base_servings)
         replace_shopping_items(user["email"], output)
         return jsonify({"items": _decorate_shopping_items(list_shopping_items(user["email"])), "person_count": person_count})
 
@@ -2170,8 +2388,8 @@ def register_routes(app):
         name = (payload.get("name") or "").strip()
         if not name:
             return jsonify({"error": "name is required"}), 400
-        quantity, unit = _normalize_unit(payload.get("quantity", 1), payload.get("unit", "stuk"))
-        normalized_name = _normalize_ingredient_name(name)
+        quantity, unit = naar_canoniek(payload.get("quantity", 1), payload.get("unit", "stuk"))
+        normalized_name = boodschapnaam(name)
         add_shopping_item(user["email"], normalized_name, quantity, unit)
         normalized = _normalize_stored_shopping_items(list_shopping_items(user["email"]))
         replace_shopping_items(user["email"], normalized)
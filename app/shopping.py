@@ -0,0 +1,189 @@
+"""Eenheden op de boodschappenlijst: herkennen, omrekenen en samentellen.
+
+Elke eenheid hoort bij een dimensie met één canonieke eenheid:
+
+  - massa: gram ("1 kg" wordt 1000 g, "4 oz" 113 g)
+  - volume: milliliter ("1 l" wordt 1000 ml, "2 el" 30 ml, "1 tl" 5 ml)
+  - aantal: stuk, ook zonder eenheid ("2 uien")
+  - en eenheden zonder vaste maat, zoals teentje, blik of bosje, die elk hun
+    eigen dimensie zijn
+
+Zo vallen "2 el olijfolie" en "30 ml olijfolie" samen op 60 ml. Staat een
+ingredient ook in gram op de lijst, dan gaat de rest mee naar gram, als we
+weten hoeveel een stuk, een milliliter of een teentje ervan weegt: dezelfde
+tabellen als de kcal-schatting (EENHEID_IN_GRAM, GRAM_PER_STUK). Wat we niet
+kunnen omrekenen blijft een aparte regel; beter twee regels dan een verzonnen
+gewicht.
+
+Het register staat klaar bij het laden: een eenheid opzoeken is één dict-lookup.
+
+Per recept hoeft dat zelfs maar één keer. boodschapvector zet de ingredienten
+om naar (naam, eenheid, hoeveelheid) in canonieke vorm, en de database bewaart
+die vector bij het wegschrijven van het recept. Een boodschappenlijst is dan
+nog enkel schalen en optellen.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from . import ingredients, units
+from .ingredients import boodschapnaam
+from .nutrition import EENHEID_IN_GRAM, GRAM_PER_STUK
+from .units import NAAR_GRAM, NAAR_ML
+
+MASSA = "massa"
+VOLUME = "volume"
+AANTAL = "aantal"
+
+# Ruwe eenheid (kleine letters) -> (dimensie, canonieke eenheid, factor).
+EENHEDEN = {}
+
+
+def _registreer(dimensie, canoniek, factor, *namen):
+    for naam in namen:
+        EENHEDEN[naam] = (dimensie, canoniek, factor)
+
+
+_registreer(MASSA, "g", 1.0, "g", "gr", "grs", "gram", "grams", "grammen")
+_registreer(MASSA, "g", 1000.0, "kg", "kilo", "kilos", "kilogram", "kilograms")
+for _naam, _factor in NAAR_GRAM.items():
+    _registreer(MASSA, "g", _factor, _naam)
+
+_registreer(VOLUME, "ml", 1.0, "ml", "milliliter", "milliliters", "millilitre", "millilitres")
+_registreer(VOLUME, "ml", 1000.0, "l", "liter", "liters", "litre", "litres")
+_registreer(VOLUME, "ml", 100.0, "dl", "deciliter")
+_registreer(VOLUME, "ml", 10.0, "cl", "centiliter")
+_registreer(VOLUME, "ml", 15.0, "el", "eetlepel", "eetlepels", "tbsp", "tbs", "tblsp", "tablespoon", "tablespoons")
+_registreer(VOLUME, "ml", 5.0, "tl", "theelepel", "theelepels", "tsp", "teaspoon", "teaspoons")
+for _naam, _factor in NAAR_ML.items():
+    _registreer(VOLUME, "ml", _factor, _naam)
+
+# Zonder eenheid is het een aantal: "2 uien" is 2 stuk.
+_registreer(AANTAL, "stuk", 1.0, "", "stuk", "stuks", "piece", "pieces", "pc", "pcs")
+
+# Eenheden zonder vaste maat: elk zijn eigen dimensie, onder één naam.
+for _canoniek, _namen in {
+    "teentje": ("teentje", "teentjes", "teen", "tenen", "clove", "cloves"),
+    "snufje": ("snufje", "snufjes", "snuf", "pinch", "pinches"),
+    "scheut": ("scheut", "scheutje", "splash"),
+    "handvol": ("handvol", "handful", "handfuls"),
+    "bosje": ("bosje", "bosjes", "bunch", "bunches"),
+    "takje": ("takje", "takjes", "sprig", "sprigs"),
+    "blik": ("blik", "blikje", "blikken", "blikjes", "can", "cans"),
+    "zak": ("zak", "zakje", "zakken", "zakjes"),
+    "sneetje": ("sneetje", "sneetjes", "slice", "slices"),
+    "stronk": ("stronk", "stronken"),
+}.items():
+    _registreer(_canoniek, _canoniek, 1.0, *_namen)
+
+# Gram per milliliter; water als benadering, zoals in de kcal-schatting.
+_GRAM_PER_ML = EENHEID_IN_GRAM["ml"]
+
+
+def _token(eenheid):
+    return " ".join(str(eenheid or "").strip().lower().split()).rstrip(".")
+
+
+def naar_canoniek(hoeveelheid, eenheid):
+    """(hoeveelheid, eenheid) in de canonieke eenheid van haar dimensie.
+
+    Een onbekende eenheid blijft zoals ze is, in kleine letters. Zonder
+    hoeveelheid en eenheid ("peper", "zout naar smaak") is het geen aantal.
+    """
+    hoeveelheid = float(hoeveelheid or 0)
+    ruw = _token(eenheid)
+    if not ruw and not hoeveelheid:
+        return 0.0, ""
+    gekend = EENHEDEN.get(ruw)
+    if gekend is None:
+        return hoeveelheid, ruw
+    _, canoniek, factor = gekend
+    return hoeveelheid * factor, canoniek
+
+
+def _gram_per(naam, eenheid):
+    """Gram per canonieke eenheid van dit ingredient, of None als we het niet weten."""
+    if eenheid == "ml":
+        return _GRAM_PER_ML
+    if eenheid in ("stuk", ""):
+        # Een regel zonder hoeveelheid weegt niets; hij valt gewoon mee in gram.
+        return GRAM_PER_STUK.get(naam)
+    return EENHEID_IN_GRAM.get(eenheid)
+
+
+def tel_samen(regels, al_canoniek=False):
+    """Telt (naam, hoeveelheid, eenheid)-regels op; geeft {(naam, eenheid): hoeveelheid}.
+
+    Eén doorloop over de regels, elke eenheid meteen canoniek (of al_canoniek,
+    voor regels uit een boodschapvector). Daarna per naam: staat die ook in gram
+    op de lijst, dan gaan de andere eenheden daarin op waar het gewicht gekend is.
+    """
+    per_naam = {}
+    for naam, hoeveelheid, eenheid in regels:
+        if not al_canoniek:
+            hoeveelheid, eenheid = naar_canoniek(hoeveelheid, eenheid)
+        bakjes = per_naam.setdefault(naam, {})
+        bakjes[eenheid] = bakjes.get(eenheid, 0.0) + hoeveelheid
+
+    totaal = {}
+    for naam, bakjes in per_naam.items():
+        if "g" in bakjes and len(bakjes) > 1:
+            for eenheid in [e for e in bakjes if e != "g"]:
+                gram = _gram_per(naam, eenheid)
+                if gram:
+                    bakjes["g"] += bakjes.pop(eenheid) * gram
+        for eenheid, hoeveelheid in bakjes.items():
+            totaal[(naam, eenheid)] = hoeveelheid
+    return totaal
+
+
+# Versie van de vectoren: de hash van de code die namen en eenheden omzet. Een
+# bewaarde vector met een andere versie wordt opnieuw berekend.
+VECTOR_VERSIE = hashlib.sha256(
+    b"".join(Path(module.__file__).read_bytes() for module in (ingredients, units))
+    + Path(__file__).read_bytes()
+).hexdigest()[:16]
+
+
+def boodschapvector(ingredienten):
+    """(naam, eenheid, hoeveelheid)-tuples van een recept, canoniek en per naam en eenheid opgeteld.
+
+    De hoeveelheden zijn die van het recept zoals het geschreven is; schalen
+    naar het aantal personen gebeurt bij het optellen, want een recept zonder
+    eigen porties schaalt vanaf de standaard van die lijst.
+    """
+    som = {}
+    for ingredient in ingredienten or []:
+        if isinstance(ingredient, str):
+            ingredient = {"name": ingredient}
+        if not isinstance(ingredient, dict):
+            continue
+        naam = boodschapnaam(ingredient.get("name", ""))
+        try:
+            hoeveelheid, eenheid = naar_canoniek(ingredient.get("quantity", 0), ingredient.get("unit", ""))
+        except (TypeError, ValueError):
+            hoeveelheid, eenheid = naar_canoniek(0, ingredient.get("unit", ""))
+        som[(naam, eenheid)] = som.get((naam, eenheid), 0.0) + hoeveelheid
+    return tuple((naam, eenheid, hoeveelheid) for (naam, eenheid), hoeveelheid in som.items())
+
+
+def vector_json(ingredienten, porties=None):
+    """De boodschapvector als JSON, zoals de database hem bewaart."""
+    return json.dumps(
+        {"versie": VECTOR_VERSIE, "porties": porties, "regels": boodschapvector(ingredienten)},
+        ensure_ascii=False,
+    )
+
+
+def vector_uit_json(tekst):
+    """(porties, regels) uit vector_json, of None als hij ontbreekt of verouderd is."""
+    if not tekst:
+        return None
+    try:
+        data = json.loads(tekst)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("versie") != VECTOR_VERSIE:
+        return None
+    return data.get("porties"), tuple(tuple(regel) for regel in data.get("regels") or [])
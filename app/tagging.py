@@ -16,7 +16,10 @@ ingredientnamen; bij twijfel liever een allergeen te veel dan te weinig, want de
 planner gebruikt ze als harde uitsluiting.
 """
 
+import hashlib
+import json
 import re
+from pathlib import Path
 
 MIN_TAGS = 6
 MAX_TAGS = 10
@@ -185,12 +188,37 @@ _ALLERGEEN_REGELS = [
 ]
 
 
+class _RegelZoeker:
+    """Een lijst (tag, patroon), één keer gecompileerd.
+
+    Zonder re.I: de teksten komen altijd al in kleine letters binnen (zie
+    _hooiberg en _stappen_tekst) en de patronen staan in kleine letters. Met
+    re.I valt de snelle zoekweg van de regex-engine weg en duurt elke regel
+    ruim drie keer zo lang. Eén gecombineerde regex is in CPython trager, niet
+    sneller: hij verliest diezelfde snelle zoekweg per patroon en moet na elke
+    treffer alsnog de overige regels op die positie nakijken.
+    """
+
+    def __init__(self, regels):
+        self._regels = [(tag, re.compile(patroon)) for tag, patroon in regels]
+
+    def treffers(self, tekst):
+        """Tags van de regels die in de (kleine letters) tekst voorkomen, in volgorde."""
+        return [tag for tag, patroon in self._regels if patroon.search(tekst)]
+
+
+_INGREDIENT_ZOEKER = _RegelZoeker(_INGREDIENT_TAGS)
+_STIJL_ZOEKER = _RegelZoeker(_STIJL_TAGS)
+_ALLERGEEN_ZOEKER = _RegelZoeker(_ALLERGEEN_REGELS)
+_WITRUIMTE = re.compile(r"\s+")
+
+
 def _hooiberg(recept):
     """Alle tekst waar we tags uit kunnen afleiden, als één doorzoekbare string."""
     delen = [str((recept or {}).get("name") or ""), str((recept or {}).get("description") or "")]
     for ingredient in (recept or {}).get("ingredients") or []:
         delen.append(str((ingredient or {}).get("name") or ""))
-    return re.sub(r"\s+", " ", " ".join(delen)).lower()
+    return _WITRUIMTE.sub(" ", " ".join(delen)).lower()
 
 
 def _stappen_tekst(recept):
@@ -216,10 +244,7 @@ def bepaal_tags(recept, bestaande=None):
         voeg_toe(str(tag).strip().lower())
 
     # 1. Concrete ingredienten, in volgorde van de regels.
-    gevonden = []
-    for tag, patroon in _INGREDIENT_TAGS:
-        if re.search(patroon, tekst, re.I):
-            gevonden.append(tag)
+    gevonden = _INGREDIENT_ZOEKER.treffers(tekst)
 
     # 2. Grove categorie erbij; die zet de planner op het juiste spoor.
     categorieen = []
@@ -236,9 +261,8 @@ def bepaal_tags(recept, bestaande=None):
         voeg_toe(tag)
 
     # 3. Bereidingswijze.
-    for tag, patroon in _STIJL_TAGS:
-        if re.search(patroon, stappen or tekst, re.I):
-            voeg_toe(tag)
+    for tag in _STIJL_ZOEKER.treffers(stappen or tekst):
+        voeg_toe(tag)
 
     # 4. Voedingsprofiel, als we de waarden hebben.
     voeding = (recept or {}).get("nutrition") or {}
@@ -279,8 +303,8 @@ def bepaal_allergenen(recept, bestaande=None):
         token = str(allergeen).strip().lower()
         if token and token not in uit:
             uit.append(token)
-    for allergeen, patroon in _ALLERGEEN_REGELS:
-        if allergeen not in uit and re.search(patroon, tekst, re.I):
+    for allergeen in _ALLERGEEN_ZOEKER.treffers(tekst):
+        if allergeen not in uit:
             uit.append(allergeen)
     return uit
 
@@ -290,3 +314,31 @@ def verrijk(recept):
     recept["tags"] = bepaal_tags(recept, recept.get("tags"))
     recept["allergens"] = bepaal_allergenen(recept, recept.get("allergens"))
     return recept
+
+
+# Versie van de regels: de hash van dit bestand. Elke wijziging aan de tabellen
+# of aan de logica hierboven maakt bestaande labels verdacht; een wijziging aan
+# enkel commentaar kost een overbodige maar goedkope controle.
+REGELS_VERSIE = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+
+def verrijk_vingerafdruk(recept):
+    """Hash van alles wat verrijk bekijkt, samen met REGELS_VERSIE.
+
+    Gelijke vingerafdruk: verrijk zou niets veranderen. Zo hoeft een
+    herverrijking van de hele bibliotheek alleen te rekenen waar recept of
+    regels wijzigden.
+    """
+    recept = recept or {}
+    invoer = {
+        "regels": REGELS_VERSIE,
+        "name": recept.get("name") or "",
+        "description": recept.get("description") or "",
+        "course": recept.get("course") or "",
+        "ingredients": [str((i or {}).get("name") or "") for i in recept.get("ingredients") or []],
+        "preparation": [str(stap) for stap in recept.get("preparation") or []],
+        "nutrition": recept.get("nutrition") or {},
+        "tags": list(recept.get("tags") or []),
+        "allergens": list(recept.get("allergens") or []),
+    }
+    return hashlib.sha256(json.dumps(invoer, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
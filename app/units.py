@@ -11,6 +11,10 @@ testbaar. Drie dingen gebeuren hier:
      fluid ounces naar milliliter, inches naar centimeter, Fahrenheit naar Celsius.
 
 Eenheden krijgen meteen hun Nederlandse naam: tablespoon wordt el, teaspoon tl.
+
+Een import van een hele site ontleedt duizenden ingredientregels. Alle patronen
+staan daarom gecompileerd klaar (zie bench/ingredient_parsing.py voor de
+doorvoer).
 """
 
 import re
@@ -48,6 +52,14 @@ HERNOEM = {
 }
 
 
+# Breuktekens weg in één translate, in plaats van een replace per teken.
+_BREUKTEKENS = "".join(BREUKEN)
+_BREUK_WEG = str.maketrans(dict.fromkeys(BREUKEN, " "))
+_DEELSTREEP = re.compile(r"(\d+)\s*/\s*(\d+)")
+_GETAL = re.compile(r"\d+(?:[.,]\d+)?")
+_DUBBELE_SPATIE = re.compile(r"\s{2,}")
+
+
 def parse_getal(tekst):
     """Leest 2, 1.5, 1,5, ½, 1½ en "1 1/2" als getal."""
     ruw = str(tekst or "").strip()
@@ -57,15 +69,17 @@ def parse_getal(tekst):
     totaal = 0.0
     gevonden = False
 
-    # Breuktekens los of achter een geheel getal.
-    for teken, waarde in BREUKEN.items():
-        if teken in ruw:
-            totaal += waarde
-            gevonden = True
-            ruw = ruw.replace(teken, " ")
+    # Breuktekens los of achter een geheel getal. Zuivere ASCII kan er geen hebben.
+    if not ruw.isascii():
+        for teken, waarde in BREUKEN.items():
+            if teken in ruw:
+                totaal += waarde
+                gevonden = True
+        if gevonden:
+            ruw = ruw.translate(_BREUK_WEG)
 
     # "1 1/2" of "3/4"
-    breuk = re.search(r"(\d+)\s*/\s*(\d+)", ruw)
+    breuk = _DEELSTREEP.search(ruw) if "/" in ruw else None
     if breuk:
         noemer = float(breuk.group(2))
         if noemer:
@@ -73,7 +87,7 @@ def parse_getal(tekst):
             gevonden = True
         ruw = ruw[: breuk.start()] + " " + ruw[breuk.end():]
 
-    heel = re.search(r"\d+(?:[.,]\d+)?", ruw)
+    heel = _GETAL.search(ruw)
     if heel:
         totaal += float(heel.group(0).replace(",", "."))
         gevonden = True
@@ -90,16 +104,19 @@ def _afronden(waarde, eenheid):
     return round(waarde, 2)
 
 
+_METRIEK_TUSSEN_HAAKJES = re.compile(
+    r"\(\s*(\d+(?:[.,]\d+)?)\s*(kg|g|gram|grams|ml|mL|milliliters?|l|liters?)\s*\)"
+)
+
+
 def metriek_uit_haakjes(tekst):
     """Haalt een metrische waarde tussen haakjes op, zoals "(908g)" of "(480mL)".
 
     Veel Engelstalige sites zetten die er zelf bij. Dan is omrekenen niet nodig,
     en verdwijnt de rommel meteen uit de ingredientnaam.
     """
-    treffer = re.search(
-        r"\(\s*(\d+(?:[.,]\d+)?)\s*(kg|g|gram|grams|ml|mL|milliliters?|l|liters?)\s*\)",
-        str(tekst or ""),
-    )
+    tekst = str(tekst or "")
+    treffer = _METRIEK_TUSSEN_HAAKJES.search(tekst) if "(" in tekst else None
     if not treffer:
         return None
 
@@ -112,7 +129,7 @@ def metriek_uit_haakjes(tekst):
     elif eenheid in ("liter", "liters"):
         eenheid = "l"
     schoon = (tekst[: treffer.start()] + " " + tekst[treffer.end():]).strip()
-    return waarde, eenheid, re.sub(r"\s{2,}", " ", schoon)
+    return waarde, eenheid, _DUBBELE_SPATIE.sub(" ", schoon)
 
 
 def naar_metriek(hoeveelheid, eenheid):
@@ -135,7 +152,7 @@ _FAHRENHEIT = re.compile(r"(\d{2,3})\s*°?\s*F\b", re.I)
 _GRADEN_MET_CELSIUS = re.compile(
     r"(\d{2,3})\s*°?\s*F\s*\(\s*(\d{2,3})\s*°?\s*C\s*\)", re.I
 )
-_INCHES = re.compile(r"(\d+(?:[.,]\d+)?|[½¼¾⅓⅔⅛])\s*(?:inch(?:es)?|\")", re.I)
+_INCHES = re.compile(rf"(\d+(?:[.,]\d+)?|[{_BREUKTEKENS}])\s*(?:inch(?:es)?|\")", re.I)
 
 
 def tekst_naar_metriek(tekst):
@@ -165,4 +182,58 @@ def tekst_naar_metriek(tekst):
         return f"{mooi} cm"
 
     uit = _INCHES.sub(_inch_naar_cm, uit)
-    return re.sub(r"\s{2,}", " ", uit).strip()
+    return _DUBBELE_SPATIE.sub(" ", uit).strip()
+
+
+# Eenheden die we vooraan een ingredientregel herkennen, Nederlands en Engels.
+EENHEDEN_PATROON = (
+    r"kg|g|gram|grams|l|liter|liters|dl|cl|ml|milliliters?|el|tl|eetlepels?|theelepels?|"
+    r"snuf(?:je)?|teen(?:tje)?s?|stuks?|blik(?:je)?|zak(?:je)?|bosje|takje|handvol|"
+    r"cups?|tbsp|tbs|tablespoons?|tsp|teaspoons?|oz|ounces?|lbs?|pounds?|"
+    r"cloves?|pinch(?:es)?|slices?|pieces?|bunch(?:es)?|cans?|handful"
+)
+_IMPERIAAL_VOORAAN = re.compile(
+    rf"^\s*[\d\s./{_BREUKTEKENS},-]*\s*(?:(?:{EENHEDEN_PATROON})\b)?\.?\s*", re.I
+)
+_HOEVEELHEID_EENHEID_NAAM = re.compile(
+    rf"^([\d.,/{_BREUKTEKENS}\s]+?)\s*(?:({EENHEDEN_PATROON})\b)?\.?\s+(.*)$", re.I
+)
+# Waarmee een regel met een hoeveelheid kan beginnen; andere regels slaan de
+# regex over.
+_HOEVEELHEID_BEGIN = frozenset("0123456789.,/" + _BREUKTEKENS)
+
+
+def ontleed_regel(regel):
+    """Splitst een ingredientregel in hoeveelheid, eenheid en naam, metrisch.
+
+    Volgorde is belangrijk. Staat er al een metrische waarde tussen haakjes
+    ("2 lbs (908g) cream cheese"), dan wint die: exacter dan zelf omrekenen, en
+    het haalt de haakjes uit de naam. Anders lezen we de imperiale hoeveelheid en
+    rekenen die om.
+
+    Lukt ontleden niet, dan komt de hele regel als naam binnen. Dat is beter dan
+    raden: de gebruiker ziet het staan en kan het corrigeren.
+    """
+    tekst = " ".join(str(regel or "").split())
+    if not tekst:
+        return None
+
+    # 1. Metrische waarde die de site zelf al meegaf.
+    uit_haakjes = metriek_uit_haakjes(tekst)
+    if uit_haakjes:
+        hoeveelheid, eenheid, rest = uit_haakjes
+        # De imperiale hoeveelheid vooraan is nu overbodig.
+        naam = _IMPERIAAL_VOORAAN.sub("", rest, count=1).strip(" ,-")
+        if naam:
+            return {"name": naam, "quantity": hoeveelheid, "unit": eenheid}
+
+    # 2. Zelf ontleden en omrekenen.
+    treffer = _HOEVEELHEID_EENHEID_NAAM.match(tekst) if tekst[0] in _HOEVEELHEID_BEGIN else None
+    if treffer:
+        hoeveelheid = parse_getal(treffer.group(1))
+        naam = treffer.group(3).strip(" ,-")
+        if hoeveelheid is not None and naam:
+            hoeveelheid, eenheid = naar_metriek(hoeveelheid, treffer.group(2) or "")
+            return {"name": naam, "quantity": hoeveelheid, "unit": eenheid}
+
+    return {"name": tekst, "quantity": 0, "unit": ""}
@@ -0,0 +1,175 @@
+"""Benchmark van het AI-pad, offline tegen bench.fake_openrouter.
+
+Meet wat we willen bijsturen en bewaken voor een deploy:
+- latency van get_ai_menu_recipes (gewoon, streaming, in deelsets)
+- cache-hitratio bij een realistische mix van plannercontexten
+- doorvoer van _normalize_recipe en _normalize_tags
+- end-to-end tijd van POST /api/generate
+
+Alles draait in een tijdelijke map met een eigen database, .env en settings;
+data/ en config/ van de repo blijven ongemoeid. app/ wordt er als link in
+gezet, omdat de basisrecepten relatief tot de werkmap gelezen worden.
+Starten vanuit de root van de repo:
+
+    python -m bench.ai_pipeline
+    python -m bench.ai_pipeline --latency 1.5 --runs 5 > bench_output.txt
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app import admin_ai, db
+from bench.fake_openrouter import FakeOpenRouter, verzin_recepten
+
+
+def _regel(label, waarden, eenheid="s"):
+    if not waarden:
+        return f"{label:<44} geen metingen"
+    return (
+        f"{label:<44} gem {statistics.mean(waarden):8.3f}{eenheid}"
+        f"  med {statistics.median(waarden):8.3f}{eenheid}  max {max(waarden):8.3f}{eenheid}"
+    )
+
+
+def _schrijf_env(url, stream=False, shards=1):
+    Path(".env").write_text(
+        "\n".join(
+            [
+                f"OPENROUTER_URL={url}",
+                "OPENROUTER_API_KEY=bench",
+                "OPENROUTER_MODEL=bench/fake",
+                f"OPENROUTER_STREAM={'true' if stream else 'false'}",
+                f"MENU_AI_SHARDS={shards}",
+                "",
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+
+def meet_latency(fake, limit, runs):
+    resultaten = []
+    for label, stream, shards in (
+        ("get_ai_menu_recipes gewoon", False, 1),
+        ("get_ai_menu_recipes streaming", True, 1),
+        ("get_ai_menu_recipes 4 deelsets", False, 4),
+    ):
+        _schrijf_env(fake.url, stream=stream, shards=shards)
+        tijden = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            recepten = admin_ai.get_ai_menu_recipes(limit=limit, force_refresh=True)
+            tijden.append(time.perf_counter() - start)
+            if len(recepten) < limit:
+                print(f"  let op: {label} gaf {len(recepten)} van {limit} recepten", file=sys.stderr)
+        resultaten.append(_regel(f"{label} (limit={limit})", tijden))
+    return resultaten
+
+
+def meet_cache_hits(fake, limit, aanvragen):
+    """Een mix van plannercontexten zoals een gezin ze gebruikt; telt de calls naar de server."""
+    _schrijf_env(fake.url)
+    admin_ai.clear_admin_ai_cache()
+    contexten = [
+        {"person_count": 2},
+        {"person_count": 4},
+        {"person_count": 4, "high_protein": True},
+        {"person_count": 2, "low_carb": True},
+        {"person_count": 4, "prefer_fish": True},
+    ]
+    voor = fake.requests
+    start = time.perf_counter()
+    for index in range(aanvragen):
+        # Gezinnen plannen meestal met dezelfde instellingen; de eerste context komt het vaakst voor.
+        context = contexten[0] if index % 2 == 0 else contexten[index % len(contexten)]
+        admin_ai.get_ai_menu_recipes(limit=limit, planner_context=context)
+    duur = time.perf_counter() - start
+    calls = fake.requests - voor
+    hits = aanvragen - calls
+    return [
+        f"{'cache-hitratio':<44} {hits}/{aanvragen} = {hits / aanvragen:.0%} ({calls} calls naar de server)",
+        f"{'gemiddelde tijd per aanvraag':<44} {duur / aanvragen:.4f}s",
+    ]
+
+
+def meet_normalisatie(aantal):
+    ruwe = verzin_recepten(aantal)
+    start = time.perf_counter()
+    for index, item in enumerate(ruwe, start=1):
+        admin_ai._normalize_recipe(item, index, ["pinda"])
+    duur_recept = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for item in ruwe:
+        admin_ai._normalize_tags(item["tags"], item["name"], item["description"], item["ingredients"])
+    duur_tags = time.perf_counter() - start
+    return [
+        f"{'_normalize_recipe':<44} {aantal / duur_recept:10.0f} recepten/s",
+        f"{'_normalize_tags':<44} {aantal / duur_tags:10.0f} recepten/s",
+    ]
+
+
+def meet_generate(fake, runs):
+    from app import create_app
+
+    _schrijf_env(fake.url)
+    os.environ["SESSION_COOKIE_SECURE"] = "false"
+    app = create_app()
+    client = app.test_client()
+    with client.session_transaction() as sessie:
+        sessie["user"] = {"email": "admin@example.com", "name": "Admin", "group_id": 1}
+    payload = {
+        "start": "2030-01-07",
+        "end": "2030-01-13",
+        "force": True,
+        "options": {"person_count": 2},
+    }
+    koud, warm = [], []
+    for _ in range(runs):
+        admin_ai.clear_admin_ai_cache()
+        start = time.perf_counter()
+        antwoord = client.post("/api/generate", json=payload)
+        koud.append(time.perf_counter() - start)
+        if antwoord.status_code != 200:
+            return [f"/api/generate gaf HTTP {antwoord.status_code}: {antwoord.get_data(as_text=True)[:200]}"]
+        start = time.perf_counter()
+        client.post("/api/generate", json=payload)
+        warm.append(time.perf_counter() - start)
+    return [
+        _regel("/api/generate zonder cache", koud),
+        _regel("/api/generate met cache", warm),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark van het AI-pad tegen een lokale fake server.")
+    parser.add_argument("--latency", type=float, default=0.5, help="gesimuleerde modeltijd per antwoord")
+    parser.add_argument("--limit", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=40, help="aanvragen voor de cache-hitratio")
+    parser.add_argument("--normalize", type=int, default=2000, help="recepten voor de normalisatiemeting")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="menu-bench-") as werkmap, FakeOpenRouter(latency=args.latency) as fake:
+        repo = Path.cwd()
+        os.symlink(repo / "app", Path(werkmap) / "app", target_is_directory=True)
+        os.chdir(werkmap)
+        db.DB_PATH = Path(werkmap) / "data" / "app.db"
+        db.init_db()
+
+        regels = [f"Fake OpenRouter: latency {args.latency}s, limit {args.limit}, {args.runs} runs", ""]
+        regels += meet_latency(fake, args.limit, args.runs)
+        regels += meet_cache_hits(fake, args.limit, args.requests)
+        regels += meet_normalisatie(args.normalize)
+        regels += meet_generate(fake, args.runs)
+        os.chdir(repo)
+    print("\n".join(regels))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Een lokale stand-in voor OpenRouter, om het AI-pad zonder de echte dienst te draaien.
+
+Spreekt hetzelfde OpenAI-compatibele chat-completions-protocol als OpenRouter,
+met en zonder streaming, en levert verzonnen maar geldige recepten in het schema
+dat _build_prompt vraagt. Het aantal recepten en de nadruk van een deelset
+worden uit de prompt gelezen.
+
+De lastige gevallen zijn instelbaar, want daarvoor bestaat dit:
+- latency: wachttijd voor het antwoord (bij streaming verdeeld over de stukken)
+- truncate: kapt de content af op dit deel (0-1), zoals een model dat stopt
+- malformed: content die geen geldige JSON is
+- rate_limited: zoveel eerste aanvragen krijgen een 429
+
+Gebruikt door de tests en door ai_pipeline.py. Los te starten met:
+
+    python -m bench.fake_openrouter --port 8099 --latency 2
+
+en dan OPENROUTER_URL=http://127.0.0.1:8099/api/v1/chat/completions in .env.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GERECHTEN = (
+    "stoofpot",
+    "ovenschotel",
+    "wok",
+    "salade",
+    "soep",
+    "pasta",
+    "curry",
+    "gratin",
+)
+EIWITTEN = {
+    "kip": ("kipfilet", 400, "g"),
+    "rund": ("rundergehakt", 500, "g"),
+    "vis": ("kabeljauwfilet", 400, "g"),
+    "vegetarisch": ("kikkererwten", 400, "g"),
+}
+GROENTEN = ("broccoli", "wortelen", "prei", "paprika", "courgette", "spinazie", "bloemkool")
+STREAM_STUKKEN = 24
+
+
+def verzin_recepten(aantal, focus=None, start=0):
+    """Deterministische recepten: dezelfde vraag geeft hetzelfde antwoord."""
+    eiwitten = [focus] if focus in EIWITTEN else list(EIWITTEN)
+    recepten = []
+    for index in range(start, start + int(aantal)):
+        eiwit = eiwitten[index % len(eiwitten)]
+        ingredient, hoeveelheid, eenheid = EIWITTEN[eiwit]
+        groente = GROENTEN[index % len(GROENTEN)]
+        gerecht = GERECHTEN[index % len(GERECHTEN)]
+        recepten.append(
+            {
+                "name": f"{gerecht.capitalize()} met {ingredient} en {groente} {index + 1}",
+                "description": f"Eenvoudige {gerecht} voor doordeweeks.",
+                "rating": 4,
+                "tags": [eiwit, gerecht],
+                "allergens": [],
+                "ingredients": [
+                    {"name": ingredient, "quantity": hoeveelheid, "unit": eenheid},
+                    {"name": groente, "quantity": 300, "unit": "g"},
+                    {"name": "ui", "quantity": 1, "unit": "stuk"},
+                    {"name": "olijfolie", "quantity": 2, "unit": "el"},
+                ],
+                "preparation": [
+                    f"Snij de {groente} en de ui.",
+                    f"Bak de {ingredient} in de olijfolie.",
+                    "Voeg de groenten toe en laat garen.",
+                ],
+                "protein": 38,
+                "carbs": 24,
+                "calories": 540,
+                "servings": 2,
+                "rotation_limit": "1_per_2_weeks",
+            }
+        )
+    return recepten
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenRouter/1.0"
+
+    def do_POST(self):
+        fake = self.server.fake
+        lengte = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(lengte) or b"{}")
+        except json.JSONDecodeError:
+            self._json(400, {"error": {"message": "invalid json"}})
+            return
+        if fake.neem_rate_limit():
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        prompt = str(((payload.get("messages") or [{}])[-1]).get("content") or "")
+        aantal = int((re.search(r"Genereer exact (\d+)", prompt) or [None, 4])[1])
+        focus_match = re.search(r"nadruk op gerechten met (\S+)", prompt)
+        content = fake.content_voor(aantal, focus_match.group(1) if focus_match else None)
+
+        if payload.get("stream"):
+            self._stream(content, fake.latency)
+        else:
+            time.sleep(fake.latency)
+            self._json(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, content, latency):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        stuk = max(1, -(-len(content) // STREAM_STUKKEN))
+        for start in range(0, len(content), stuk):
+            time.sleep(latency / STREAM_STUKKEN)
+            chunk = {"choices": [{"delta": {"content": content[start:start + stuk]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        if not self.server.fake.truncate:
+            self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOpenRouter:
+    """Start de server in een achtergrondthread; bruikbaar als context manager."""
+
+    def __init__(self, latency=0.0, truncate=None, malformed=False, rate_limited=0, host="127.0.0.1", port=0):
+        self.latency = float(latency)
+        self.truncate = truncate
+        self.malformed = bool(malformed)
+        self.rate_limited = int(rate_limited)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def neem_rate_limit(self):
+        with self._lock:
+            self.requests += 1
+            return self.requests <= self.rate_limited
+
+    def content_voor(self, aantal, focus=None):
+        if self.malformed:
+            return "Hier is je menu:\n[{\"name\": \"Stoofpot\", \"ingredients\": [}"
+        content = json.dumps(verzin_recepten(aantal, focus), ensure_ascii=False)
+        if self.truncate:
+            content = content[: int(len(content) * float(self.truncate))]
+        return content
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokale OpenRouter-stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconden per antwoord")
+    parser.add_argument("--truncate", type=float, default=None, help="deel van de content dat overblijft (0-1)")
+    parser.add_argument("--malformed", action="store_true", help="antwoord met ongeldige JSON")
+    parser.add_argument("--rate-limited", type=int, default=0, help="zoveel eerste aanvragen krijgen 429")
+    args = parser.parse_args()
+    fake = FakeOpenRouter(args.latency, args.truncate, args.malformed, args.rate_limited, args.host, args.port)
+    print(f"Fake OpenRouter op {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark van het ontleden van ingredientregels (app/units.py).
+
+Een import van een hele site ontleedt duizenden regels. Dit meet de doorvoer
+in regels per seconde over een mix van
+Nederlandse en Engelse regels met breuken, haakjes en regels zonder
+hoeveelheid. Geen database of netwerk nodig. Starten vanuit de root van de repo:
+
+    python -m bench.ingredient_parsing
+    python -m bench.ingredient_parsing --regels 50000 --runs 5
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app import units
+
+VOORBEELDEN = [
+    "1 kg frietaardappelen",
+    "500 g bloem",
+    "2 el olijfolie",
+    "4 kipfilets",
+    "1,5 l water",
+    "2 teentjes look, fijngehakt",
+    "3 tbsp soy sauce",
+    "4 oz butter",
+    "2 lbs (908g) cream cheese",
+    "1 ½ cups (360ml) whole milk",
+    "¾ tsp kosher salt",
+    "1 1/2 teaspoons ground cumin",
+    "peper",
+    "zout naar smaak",
+    "een handvol verse kruiden",
+    "200 gr gemalen kaas",
+    "1 blik tomatenblokjes (400 g)",
+    "2 sjalotten",
+    "1 bosje peterselie",
+    "8 ounces spaghetti",
+]
+
+
+def _regel(label, waarden):
+    return (
+        f"{label:<36} gem {statistics.mean(waarden):>10,.0f} regels/s"
+        f"  min {min(waarden):>10,.0f}  max {max(waarden):>10,.0f}"
+    )
+
+
+def meet(aantal, runs):
+    random.seed(1)
+    regels = [random.choice(VOORBEELDEN) for _ in range(aantal)]
+
+    per_regel = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for regel in regels:
+            units.ontleed_regel(regel)
+        per_regel.append(aantal / (time.perf_counter() - start))
+    return [
+        f"{aantal} ingredientregels, {runs} runs",
+        "",
+        _regel("ontleed_regel", per_regel),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Doorvoer van het ontleden van ingredientregels.")
+    parser.add_argument("--regels", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    print("\n".join(meet(args.regels, args.runs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Gunicorn-hooks. gunicorn leest dit bestand vanzelf uit de werkmap.
+
+De instellingen zelf (bind, workers, timeout) staan in de Dockerfile.
+"""
+
+
+def post_worker_init(worker):
+    # Pas in een draaiende worker: niet bij elke create_app, want die loopt ook
+    # voor elk `flask meals ...`-commando en in de tests.
+    from app.commands import herverrijk_als_regels_wijzigden
+
+    herverrijk_als_regels_wijzigden()
@@ -1,8 +1,11 @@
 import os
 from app import create_app
+from app.commands import herverrijk_als_regels_wijzigden
 
 app = create_app()
 
 if __name__ == "__main__":
     debug = os.getenv("FLASK_DEBUG", "false").lower() in {"1", "true", "yes", "on"}
+    # Onder gunicorn doet gunicorn.conf.py dit per worker.
+    herverrijk_als_regels_wijzigden()
     app.run(host="0.0.0.0", port=8000, debug=debug)
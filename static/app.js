@@ -38,6 +38,21 @@ const mealImages = {
 };
 
 const fallbackMealImage = "https://images.unsplash.com/photo-1498837167922-ddd27525d352?auto=format&fit=crop&w=600&q=80";
+
+// Eigen foto's hebben kleinere varianten in AVIF en WebP (app/pictures.py).
+// Of de browser AVIF kan, weten we pas na deze probe; tot dan WebP.
+let mealImageFormat = "webp";
+const avifProbe = new Image();
+avifProbe.onload = () => {
+  if (avifProbe.width > 0) mealImageFormat = "avif";
+};
+avifProbe.src = "data:image/avif;base64,AAAAIGZ0eXBhdmlmAAAAAGF2aWZtaWYxbWlhZk1BMUIAAADrbWV0YQAAAAAAAAAhaGRscgAAAAAAAAAAcGljdAAAAAAAAAAAAAAAAAAAAAAOcGl0bQAAAAAAAQAAAB5pbG9jAAAAAEQAAAEAAQAAAAEAAAETAAAAIgAAAChpaW5mAAAAAAABAAAAGmluZmUCAAAAAAEAAGF2MDFDb2xvcgAAAABqaXBycAAAAEtpcGNvAAAAFGlzcGUAAAAAAAAAAQAAAAEAAAAQcGl4aQAAAAADCAgIAAAADGF2MUOBAAwAAAAAE2NvbHJuY2x4AAEADQAGgAAAABdpcG1hAAAAAAAAAAEAAQQBAoMEAAAAKm1kYXQSAAoIGAAGiAhoNCAyFBlHh4Yhh5555oJAAJBBGex24O9g";
+
+// Weergavebreedte per plek, voor sizes: de browser kiest daarmee de variant.
+const MEAL_IMAGE_SIZES = {
+  card: "(max-width: 700px) 100vw, (max-width: 1100px) 50vw, 25vw",
+  thumb: "48px",
+};
 const rotationLimitLabels = {
   "1_per_week": "max 1x per week",
   "1_per_2_weeks": "max 1x per 2 weken",
@@ -252,6 +267,12 @@ async function readApiError(res, fallback) {
 
 function bindImageFallback(img, item) {
   img.addEventListener("error", () => {
+    // Eerst zonder varianten opnieuw proberen: het origineel kan er nog zijn.
+    if (img.hasAttribute("srcset")) {
+      img.removeAttribute("srcset");
+      img.removeAttribute("sizes");
+      return;
+    }
     if (img.dataset.fallbackApplied === "1") return;
     img.dataset.fallbackApplied = "1";
     const inferred = mealImageFor({ ...item, image_url: "" });
@@ -259,6 +280,16 @@ function bindImageFallback(img, item) {
   });
 }
 
+function setMealImage(img, item, sizes) {
+  img.src = mealImageFor(item);
+  const srcset = item?.image_variants?.[mealImageFormat] || item?.image_variants?.webp;
+  if (srcset) {
+    img.sizes = sizes;
+    img.srcset = srcset;
+  }
+  bindImageFallback(img, item);
+}
+
 function splitCsvText(value) {
   return (value || "")
     .split(",")
@@ -1333,9 +1364,8 @@ function renderCustomMeals() {
     link.className = "menu-card-link";
     link.href = `/meal/${encodeURIComponent(meal.id)}?person_count=${encodeURIComponent(String(getPersonCount()))}`;
     const img = document.createElement("img");
-    img.src = mealImageFor(meal);
     img.alt = meal.name;
-    bindImageFallback(img, meal);
+    setMealImage(img, meal, MEAL_IMAGE_SIZES.card);
 
     const body = document.createElement("div");
     body.className = "menu-card-body";
@@ -1564,7 +1594,9 @@ async function createCustomMeal() {
   });
 
   if (!res.ok) {
-    status.textContent = "Opslaan mislukt.";
+    status.textContent = res.status === 409
+      ? "Er bestaat al een maaltijd met deze naam."
+      : "Opslaan mislukt.";
     return;
   }
 
@@ -1610,9 +1642,10 @@ async function importRecipesFromUrl() {
     return;
   }
 
-  // Een overzichtspagina kan tot 20 recepten ophalen; dat duurt even.
+  // Een overzichtspagina kan tot 20 recepten ophalen; dat loopt als job op de
+  // server en we volgen de voortgang.
   setButtonBusy(button, true, "Bezig met importeren...");
-  status.textContent = "Bezig, dit kan een minuut duren bij meerdere recepten.";
+  status.textContent = "Bezig met ophalen...";
 
   try {
     const res = await fetch("/api/custom-meals/import", {
@@ -1620,8 +1653,18 @@ async function importRecipesFromUrl() {
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ url }),
     });
-    const data = await res.json().catch(() => ({}));
+    const started = await res.json().catch(() => ({}));
     if (!res.ok) {
+      status.textContent = started.error || "Import mislukt.";
+      return;
+    }
+
+    const data = await waitForImportJob(started.job_id, status);
+    if (!data) {
+      status.textContent = "Import mislukt: geen verbinding met de server.";
+      return;
+    }
+    if (data.status === "failed") {
       status.textContent = data.error || "Import mislukt.";
       return;
     }
@@ -1653,6 +1696,35 @@ async function importRecipesFromUrl() {
   }
 }
 
+// Volgt een importjob tot hij klaar of mislukt is. Een paar mislukte polls na
+// elkaar (even geen bereik) breken het volgen niet af: de job loopt gewoon door.
+async function waitForImportJob(jobId, status) {
+  let failures = 0;
+  while (failures < 5) {
+    await new Promise((resolve) => setTimeout(resolve, 1500));
+    let data;
+    try {
+      const res = await fetch(`/api/custom-meals/import/${encodeURIComponent(jobId)}`);
+      if (!res.ok) {
+        failures += 1;
+        continue;
+      }
+      data = await res.json();
+    } catch (err) {
+      failures += 1;
+      continue;
+    }
+    failures = 0;
+    if (data.status === "done" || data.status === "failed") return data;
+    const progress = data.progress || [];
+    const klaar = progress.filter((p) => p.status !== "wachtend").length;
+    status.textContent = progress.length
+      ? `Bezig: ${klaar} van ${progress.length} ${progress.length === 1 ? "pagina" : "pagina's"} verwerkt...`
+      : "Bezig met ophalen...";
+  }
+  return null;
+}
+
 function initCustomMealUpload() {
   const pickBtn = document.getElementById("cm-upload-btn");
   const input = document.getElementById("cm-image-file");
@@ -1698,6 +1770,7 @@ async function loadCalendar() {
       meal_name: day.meal_name,
       meal_id: day.meal_id,
       meal_image: day.meal_image,
+      image_variants: day.image_variants,
       explanation: "Geplande maaltijd.",
     }));
 
@@ -1996,9 +2069,8 @@ function renderMenuGallery() {
         card.href = `/meal/${encodeURIComponent(item.meal_id)}?date=${encodeURIComponent(formatDateEu(item.date))}&person_count=${encodeURIComponent(String(getPersonCount()))}`;
       }
       const img = document.createElement("img");
-      img.src = mealImageFor(item);
       img.alt = item.meal_name;
-      bindImageFallback(img, item);
+      setMealImage(img, item, MEAL_IMAGE_SIZES.card);
       const body = document.createElement("div");
       body.className = "menu-card-body";
       const badge = isAiGeneratedMeal(item) ? `<span class="ai-badge">✦ AI</span>` : "";
@@ -2047,10 +2119,7 @@ function renderPlan() {
         <span class="plan-arrow" aria-hidden="true">›</span>
       `;
       const img = wrapper.querySelector("img");
-      if (img) {
-        img.src = mealImageFor(item);
-        bindImageFallback(img, item);
-      }
+      if (img) setMealImage(img, item, MEAL_IMAGE_SIZES.thumb);
       li.appendChild(wrapper);
       list.appendChild(li);
     });
@@ -14,7 +14,7 @@
  * Bump CACHE_VERSION bij elke wijziging aan de gecachte assets.
  */
 
-const CACHE_VERSION = "mp-v1";
+const CACHE_VERSION = "mp-v4";
 const SHELL_CACHE = `${CACHE_VERSION}-shell`;
 const DATA_CACHE = `${CACHE_VERSION}-data`;
 
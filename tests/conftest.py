@@ -1,12 +1,15 @@
 """Gedeelde fixtures.
 
-De unit tests raken de database niet: meal_engine is puur, en de shopping-aggregatie
-wordt getest door haar twee DB-afhankelijkheden te vervangen. Zo blijven ze snel en
-onafhankelijk van data/app.db.
+De meeste unit tests raken de database niet: meal_engine is puur, en de
+shopping-aggregatie wordt getest door haar twee DB-afhankelijkheden te
+vervangen. Tests die wel een database nodig hebben, krijgen met tijdelijke_db
+een verse onder tmp_path; data/app.db blijft altijd onaangeroerd.
 """
 
 import pytest
 
+from app import db
+
 
 @pytest.fixture
 def settings():
@@ -56,3 +59,34 @@ def make_recipe():
 def week():
     """Zeven opeenvolgende kookdagen, maandag t/m zondag."""
     return [f"2026-08-{day:02d}" for day in range(3, 10)]
+
+
+@pytest.fixture
+def tijdelijke_db(tmp_path, monkeypatch):
+    """Een lege database onder tmp_path in plaats van data/app.db."""
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
+    db.init_db()
+    return db
+
+
+@pytest.fixture
+def make_meal():
+    """Factory voor een eigen maaltijd zoals de API en de import die bewaren.
+
+    Ingrediënten als (naam, hoeveelheid, eenheid); andere velden overschrijven
+    de standaardwaarden.
+    """
+
+    def _make(name, ingredients=(("ui", 1, "stuk"),), **fields):
+        meal = {
+            "name": name,
+            "tags": [],
+            "allergens": [],
+            "ingredients": [{"name": n, "quantity": q, "unit": u} for n, q, u in ingredients],
+            "preparation": ["Koken."],
+            "servings": 2,
+        }
+        meal.update(fields)
+        return meal
+
+    return _make
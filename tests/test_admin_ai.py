@@ -0,0 +1,355 @@
+"""Tests voor de AI-maaltijdcache en de fetch-coördinatie in app/admin_ai.py.
+
+Zonder netwerk: de OpenRouter-call wordt vervangen, en alles draait tegen een
+tijdelijke database zoals in test_auth.py.
+"""
+
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+
+import pytest
+
+from app import admin_ai, db
+from bench import fake_openrouter
+from bench.fake_openrouter import FakeOpenRouter
+
+
+def _items(naam, aantal=3):
+    return [{"id": f"ext_llm_{naam}_{i}", "name": f"{naam} {i}"} for i in range(aantal)]
+
+
+def test_lege_cache_geeft_niets(tijdelijke_db):
+    assert admin_ai._load_cached_items("onbekend", 10) == []
+
+
+def test_opgeslagen_items_komen_terug_per_sleutel(tijdelijke_db):
+    admin_ai._store_cached_items("a", _items("a"))
+    admin_ai._store_cached_items("b", _items("b", 5))
+    assert [item["name"] for item in admin_ai._load_cached_items("a", 10)] == ["a 0", "a 1", "a 2"]
+    assert len(admin_ai._load_cached_items("b", 2)) == 2
+
+
+def test_verlopen_items_tellen_niet_meer(tijdelijke_db):
+    db.store_ai_menu_cache("a", admin_ai.CACHE_SCHEMA_VERSION, _items("a"), 60, 10, now=1000)
+    assert db.get_ai_menu_cache("a", admin_ai.CACHE_SCHEMA_VERSION, 60, now=1059)
+    assert db.get_ai_menu_cache("a", admin_ai.CACHE_SCHEMA_VERSION, 60, now=1060) is None
+
+
+def test_andere_schemaversie_telt_niet(tijdelijke_db):
+    db.store_ai_menu_cache("a", 1, _items("a"), 60, 10, now=1000)
+    assert db.get_ai_menu_cache("a", 2, 60, now=1001) is None
+
+
+def test_minst_recent_gebruikte_sleutel_valt_eruit(tijdelijke_db):
+    versie = admin_ai.CACHE_SCHEMA_VERSION
+    db.store_ai_menu_cache("a", versie, _items("a"), 600, 2, now=1000)
+    db.store_ai_menu_cache("b", versie, _items("b"), 600, 2, now=1001)
+    # 'a' wordt gelezen en is daarmee recenter gebruikt dan 'b'.
+    assert db.get_ai_menu_cache("a", versie, 600, now=1002)
+    db.store_ai_menu_cache("c", versie, _items("c"), 600, 2, now=1003)
+
+    assert db.get_ai_menu_cache("a", versie, 600, now=1004)
+    assert db.get_ai_menu_cache("b", versie, 600, now=1004) is None
+    assert db.get_ai_menu_cache("c", versie, 600, now=1004)
+
+
+def test_schrijven_ruimt_verlopen_rijen_op(tijdelijke_db):
+    versie = admin_ai.CACHE_SCHEMA_VERSION
+    db.store_ai_menu_cache("oud", versie, _items("oud"), 60, 10, now=1000)
+    db.store_ai_menu_cache("nieuw", versie, _items("nieuw"), 60, 10, now=2000)
+    conn = db.get_conn()
+    sleutels = [row["cache_key"] for row in conn.execute("SELECT cache_key FROM ai_menu_cache")]
+    conn.close()
+    assert sleutels == ["nieuw"]
+
+
+def test_wissen_ruimt_ook_het_oude_cachebestand_op(tijdelijke_db, tmp_path, monkeypatch):
+    oud_bestand = tmp_path / "openrouter_menu_cache.json"
+    oud_bestand.write_text("{}", encoding="utf-8")
+    monkeypatch.setattr(admin_ai, "LEGACY_CACHE_PATH", oud_bestand)
+    admin_ai._store_cached_items("a", _items("a"))
+
+    admin_ai.clear_admin_ai_cache()
+
+    assert admin_ai._load_cached_items("a", 10) == []
+    assert not oud_bestand.exists()
+
+
+# --- Eén fetch per sleutel tegelijk ---
+
+
+def _antwoord(aantal):
+    return json.dumps(
+        [
+            {"name": f"Gerecht {i}", "ingredients": [{"name": f"ingredient {i}", "quantity": 1, "unit": "stuk"}]}
+            for i in range(aantal)
+        ]
+    )
+
+
+@pytest.fixture
+def geconfigureerd(tijdelijke_db, monkeypatch):
+    config = {
+        "url": "http://localhost/stub",
+        "api_token": "test",
+        "model": "stub",
+        "prompt": "",
+        "blocked_allergies": [],
+        "configured": True,
+    }
+    monkeypatch.setattr(admin_ai, "get_admin_ai_config", lambda: dict(config))
+    monkeypatch.setattr(admin_ai, "FETCH_WAIT_POLL_SECONDS", 0.01)
+    return config
+
+
+def test_gelijktijdige_aanvragen_doen_maar_een_call(geconfigureerd, monkeypatch):
+    calls = []
+
+    def trage_call(config, limit, planner_context=None, focus=None):
+        calls.append(limit)
+        time.sleep(0.3)
+        return _antwoord(limit)
+
+    monkeypatch.setattr(admin_ai, "_request_openrouter", trage_call)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resultaten = list(pool.map(lambda _: admin_ai.get_ai_menu_recipes(limit=3), range(4)))
+
+    assert len(calls) == 1
+    assert all(len(resultaat) == 3 for resultaat in resultaten)
+    assert len({tuple(r["id"] for r in resultaat) for resultaat in resultaten}) == 1
+
+
+def test_lock_wordt_vrijgegeven_na_een_fout(geconfigureerd, monkeypatch):
+    def kapotte_call(config, limit, planner_context=None, focus=None):
+        raise URLError("geen netwerk")
+
+    monkeypatch.setattr(admin_ai, "_request_openrouter", kapotte_call)
+    assert admin_ai.get_ai_menu_recipes(limit=3) == []
+
+    monkeypatch.setattr(admin_ai, "_request_openrouter", lambda config, limit, planner_context=None, focus=None: _antwoord(limit))
+    assert len(admin_ai.get_ai_menu_recipes(limit=3)) == 3
+
+
+def _fetch_sleutel(limit):
+    return admin_ai._fetch_lock_key(admin_ai._cache_key(limit, admin_ai.get_admin_ai_config()))
+
+
+def test_wachtende_haalt_zelf_op_als_de_andere_fetch_niets_bewaarde(geconfigureerd, monkeypatch):
+    """De eigenaar gaf de lock vrij zonder cache (bv. een onvolledige set): geen leeg menu."""
+    calls = []
+
+    def call(config, limit, planner_context=None, focus=None):
+        calls.append(limit)
+        return _antwoord(limit)
+
+    monkeypatch.setattr(admin_ai, "_request_openrouter", call)
+    assert db.acquire_app_lock(_fetch_sleutel(3), "andere-worker", 60)
+
+    def geef_vrij():
+        time.sleep(0.1)
+        db.release_app_lock(_fetch_sleutel(3), "andere-worker")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(geef_vrij)
+        resultaat = admin_ai.get_ai_menu_recipes(limit=3)
+
+    assert len(resultaat) == 3
+    assert calls == [3]
+
+
+def test_wachten_is_begrensd(geconfigureerd, monkeypatch):
+    monkeypatch.setattr(admin_ai, "FETCH_WAIT_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(admin_ai, "_request_openrouter", lambda *args, **kwargs: pytest.fail("geen eigen call"))
+    admin_ai._store_cached_items(admin_ai._cache_key(3, geconfigureerd), _items("a"))
+    monkeypatch.setattr(admin_ai, "_load_cached_items", _eerst_leeg(admin_ai._load_cached_items))
+    assert db.acquire_app_lock(_fetch_sleutel(3), "trage-worker", 60)
+
+    begin = time.monotonic()
+    assert [item["name"] for item in admin_ai.get_ai_menu_recipes(limit=3)] == ["a 0", "a 1", "a 2"]
+    assert time.monotonic() - begin < 1
+
+
+def _eerst_leeg(lees):
+    """Eerste cachelezing leeg, zoals bij een koude cache; daarna de echte."""
+    gelezen = []
+
+    def _lees(key, limit):
+        gelezen.append(key)
+        return lees(key, limit) if len(gelezen) > 1 else []
+
+    return _lees
+
+
+def test_lege_cache_na_de_deadline_haalt_zelf_op(geconfigureerd, monkeypatch):
+    """Lock bezet, cache leeg, deadline voorbij: geen leeg menu, maar een eigen call."""
+    calls = []
+
+    def call(config, limit, planner_context=None, focus=None):
+        calls.append(limit)
+        return _antwoord(limit)
+
+    monkeypatch.setattr(admin_ai, "FETCH_WAIT_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(admin_ai, "_request_openrouter", call)
+    assert db.acquire_app_lock(_fetch_sleutel(3), "trage-worker", 60)
+
+    assert len(admin_ai.get_ai_menu_recipes(limit=3)) == 3
+    assert calls == [3]
+    # De lock van de andere worker blijft van hem.
+    assert not db.acquire_app_lock(_fetch_sleutel(3), "derde", 60)
+
+
+def test_cache_lezen_start_geen_fetch_en_wacht_niet(geconfigureerd, monkeypatch):
+    monkeypatch.setattr(admin_ai, "_request_openrouter", lambda *args, **kwargs: pytest.fail("geen call"))
+    assert db.acquire_app_lock(_fetch_sleutel(3), "trage-worker", 60)
+
+    assert admin_ai.get_cached_ai_menu_recipes(limit=3) == []
+
+    admin_ai._store_cached_items(admin_ai._cache_key(3, geconfigureerd), _items("a"))
+    assert [item["name"] for item in admin_ai.get_cached_ai_menu_recipes(limit=3)] == ["a 0", "a 1", "a 2"]
+
+
+def test_achtergelaten_lock_wordt_overgenomen(tijdelijke_db):
+    assert db.acquire_app_lock("x", "worker-1", 60, now=1000)
+    assert not db.acquire_app_lock("x", "worker-2", 60, now=1030)
+    assert db.acquire_app_lock("x", "worker-2", 60, now=1060)
+    # De oude eigenaar mag de lock van de nieuwe niet meer vrijgeven.
+    db.release_app_lock("x", "worker-1")
+    assert db.app_lock_is_held("x", 60, now=1061)
+
+
+# --- Streaming ---
+
+
+@pytest.fixture
+def recept(make_meal):
+    """Een recept zoals het model het geeft, met tekens die de parser moet overleven."""
+    return lambda naam: make_meal(naam, [("kip", 1, "stuk")], description='met "quotes" en {haken}')
+
+
+def test_parser_geeft_objecten_zodra_ze_sluiten(recept):
+    tekst = "```json\n" + json.dumps([recept("Een"), recept("Twee")]) + "\n```"
+    parser = admin_ai._RecipeStreamParser()
+    gevonden = []
+    for i in range(0, len(tekst), 7):
+        gevonden.extend(parser.feed(tekst[i:i + 7]))
+    assert [json.loads(obj)["name"] for obj in gevonden] == ["Een", "Twee"]
+    assert parser.done
+
+
+def test_parser_laat_een_half_object_vallen(recept):
+    tekst = json.dumps([recept("Een"), recept("Twee")])
+    parser = admin_ai._RecipeStreamParser()
+    gevonden = parser.feed(tekst[: tekst.index("Twee")])
+    assert [json.loads(obj)["name"] for obj in gevonden] == ["Een"]
+    assert not parser.done
+
+
+def _sse(content, klaar=True, stuk=20):
+    regels = []
+    for i in range(0, len(content), stuk):
+        chunk = {"choices": [{"delta": {"content": content[i:i + stuk]}}]}
+        regels.append(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+    if klaar:
+        regels.append(b"data: [DONE]\n\n")
+    return io.BytesIO(b"".join(regels))
+
+
+@pytest.fixture
+def streaming(geconfigureerd, monkeypatch):
+    geconfigureerd["stream"] = True
+    return monkeypatch
+
+
+def test_streaming_levert_alle_recepten(streaming, recept):
+    inhoud = json.dumps([recept("Een"), recept("Twee"), recept("Drie")])
+    streaming.setattr(admin_ai, "verstuur", lambda method, url, headers, body, timeout: _sse(inhoud))
+    recepten = admin_ai.get_ai_menu_recipes(limit=3)
+    assert [r["name"] for r in recepten] == ["Een", "Twee", "Drie"]
+    # Een volledige set gaat in de cache.
+    assert len(admin_ai._load_cached_items(admin_ai._cache_key(3, admin_ai.get_admin_ai_config()), 3)) == 3
+
+
+def test_afgebroken_stroom_houdt_de_volledige_recepten(streaming, recept):
+    inhoud = json.dumps([recept("Een"), recept("Twee"), recept("Drie")])
+    afgekapt = inhoud[: inhoud.index("Drie")]
+    streaming.setattr(admin_ai, "verstuur", lambda method, url, headers, body, timeout: _sse(afgekapt, klaar=False))
+    recepten = admin_ai.get_ai_menu_recipes(limit=3)
+    assert [r["name"] for r in recepten] == ["Een", "Twee"]
+    # Een halve set blijft uit de cache, zodat de volgende keer opnieuw geprobeerd wordt.
+    assert admin_ai._load_cached_items(admin_ai._cache_key(3, admin_ai.get_admin_ai_config()), 3) == []
+
+
+def test_stroom_zonder_recepten_valt_terug_op_cache(streaming):
+    streaming.setattr(admin_ai, "verstuur", lambda method, url, headers, body, timeout: _sse('[{"name": "Ha', klaar=False))
+    assert admin_ai.get_ai_menu_recipes(limit=3) == []
+
+
+# --- Tegen de lokale OpenRouter-stand-in ---
+
+
+@pytest.fixture
+def fake_server(geconfigureerd):
+    """Start een FakeOpenRouter; de test stelt daarna zelf het gedrag in."""
+    with FakeOpenRouter() as fake:
+        geconfigureerd["url"] = fake.url
+        yield fake
+
+
+def test_fake_server_levert_het_gevraagde_aantal(fake_server):
+    recepten = admin_ai.get_ai_menu_recipes(limit=5)
+    assert len(recepten) == 5
+    assert fake_server.requests == 1
+
+
+def test_fake_server_429_valt_terug_op_cache(fake_server):
+    admin_ai.get_ai_menu_recipes(limit=4)
+    fake_server.rate_limited = fake_server.requests + 1
+    assert len(admin_ai.get_ai_menu_recipes(limit=4, force_refresh=True)) == 4
+
+
+def test_fake_server_ongeldige_json_geeft_niets_zonder_cache(fake_server):
+    fake_server.malformed = True
+    assert admin_ai.get_ai_menu_recipes(limit=4) == []
+
+
+def test_fake_server_afgekapte_stroom_houdt_volledige_recepten(fake_server, geconfigureerd):
+    geconfigureerd["stream"] = True
+    fake_server.truncate = 0.6
+    recepten = admin_ai.get_ai_menu_recipes(limit=6)
+    assert 0 < len(recepten) < 6
+
+
+def test_deelsets_lopen_tegelijk_en_worden_ontdubbeld(fake_server, monkeypatch, recept):
+    fake_server.latency = 0.3
+    # Elke deelset begint met hetzelfde gerecht; dat mag maar één keer overblijven.
+    echt = fake_openrouter.verzin_recepten
+    monkeypatch.setattr(
+        fake_openrouter,
+        "verzin_recepten",
+        lambda aantal, focus=None: [recept("Gedeeld gerecht")] + echt(aantal - 1, focus),
+    )
+    start = time.monotonic()
+    recepten = admin_ai.get_ai_menu_recipes(limit=12, shards=4)
+    duur = time.monotonic() - start
+
+    namen = [r["name"] for r in recepten]
+    assert namen.count("Gedeeld gerecht") == 1
+    assert len(recepten) == 1 + 4 * 2
+    assert len({r["id"] for r in recepten}) == len(recepten)
+    assert {tag for r in recepten for tag in r["tags"]} >= {"kip", "rund", "vis", "vegetarisch"}
+    # Vier deelsets van 0.3 s na elkaar zou 1.2 s duren.
+    assert duur < 4 * fake_server.latency
+
+
+def test_mislukte_deelset_laat_de_rest_staan(geconfigureerd, monkeypatch, recept):
+    def call(config, limit, planner_context=None, focus=None):
+        if focus == "vis":
+            raise URLError("time-out")
+        return json.dumps([recept(f"{focus} {i}") for i in range(limit)])
+
+    monkeypatch.setattr(admin_ai, "_request_openrouter", call)
+    recepten = admin_ai.get_ai_menu_recipes(limit=6, shards=3)
+    assert sorted(r["name"] for r in recepten) == ["kip 0", "kip 1", "rund 0", "rund 1"]
@@ -1,21 +1,12 @@
 """Tests voor de login-throttle.
 
-Deze raken wél de database, maar via een tijdelijk bestand: db.DB_PATH wordt
-omgezet naar een tmp_path zodat data/app.db ongemoeid blijft.
+Deze raken wél de database, maar via tijdelijke_db uit conftest.py: een
+bestand onder tmp_path, zodat data/app.db ongemoeid blijft.
 """
 
-import pytest
-
 from app import db
 
 
-@pytest.fixture
-def tijdelijke_db(tmp_path, monkeypatch):
-    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
-    db.init_db()
-    return db
-
-
 def test_schone_lei_telt_nul(tijdelijke_db):
     assert tijdelijke_db.count_recent_failed_logins("1.2.3.4") == 0
 
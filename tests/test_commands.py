@@ -0,0 +1,144 @@
+"""Tests voor de CLI-commando's in app/commands.py, tegen een tijdelijke database."""
+
+import pytest
+
+from app import commands, db
+
+
+EMAIL = "test@example.com"
+
+
+def _vul(make_meal, aantal):
+    for i in range(aantal):
+        db.create_custom_meal(EMAIL, make_meal(f"Pasta {i}", [("pasta", 200, "g"), ("olijfolie", 2, "el")]))
+    db.create_custom_meal(EMAIL, make_meal("Onbekend", [("sterrenstof", 1, "")]))
+    db.create_custom_meal(EMAIL, make_meal("Al ingevuld", [("pasta", 200, "g")], calories=450))
+    db.upsert_generated_ai_meals(1, [
+        {"id": "ai_a", "name": "Rijst", "servings": 2, "ingredients": [{"name": "rijst", "quantity": 150, "unit": "g"}],
+         "nutrition": {"calories": 0, "protein": 10}},
+        {"id": "ai_b", "name": "Vol", "servings": 2, "ingredients": [], "nutrition": {"calories": 600}},
+    ])
+
+
+def _kcal():
+    return {m["name"]: m["nutrition"]["calories"] for m in db.list_custom_meals(EMAIL)}
+
+
+def test_backfill_vult_aan_en_laat_bestaande_waarden_staan(tijdelijke_db, make_meal):
+    _vul(make_meal, 3)
+    stats = commands.backfill_kcal(chunk_grootte=2, workers=0)
+
+    kcal = _kcal()
+    assert kcal["Pasta 0"] == kcal["Pasta 2"] > 0
+    assert kcal["Onbekend"] == 0
+    assert kcal["Al ingevuld"] == 450
+    assert stats["custom"]["bekeken"] == 4
+    assert stats["custom"]["ingevuld"] == 3
+    assert stats["custom"]["te_weinig_dekking"] == 1
+
+    ai = {m["id"]: m["nutrition"] for m in db.list_generated_ai_meals(1)}
+    assert ai["ai_a"]["calories"] == 262 and ai["ai_a"]["protein"] == 10
+    assert ai["ai_b"]["calories"] == 600
+    assert stats["ai"] == {"bekeken": 1, "ingevuld": 1, "te_weinig_dekking": 0, "dekking": 1.0}
+    assert not db.get_app_setting(commands.BACKFILL_CHECKPOINT, {})
+
+
+def test_afgebroken_run_gaat_verder_vanaf_het_checkpoint(tijdelijke_db, monkeypatch, make_meal):
+    _vul(make_meal, 5)
+    origineel = db.set_meal_calories
+    geschreven = []
+
+    def schrijf_en_breek_af(**kwargs):
+        if len(geschreven) == 2:
+            raise KeyboardInterrupt
+        geschreven.append(kwargs)
+        origineel(**kwargs)
+
+    monkeypatch.setattr(db, "set_meal_calories", schrijf_en_breek_af)
+    with pytest.raises(KeyboardInterrupt):
+        commands.backfill_kcal(chunk_grootte=2, workers=0)
+    checkpoint = db.get_app_setting(commands.BACKFILL_CHECKPOINT, {})
+    assert checkpoint == {"custom": 4}
+
+    monkeypatch.setattr(db, "set_meal_calories", origineel)
+    stats = commands.backfill_kcal(chunk_grootte=2, workers=0)
+    assert stats["custom"]["bekeken"] == 2  # Pasta 4 en Onbekend, niet opnieuw vooraan
+    assert all(kcal > 0 for naam, kcal in _kcal().items() if naam != "Onbekend")
+
+
+def test_procespool_geeft_hetzelfde_als_in_proces(tijdelijke_db, make_meal):
+    _vul(make_meal, 4)
+    in_proces = commands._schat_chunk(db.custom_meals_without_kcal(0, 100)[0], commands.tabel_uit_database())
+    commands.backfill_kcal(chunk_grootte=2, workers=2)
+    kcal = _kcal()
+    verwacht = {f"Pasta {i}": k for i, (_, k, _) in enumerate(in_proces[:4])}
+    assert {naam: kcal[naam] for naam in verwacht} == verwacht
+
+
+# --- Retag ---
+
+
+def test_retag_vult_labels_aan_en_slaat_daarna_alles_over(tijdelijke_db, make_meal):
+    db.create_custom_meal(EMAIL, make_meal("Saté", [("pindakaas", 2, "el"), ("kipfilet", 300, "g")]))
+    db.create_custom_meal(EMAIL, make_meal("Eigen labels", [("rijst", 150, "g")], allergens=["sesam"]))
+
+    stats = commands.herverrijk(chunk_grootte=1, workers=0)
+    assert stats == {"bekeken": 2, "verouderd": 2, "gewijzigd": 2, "overgeslagen": 0}
+    maaltijden = {m["name"]: m for m in db.list_custom_meals(EMAIL)}
+    assert "pinda" in maaltijden["Saté"]["allergens"]
+    assert "kip" in maaltijden["Saté"]["tags"]
+    assert maaltijden["Eigen labels"]["allergens"] == ["sesam"]  # aangevuld, niets weggehaald
+
+    assert commands.herverrijk(workers=0) == {"bekeken": 2, "verouderd": 0, "gewijzigd": 0, "overgeslagen": 0}
+
+
+def test_nieuwe_regels_maken_alle_vingerafdrukken_verouderd(tijdelijke_db, monkeypatch, make_meal):
+    db.create_custom_meal(EMAIL, make_meal("Saté", [("pindakaas", 2, "el")]))
+    commands.herverrijk(workers=0)
+
+    from app import tagging
+
+    monkeypatch.setattr(tagging, "REGELS_VERSIE", "nieuw")
+    assert commands.herverrijk(workers=0) == {"bekeken": 1, "verouderd": 1, "gewijzigd": 0, "overgeslagen": 0}
+
+
+def test_verrijkte_maaltijd_is_na_opslaan_niet_verouderd(tijdelijke_db, make_meal):
+    from app.tagging import verrijk
+
+    db.create_custom_meal(EMAIL, verrijk(make_meal("Saté", [("pindakaas", 2, "el")])))
+    assert commands.herverrijk(workers=0)["verouderd"] == 0
+
+
+def test_retag_overschrijft_geen_maaltijd_die_intussen_bewerkt_werd(tijdelijke_db, make_meal):
+    from app.tagging import verrijk
+
+    meal_id = db.create_custom_meal(EMAIL, make_meal("Saté", [("pindakaas", 2, "el")]))
+    maaltijden, _ = db.custom_meals_for_enrichment(0, 10)
+    resultaten = commands._verrijk_chunk(maaltijden)
+
+    # Tijdens het rekenen wordt de maaltijd een sesamgerecht zonder pinda.
+    bewerkt = verrijk(make_meal("Saté", [("sesamzaad", 1, "el")], allergens=["sesam"]))
+    assert db.update_custom_meal(EMAIL, str(meal_id), bewerkt)
+
+    assert db.set_meal_enrichment(resultaten) == 0
+    assert "pinda" not in db.list_custom_meals(EMAIL)[0]["allergens"]
+
+
+def test_retag_commando_wacht_niet_op_een_lopende_retag(tijdelijke_db):
+    from click.testing import CliRunner
+    from flask import Flask
+    from flask.cli import ScriptInfo
+
+    assert db.acquire_app_lock(commands.RETAG_LOCK, "achtergrond", commands.RETAG_LOCK_STALE_SECONDS)
+    resultaat = CliRunner().invoke(commands.retag_command, [], obj=ScriptInfo(create_app=lambda: Flask(__name__)))
+
+    assert resultaat.exit_code != 0
+    assert "loopt al een retag" in resultaat.output
+
+
+def test_retag_bij_opstarten_alleen_na_gewijzigde_regels(tijdelijke_db, make_meal):
+    db.create_custom_meal(EMAIL, make_meal("Saté", [("pindakaas", 2, "el")]))
+    thread = commands.herverrijk_als_regels_wijzigden()
+    thread.join(timeout=10)
+    assert "pinda" in db.list_custom_meals(EMAIL)[0]["allergens"]
+    assert commands.herverrijk_als_regels_wijzigden() is None
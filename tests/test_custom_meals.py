@@ -0,0 +1,231 @@
+"""Tests voor het opslaan van eigen maaltijden: uniek per groep, in bulk, export en import."""
+
+import gzip
+import io
+import json
+import sqlite3
+import time
+
+import pytest
+
+from app import db
+
+
+EMAIL = "test@example.com"
+
+
+def test_bulk_slaat_dubbels_over_in_de_groep_en_in_de_reeks(tijdelijke_db, make_meal):
+    db.create_custom_meal(EMAIL, make_meal("Soep", tags=["soep"]))
+    items = [make_meal("Stoofvlees"), make_meal("soep"), make_meal("Curry"), make_meal("STOOFVLEES")]
+
+    created, duplicates = db.create_custom_meals_bulk(1, items, EMAIL)
+
+    assert created == 2
+    assert duplicates == [1, 3]
+    assert sorted(m["name"] for m in db.list_custom_meals(EMAIL)) == ["Curry", "Soep", "Stoofvlees"]
+    assert next(m for m in db.list_custom_meals(EMAIL) if m["name"] == "Soep")["tags"] == ["soep"]
+
+
+def test_dubbel_die_enkel_de_index_vangt_telt_als_dubbel(tijdelijke_db, monkeypatch, make_meal):
+    """Mist de controle vooraf een dubbel, dan weigert de index hem: geteld, en de bestaande blijft."""
+    db.create_custom_meal(EMAIL, make_meal("Soep", tags=["soep"]))
+    monkeypatch.setattr(db, "_existing_name_keys", lambda cur, gid, keys: {})
+
+    created, duplicates = db.create_custom_meals_bulk(1, [make_meal("Curry"), make_meal("SOEP", tags=["anders"])], EMAIL)
+
+    assert (created, duplicates) == (1, [1])
+    assert {m["name"]: m["tags"] for m in db.list_custom_meals(EMAIL)} == {"Curry": [], "Soep": ["soep"]}
+
+
+def test_zelfde_naam_mag_in_een_andere_groep(tijdelijke_db, make_meal):
+    db.create_custom_meals_bulk(1, [make_meal("Soep")], EMAIL)
+    assert db.create_custom_meals_bulk(2, [make_meal("Soep")], "ander@example.com") == (1, [])
+
+
+def test_losse_dubbele_naam_geeft_integrityerror(tijdelijke_db, make_meal):
+    db.create_custom_meal(EMAIL, make_meal("Soep"))
+    with pytest.raises(sqlite3.IntegrityError):
+        db.create_custom_meal(EMAIL, make_meal("SOEP"))
+
+
+def test_bestaande_dubbels_krijgen_een_volgnummer(tijdelijke_db):
+    conn = db.get_conn()
+    conn.execute("DROP INDEX idx_custom_meals_group_name")
+    for naam in ("Soep", "soep", "Soep (2)", "Soep"):
+        conn.execute("INSERT INTO custom_meals (email, group_id, name) VALUES (?, 1, ?)", (EMAIL, naam))
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+
+    namen = [m["name"] for m in sorted(db.list_custom_meals(EMAIL), key=lambda m: m["id"])]
+    assert namen == ["Soep", "soep (3)", "Soep (2)", "Soep (4)"]
+
+
+def test_vijfhonderd_maaltijden_terugzetten_is_snel(tijdelijke_db, make_meal):
+    items = [make_meal(f"Gerecht {i}") for i in range(500)]
+    start = time.perf_counter()
+    created, _ = db.create_custom_meals_bulk(1, items, EMAIL)
+    assert created == 500
+    assert time.perf_counter() - start < 1.0
+
+
+# --- Export en NDJSON-import ---
+
+
+def test_export_is_geldige_json_en_ndjson(tijdelijke_db, make_meal):
+    from app import routes
+
+    db.create_custom_meals_bulk(1, [make_meal(f"Gerecht {i}") for i in range(5)], EMAIL)
+
+    als_json = json.loads("".join(routes._export_chunks(1)))
+    assert [item["name"] for item in als_json["items"]] == [f"Gerecht {i}" for i in range(4, -1, -1)]
+
+    regels = "".join(routes._export_chunks(1, ndjson=True)).splitlines()
+    assert [json.loads(regel) for regel in regels] == als_json["items"]
+
+
+def test_lege_export_is_een_lege_lijst(tijdelijke_db):
+    from app import routes
+
+    assert json.loads("".join(routes._export_chunks(1))) == {"items": []}
+
+
+def test_export_gzip_pakt_terug_uit(tijdelijke_db, make_meal):
+    from app import routes
+
+    db.create_custom_meals_bulk(1, [make_meal("Soep")], EMAIL)
+    ingepakt = b"".join(routes._gzip_chunks(routes._export_chunks(1, ndjson=True)))
+    assert json.loads(gzip.decompress(ingepakt))["name"] == "Soep"
+
+
+def test_ndjson_import_bewaart_per_batch_en_meldt_fouten_per_regel(tijdelijke_db, monkeypatch, make_meal):
+    from app import routes
+
+    batches = []
+    echte_bulk = routes.create_custom_meals_bulk
+    monkeypatch.setattr(
+        routes, "create_custom_meals_bulk",
+        lambda gid, items, email: batches.append(len(items)) or echte_bulk(gid, items, email),
+    )
+    regels = [json.dumps(make_meal(f"Gerecht {i}")).encode() for i in range(5)]
+    regels += [b"geen json", b"", json.dumps({"name": ""}).encode(), json.dumps(make_meal("gerecht 0")).encode()]
+
+    created, errors = routes._import_ndjson(io.BytesIO(b"\n".join(regels)), 1, EMAIL, batch_size=2)
+
+    assert created == 5
+    assert batches == [2, 2, 2]
+    assert errors == [
+        {"index": 6, "error": "invalid json"},
+        {"index": 8, "error": "name is required"},
+        {"index": 9, "error": "name already exists"},
+    ]
+
+
+def test_export_en_import_geven_dezelfde_maaltijden(tijdelijke_db, make_meal):
+    from app import routes
+
+    db.create_custom_meals_bulk(1, [make_meal("Soep"), make_meal("Curry")], EMAIL)
+    export = "".join(routes._export_chunks(1, ndjson=True)).encode()
+
+    created, errors = routes._import_ndjson(io.BytesIO(export), 2, "ander@example.com")
+
+    assert (created, errors) == (2, [])
+    def _export(gid):
+        return sorted(json.loads("".join(routes._export_chunks(gid)))["items"], key=lambda item: item["name"])
+
+    assert _export(2) == _export(1)
+
+
+# --- Kindtabellen ---
+
+
+def _kindrijen(meal_id):
+    conn = db.get_conn()
+    aantallen = [
+        conn.execute(f"SELECT COUNT(*) FROM {tabel} WHERE meal_id = ?", (meal_id,)).fetchone()[0]
+        for tabel in ("meal_tags", "meal_allergens", "meal_ingredients")
+    ]
+    conn.close()
+    return aantallen
+
+
+def test_oude_json_kolommen_worden_overgezet(tijdelijke_db):
+    conn = db.get_conn()
+    conn.execute(
+        """
+        INSERT INTO custom_meals (email, group_id, name, tags_json, allergens_json, ingredients_json)
+        VALUES (?, 1, 'Oud', '["vis", "snel"]', '["vis"]', '[{"name": "kabeljauw", "quantity": 400, "unit": "g"}, "citroen"]')
+        """,
+        (EMAIL,),
+    )
+    conn.execute("INSERT INTO custom_meals (email, group_id, name, tags_json) VALUES (?, 1, 'Kapot', 'geen json')", (EMAIL,))
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+    db.init_db()  # een tweede keer verandert niets
+
+    oud = next(m for m in db.list_custom_meals(EMAIL) if m["name"] == "Oud")
+    assert oud["tags"] == ["vis", "snel"]
+    assert oud["allergens"] == ["vis"]
+    assert oud["ingredients"] == [
+        {"name": "kabeljauw", "quantity": 400.0, "unit": "g"},
+        {"name": "citroen", "quantity": 0.0, "unit": ""},
+    ]
+    assert _kindrijen(oud["id"]) == [2, 1, 2]
+    assert next(m for m in db.list_custom_meals(EMAIL) if m["name"] == "Kapot")["tags"] == []
+
+
+def test_bewerken_en_verwijderen_houden_de_kindtabellen_bij(tijdelijke_db, make_meal):
+    meal_id = db.create_custom_meal(EMAIL, make_meal("Soep", tags=["soep"], allergens=["selderij"]))
+    assert _kindrijen(meal_id) == [1, 1, 1]
+
+    db.update_custom_meal(EMAIL, meal_id, make_meal("Soep", tags=["soep", "winter"]))
+    assert db.get_custom_meal(EMAIL, meal_id)["tags"] == ["soep", "winter"]
+    assert _kindrijen(meal_id) == [2, 0, 1]
+
+    db.delete_custom_meals(EMAIL, [meal_id])
+    assert _kindrijen(meal_id) == [0, 0, 0]
+
+
+def test_bulk_schrijft_de_kindrijen_bij_de_juistemake_meal(tijdelijke_db, make_meal):
+    items = [make_meal("Soep", allergens=["selderij"]), make_meal("Curry", tags=["pittig"])]
+    db.create_custom_meals_bulk(1, items, EMAIL)
+    per_naam = {m["name"]: m for m in db.list_custom_meals(EMAIL)}
+    assert per_naam["Soep"]["allergens"] == ["selderij"]
+    assert per_naam["Curry"]["tags"] == ["pittig"]
+    assert per_naam["Curry"]["allergens"] == []
+
+
+# --- Kandidaten voor de planner ---
+
+
+def test_plannerkandidaten_filteren_gang_allergenen_en_geplande(tijdelijke_db, make_meal):
+    db.create_custom_meals_bulk(
+        1,
+        [
+            make_meal("Stoofvlees"),
+            make_meal("Notentaart", course="dessert"),
+            make_meal("Pindasaté", allergens=["pinda"]),
+            make_meal("Vol-au-vent", allergens=["gluten", "melk"]),
+            make_meal("Curry"),
+        ],
+        EMAIL,
+    )
+    ids = {m["name"]: m["id"] for m in db.list_custom_meals(EMAIL)}
+
+    kandidaten = db.list_planner_candidates(
+        1, excluded_allergens=["pinda", "Melk"], excluded_ids=[f"custom_{ids['Curry']}", "ai_123"]
+    )
+
+    assert [k["name"] for k in kandidaten] == ["Stoofvlees"]
+    assert kandidaten[0]["ingredients"] == [{"name": "ui", "quantity": 1.0, "unit": "stuk"}]
+    assert "preparation" not in kandidaten[0]
+
+
+def test_plannerkandidaten_zonder_filters_geven_alle_hoofdgerechten(tijdelijke_db, make_meal):
+    db.create_custom_meals_bulk(1, [make_meal("Soep"), make_meal("Taart", course="dessert")], EMAIL)
+    assert [k["name"] for k in db.list_planner_candidates(1)] == ["Soep"]
+    assert len(db.list_planner_candidates(1, main_only=False)) == 2
+    assert db.list_planner_candidates(2) == []
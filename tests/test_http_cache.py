@@ -0,0 +1,110 @@
+"""Tests voor de schijfcache van de receptimport (app/http_cache.py).
+
+Tegen een lokale HTTP-server op 127.0.0.1, dus zonder internet. De cache
+schrijft naar een tmp_path.
+"""
+
+import os
+import threading
+import time
+import urllib.robotparser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import http_cache, recipe_import
+
+
+class _Site(BaseHTTPRequestHandler):
+    """Eén pagina met een ETag; houdt bij welke verzoeken voorwaardelijk waren."""
+
+    etag = '"v1"'
+    body = b"<html>recept</html>"
+    verzoeken = []
+
+    def do_GET(self):
+        voorwaardelijk = self.headers.get("If-None-Match")
+        type(self).verzoeken.append(voorwaardelijk)
+        if self.path == "/zonder-validator":
+            self._stuur(200, self.body)
+        elif voorwaardelijk == self.etag:
+            self._stuur(304, b"")
+        else:
+            self._stuur(200, self.body, {"ETag": self.etag})
+
+    def _stuur(self, status, body, headers=None):
+        self.send_response(status)
+        for naam, waarde in (headers or {}).items():
+            self.send_header(naam, waarde)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "CACHE_DIR", tmp_path / "http_cache")
+    _Site.verzoeken = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_tweede_ophaling_hervalideert_en_komt_van_schijf(site):
+    assert http_cache.haal_op(f"{site}/recept") == _Site.body
+    assert http_cache.haal_op(f"{site}/recept") == _Site.body
+    assert _Site.verzoeken == [None, '"v1"']
+
+
+def test_gewijzigde_pagina_wordt_opnieuw_bewaard(site, monkeypatch):
+    http_cache.haal_op(f"{site}/recept")
+    monkeypatch.setattr(_Site, "etag", '"v2"')
+    monkeypatch.setattr(_Site, "body", b"<html>nieuw</html>")
+    assert http_cache.haal_op(f"{site}/recept") == b"<html>nieuw</html>"
+    assert http_cache.haal_op(f"{site}/recept") == b"<html>nieuw</html>"
+    assert _Site.verzoeken[-1] == '"v2"'
+
+
+def test_antwoord_zonder_validator_wordt_niet_bewaard(site):
+    http_cache.haal_op(f"{site}/zonder-validator")
+    assert http_cache._lees(f"{site}/zonder-validator") == (None, None)
+
+
+def test_cache_blijft_onder_de_limiet_en_wist_de_oudste(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "CACHE_DIR", tmp_path / "http_cache")
+    monkeypatch.setattr(http_cache, "MAX_CACHE_BYTES", 2500)
+    for naam in ("a", "b", "c"):
+        http_cache._bewaar(f"https://v.be/{naam}", b"x" * 1000, '"e"', "")
+        # mtime-resolutie: zorg voor een duidelijke volgorde.
+        meta = http_cache._paden(f"https://v.be/{naam}")[0]
+        os.utime(meta, (time.time() - {"a": 30, "b": 20, "c": 10}[naam],) * 2)
+    http_cache._ruim_op()
+
+    assert http_cache._lees("https://v.be/a") == (None, None)
+    assert http_cache._lees("https://v.be/c")[1] == b"x" * 1000
+
+
+def test_robots_worden_per_host_bewaard(monkeypatch):
+    gelezen = []
+
+    def lees(robots_url):
+        gelezen.append(robots_url)
+        parser = urllib.robotparser.RobotFileParser(robots_url)
+        parser.parse(["User-agent: *", "Disallow: /privé"])
+        return parser
+
+    monkeypatch.setattr(recipe_import, "_lees_robots", lees)
+    monkeypatch.setattr(recipe_import, "_ROBOTS_CACHE", {})
+    recipe_import._robots_voor("https://v.be/recepten/a")
+    recipe_import._robots_voor("https://v.be/recepten/b")
+    recipe_import._robots_voor("https://ander.be/recepten/a")
+    assert gelezen == ["https://v.be/robots.txt", "https://ander.be/robots.txt"]
+
+    monkeypatch.setattr(recipe_import, "ROBOTS_TTL_SECONDEN", 0)
+    recipe_import._robots_voor("https://v.be/recepten/c")
+    assert gelezen[-1] == "https://v.be/robots.txt"
@@ -0,0 +1,233 @@
+"""Tests voor de gedeelde HTTP-client (app/http_client.py).
+
+Tegen een lokale HTTP/1.1-server op 127.0.0.1, dus zonder internet.
+"""
+
+import gzip
+import threading
+import time
+import urllib.error
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import http_client
+
+PAGINA = b"<html>" + b"stoofvlees met frietjes " * 2000 + b"</html>"
+# 200 MB nullen: gecomprimeerd een paar honderd kB.
+BOM_GROOTTE = 200 * 1024 * 1024
+_bommen = {}
+
+
+def _bom(codering):
+    if codering not in _bommen:
+        nullen = bytes(BOM_GROOTTE)
+        if codering == "br":
+            _bommen[codering] = http_client.brotli.compress(nullen, quality=1)
+        else:
+            _bommen[codering] = gzip.compress(nullen, compresslevel=1)
+    return _bommen[codering]
+
+
+class _Site(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    verbindingen = set()
+    posts = []
+    via_proxy = []
+
+    def do_GET(self):
+        type(self).verbindingen.add(self.client_address)
+        if self.path.startswith("http://"):
+            # Als proxy: de volledige URL in de verzoekregel.
+            type(self).via_proxy.append((self.path, self.headers.get("Proxy-Authorization")))
+            self.path = urllib.parse.urlsplit(self.path).path
+        if self.path == "/oud":
+            self._stuur(301, b"", {"Location": "/pagina"})
+        elif self.path == "/en-sluit":
+            # Keep-alive beloofd, toch gesloten: zoals een server na zijn idle-timeout.
+            self._stuur(200, b"ok")
+            self.close_connection = True
+        elif self.path == "/weg":
+            self._stuur(404, b"niet gevonden")
+        elif self.path in ("/bom-gzip", "/bom-br"):
+            codering = self.path.removeprefix("/bom-")
+            self._stuur(200, _bom(codering), {"Content-Encoding": codering})
+        elif self.path == "/pagina":
+            codering = self.headers.get("Accept-Encoding", "")
+            if "br" in codering and http_client.brotli is not None:
+                self._stuur(200, http_client.brotli.compress(PAGINA), {"Content-Encoding": "br"})
+            elif "gzip" in codering:
+                self._stuur(200, gzip.compress(PAGINA), {"Content-Encoding": "gzip"})
+            else:
+                self._stuur(200, PAGINA)
+        else:
+            self._stuur(200, b"ok")
+
+    def do_POST(self):
+        type(self).posts.append(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/completion":
+            # Zoals een proxy die de verbinding laat vallen nadat de upstream het verzoek aannam.
+            self.close_connection = True
+        else:
+            self._stuur(200, b"ok")
+
+    def _stuur(self, status, body, headers=None):
+        self.send_response(status)
+        for naam, waarde in (headers or {}).items():
+            self.send_header(naam, waarde)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # de client stopte halfweg, zoals bij een bom
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(monkeypatch):
+    for naam in ("http_proxy", "https_proxy", "no_proxy", "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY"):
+        monkeypatch.delenv(naam, raising=False)
+    _Site.verbindingen = set()
+    _Site.posts = []
+    _Site.via_proxy = []
+    http_client.sluit_alles()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    http_client.sluit_alles()
+    server.shutdown()
+    server.server_close()
+
+
+def test_gecomprimeerde_pagina_komt_uitgepakt_terug(site):
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        assert antwoord.headers["Content-Encoding"] in ("gzip", "br")
+        assert antwoord.lees() == PAGINA
+
+
+def test_gzip_zonder_brotli(site, monkeypatch):
+    monkeypatch.setattr(http_client, "ACCEPT_ENCODING", "gzip")
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        assert antwoord.headers["Content-Encoding"] == "gzip"
+        assert antwoord.lees() == PAGINA
+
+
+def test_plafond_geldt_voor_uitgepakte_bytes(site):
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        assert antwoord.lees(max_bytes=1000) == PAGINA[:1000]
+
+
+@pytest.mark.parametrize("codering", ["gzip", "br"])
+def test_plafond_stopt_het_uitpakken_van_een_bom(site, monkeypatch, codering):
+    if codering == "br" and http_client.brotli is None:
+        pytest.skip("brotli niet geinstalleerd")
+    uitgepakt = []
+    echte_uitpakker = http_client._uitpakker
+
+    def tellende_uitpakker(waarde):
+        uitpakker = echte_uitpakker(waarde)
+        echte_stukken = uitpakker.stukken
+
+        def stukken(data):
+            for blok in echte_stukken(data):
+                uitgepakt.append(len(blok))
+                yield blok
+
+        uitpakker.stukken = stukken
+        return uitpakker
+
+    monkeypatch.setattr(http_client, "_uitpakker", tellende_uitpakker)
+    with http_client.verstuur("GET", f"{site}/bom-{codering}") as antwoord:
+        assert antwoord.lees(max_bytes=100_000) == bytes(100_000)
+
+    assert sum(uitgepakt) <= 100_000 + http_client.LEESBLOK
+
+
+def test_verbinding_wordt_hergebruikt(site):
+    for _ in range(5):
+        with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+            antwoord.lees()
+    assert len(_Site.verbindingen) == 1
+
+
+def test_afgebroken_lezing_geeft_de_verbinding_niet_terug(site):
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        antwoord.lees(max_bytes=10)
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        assert antwoord.lees() == PAGINA
+    assert len(_Site.verbindingen) == 2
+
+
+def test_foutstatus_wordt_httperror(site):
+    with pytest.raises(urllib.error.HTTPError) as fout:
+        http_client.verstuur("GET", f"{site}/weg")
+    assert fout.value.code == 404
+    assert fout.value.read() == b"niet gevonden"
+
+
+def test_redirect_wordt_gevolgd(site):
+    with http_client.verstuur("GET", f"{site}/oud") as antwoord:
+        assert antwoord.url.endswith("/pagina")
+        assert antwoord.lees() == PAGINA
+
+
+def test_onbereikbare_host_wordt_urlerror():
+    with pytest.raises(urllib.error.URLError):
+        http_client.verstuur("GET", "http://127.0.0.1:1/", timeout=2)
+
+
+def test_post_wordt_na_een_weggevallen_antwoord_niet_herhaald(site):
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        antwoord.lees()
+
+    with pytest.raises(urllib.error.URLError):
+        http_client.verstuur("POST", f"{site}/completion", body=b"{}")
+
+    assert _Site.posts == ["/completion"]
+
+
+def test_door_de_server_gesloten_verbinding_wordt_niet_hergebruikt(site):
+    with http_client.verstuur("GET", f"{site}/en-sluit") as antwoord:
+        antwoord.lees()
+    time.sleep(0.2)  # de server sluit net na zijn antwoord
+
+    with http_client.verstuur("POST", f"{site}/bewaar", body=b"{}") as antwoord:
+        assert antwoord.lees() == b"ok"
+
+    assert _Site.posts == ["/bewaar"]
+
+
+def test_http_gaat_via_de_proxy_uit_de_omgeving(site, monkeypatch):
+    proxy = site.replace("http://", "http://kok:geheim@")
+    monkeypatch.setenv("http_proxy", proxy)
+
+    with http_client.verstuur("GET", "http://recepten.invalid/pagina?p=2") as antwoord:
+        assert antwoord.lees() == PAGINA
+
+    assert _Site.via_proxy == [("http://recepten.invalid/pagina?p=2", "Basic a29rOmdlaGVpbQ==")]
+
+
+def test_no_proxy_gaat_rechtstreeks(site, monkeypatch):
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:1")
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+
+    with http_client.verstuur("GET", f"{site}/pagina") as antwoord:
+        assert antwoord.lees() == PAGINA
+    assert _Site.via_proxy == []
+
+
+def test_https_gaat_door_een_tunnel(monkeypatch):
+    monkeypatch.setenv("https_proxy", "http://proxy.invalid:3128")
+    monkeypatch.delenv("no_proxy", raising=False)
+    monkeypatch.delenv("NO_PROXY", raising=False)
+    sleutel = http_client._pool_sleutel(urllib.parse.urlsplit("https://openrouter.ai/api"))
+
+    verbinding, _ = http_client._neem_verbinding(sleutel, 5)
+
+    assert (verbinding.host, verbinding.port) == ("proxy.invalid", 3128)
+    assert (verbinding._tunnel_host, verbinding._tunnel_port) == ("openrouter.ai", 443)
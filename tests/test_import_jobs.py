@@ -0,0 +1,108 @@
+"""Tests voor de importjobs: de achtergrondimport van recepten met voortgang.
+
+Zonder netwerk: importeer_van_url wordt vervangen. De rest (job in de DB,
+opslaan van de maaltijden) draait echt, tegen een tijdelijke database.
+"""
+
+import pytest
+
+from app import db, routes
+from app.recipe_import import ImportFout
+
+
+EMAIL = "test@example.com"
+
+
+def test_nieuwe_job_staat_in_de_wachtrij(tijdelijke_db):
+    job_id = db.create_import_job(EMAIL, 1, "https://voorbeeld.be/recepten")
+    job = db.get_import_job(job_id, 1)
+    assert job["status"] == "queued"
+    assert job["progress"] == [] and job["errors"] == []
+
+
+def test_job_is_alleen_zichtbaar_in_de_eigen_groep(tijdelijke_db):
+    job_id = db.create_import_job(EMAIL, 1, "https://voorbeeld.be/recepten")
+    assert db.get_import_job(job_id, 2) is None
+
+
+def test_onbekende_status_wordt_geweigerd(tijdelijke_db):
+    job_id = db.create_import_job(EMAIL, 1, "https://voorbeeld.be/recepten")
+    with pytest.raises(ValueError):
+        db.update_import_job(job_id, status="half")
+
+
+def test_stilgevallen_job_wordt_als_mislukt_getoond(tijdelijke_db):
+    job_id = db.create_import_job(EMAIL, 1, "https://voorbeeld.be/recepten")
+    db.update_import_job(job_id, status="running")
+    conn = db.get_conn()
+    conn.execute("UPDATE import_jobs SET updated_at = datetime('now', '-1 hour') WHERE id = ?", (job_id,))
+    conn.commit()
+    conn.close()
+
+    job = db.get_import_job(job_id, 1)
+    assert job["status"] == "failed"
+    assert "onderbroken" in job["error"]
+
+
+def test_job_slaat_op_en_meldt_voortgang_per_url(tijdelijke_db, monkeypatch, make_meal):
+    def importeer(url, limiet, voortgang=None):
+        for kandidaat in ("https://v.be/recepten/a", "https://v.be/recepten/b", "https://v.be/recepten/c"):
+            voortgang(kandidaat, "wachtend", "")
+        voortgang("https://v.be/recepten/a", "geimporteerd", "")
+        voortgang("https://v.be/recepten/b", "geimporteerd", "")
+        voortgang("https://v.be/recepten/c", "mislukt", "HTTP 404")
+        maaltijden = [make_meal("Stoofvlees", source_url="https://v.be/recepten/a"), make_meal("Soep", source_url="https://v.be/recepten/b")]
+        return maaltijden, [{"url": "https://v.be/recepten/c", "reden": "HTTP 404"}]
+
+    monkeypatch.setattr(routes, "importeer_van_url", importeer)
+    db.create_custom_meal(EMAIL, make_meal("Soep"))
+    job_id = db.create_import_job(EMAIL, 1, "https://v.be/recepten")
+
+    routes._run_import_job(job_id, EMAIL, "https://v.be/recepten", 20)
+
+    job = db.get_import_job(job_id, 1)
+    assert job["status"] == "done"
+    assert job["found"] == 2
+    assert job["created"] == 1
+    assert job["skipped"] == [{"url": "https://v.be/recepten/b", "reden": "bestaat al"}]
+    assert job["errors"] == [{"url": "https://v.be/recepten/c", "reden": "HTTP 404"}]
+    statussen = {item["url"]: item["status"] for item in job["progress"]}
+    assert statussen == {
+        "https://v.be/recepten/a": "toegevoegd",
+        "https://v.be/recepten/b": "bestaat al",
+        "https://v.be/recepten/c": "mislukt",
+    }
+    assert [m["name"] for m in db.list_custom_meals(EMAIL)].count("Stoofvlees") == 1
+
+
+def test_importfout_maakt_de_job_mislukt(tijdelijke_db, monkeypatch):
+    def importeer(url, limiet, voortgang=None):
+        raise ImportFout("De robots.txt van deze site verbiedt het ophalen van deze pagina.")
+
+    monkeypatch.setattr(routes, "importeer_van_url", importeer)
+    job_id = db.create_import_job(EMAIL, 1, "https://v.be/recepten")
+
+    routes._run_import_job(job_id, EMAIL, "https://v.be/recepten", 20)
+
+    job = db.get_import_job(job_id, 1)
+    assert job["status"] == "failed"
+    assert "robots.txt" in job["error"]
+
+
+def test_fout_bij_het_opslaan_maakt_de_job_mislukt(tijdelijke_db, monkeypatch, caplog, make_meal):
+    def importeer(url, limiet, voortgang=None):
+        return [make_meal("Stoofvlees", source_url="https://v.be/recepten/a")], []
+
+    def kapot_opslaan(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(routes, "importeer_van_url", importeer)
+    monkeypatch.setattr(routes, "create_custom_meals_bulk", kapot_opslaan)
+    job_id = db.create_import_job(EMAIL, 1, "https://v.be/recepten")
+
+    routes._run_import_job(job_id, EMAIL, "https://v.be/recepten", 20)
+
+    job = db.get_import_job(job_id, 1)
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert "database is locked" in caplog.text
@@ -0,0 +1,31 @@
+"""Tests voor app/ingredients.py: de gedeelde normalisatie van ingredientnamen."""
+
+from app import food_matching, ingredients, nutrition
+
+
+def test_elke_functie_houdt_haar_eigen_betekenis():
+    naam = "Olive oil (extra vierge), koudgeperst"
+    assert ingredients.boodschapnaam("Olive  Oil") == "olijfolie"
+    assert ingredients.opzoeknaam(naam) == "olive oil"
+    assert ingredients.matchnaam(" Chicken ") == "kip"
+
+
+def test_lege_en_vreemde_invoer():
+    for functie in (ingredients.boodschapnaam, ingredients.opzoeknaam, ingredients.matchnaam):
+        assert functie(None) == ""
+        assert functie("") == ""
+    assert ingredients.opzoeknaam(3) == ""
+
+
+def test_herhaalde_namen_komen_uit_de_cache():
+    ingredients.wis_caches()
+    for _ in range(50):
+        ingredients.opzoeknaam("Verse kipfilet, fijngesneden")
+    info = ingredients._opzoeknaam.cache_info()
+    assert info.misses == 1 and info.hits == 49
+    assert info.maxsize == ingredients.CACHE_GROOTTE
+
+
+def test_nutrition_en_food_matching_gebruiken_dezelfde_normalisatie():
+    assert nutrition.normaliseer is ingredients.opzoeknaam
+    assert food_matching.normaliseer is ingredients.matchnaam
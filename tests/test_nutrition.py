@@ -1,7 +1,12 @@
 """Tests voor app/nutrition.py: de kcal-schatting per portie."""
 
+import json
+import re
+from pathlib import Path
+
 import pytest
 
+from app import nutrition
 from app.nutrition import bereken_kcal, gram_van, kcal_per_100g, normaliseer
 
 
@@ -125,3 +130,99 @@ def test_recept_zonder_ingredienten():
     kcal, dekking = bereken_kcal({"servings": 4, "ingredients": []})
     assert kcal == 0
     assert dekking == 0.0
+
+
+# --- Index van sleutels ---
+
+
+def _langste_brute_force(tabel, tekst):
+    """De oude opzoeking: elke sleutel apart, langste wint, bij gelijkstand de eerste."""
+    beste = None
+    for sleutel in tabel:
+        patroon = rf"{re.escape(sleutel)}(?:s|en|es|je|jes|tje|tjes)?(?![a-z])"
+        if re.search(patroon, tekst) and (beste is None or len(sleutel) > len(beste)):
+            beste = sleutel
+    return beste
+
+
+def _namen():
+    recepten = json.loads(Path("app/recipes.json").read_text(encoding="utf-8"))
+    namen = {i.get("name", "") for r in recepten for i in r.get("ingredients") or []}
+    namen |= set(nutrition.KCAL_PER_100G) | set(nutrition.GRAM_PER_STUK)
+    namen |= {f"{a}{b}" for a in ("kip", "zoete ", "rode ", "bloem") for b in nutrition.GRAM_PER_STUK}
+    namen |= {"uitjes", "uien", "ruimtevaartsoep", "briochebroodjes", "uié", "rode ui-en", ""}
+    return sorted(namen)
+
+
+def test_index_geeft_dezelfde_langste_treffer_als_per_sleutel_zoeken():
+    kcal_index = nutrition._SleutelIndex(nutrition.KCAL_PER_100G)
+    gram_sleutels = [s for s, gram in nutrition.GRAM_PER_STUK.items() if gram]
+    gram_index = nutrition._SleutelIndex(gram_sleutels)
+    for naam in _namen():
+        schoon = normaliseer(naam)
+        assert kcal_index.langste(schoon) == _langste_brute_force(nutrition.KCAL_PER_100G, schoon), naam
+        assert gram_index.langste(schoon) == _langste_brute_force(gram_sleutels, schoon), naam
+
+
+def test_bij_gelijke_lengte_wint_de_eerste_sleutel():
+    tabel = {"peer": 1, "appel": 2, "kaas": 3}
+    assert nutrition._SleutelIndex(tabel).langste("kaas met peer") == "peer"
+    assert nutrition._SleutelIndex(["kaas", "peer"]).langste("kaas met peer") == "kaas"
+
+
+def test_index_wordt_hergebruikt_voor_dezelfde_tabel():
+    tabel = {"ui": 40, "prei": 31}
+    kcal_per_100g("rode uien", tabel)
+    index = nutrition._INDEXEN["kcal"][2]
+    kcal_per_100g("preitjes", tabel)
+    assert nutrition._INDEXEN["kcal"][2] is index
+    assert kcal_per_100g("preitjes", dict(tabel)) == 31
+    assert nutrition._INDEXEN["kcal"][2] is not index
+
+
+# --- Energietabel uit de database ---
+
+
+@pytest.fixture
+def energiedb(tmp_path, monkeypatch):
+    from app import db
+
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.db")
+    monkeypatch.setattr(nutrition, "_energietabel", None)
+    db.init_db()
+    db.upsert_ingredient_energy({"ui": (40, 110), "prei": (31, None)})
+    gelezen = []
+    origineel = db.list_ingredient_energy
+    monkeypatch.setattr(db, "list_ingredient_energy", lambda: gelezen.append(1) or origineel())
+    return db, gelezen
+
+
+def test_energietabel_wordt_eenmaal_gelezen(energiedb):
+    db, gelezen = energiedb
+    kcal, gram = nutrition.tabel_uit_database()
+    for _ in range(20):
+        assert nutrition.tabel_uit_database() == (kcal, gram)
+    assert len(gelezen) == 1
+    assert kcal == {"ui": 40, "prei": 31} and gram["ui"] == 110
+
+
+def test_nieuwe_versie_laadt_de_tabel_opnieuw(energiedb):
+    db, gelezen = energiedb
+    nutrition.tabel_uit_database()
+    db.upsert_ingredient_energy({"ui": (40, 110)})  # bestaat al: niets gewijzigd
+    nutrition.tabel_uit_database()
+    assert len(gelezen) == 1
+
+    db.upsert_ingredient_energy({"look": (149, 3)})
+    kcal, _ = nutrition.tabel_uit_database()
+    assert len(gelezen) == 2
+    assert kcal["look"] == 149
+
+
+def test_zoekindex_hoort_bij_de_gecachete_tabel(energiedb):
+    kcal, _ = nutrition.tabel_uit_database()
+    kcal_per_100g("rode uien", kcal)
+    index = nutrition._energietabel.indexen["kcal"]
+    kcal_per_100g("preitjes", nutrition.KCAL_PER_100G)  # andere tabel tussendoor
+    kcal_per_100g("preitjes", nutrition.tabel_uit_database()[0])
+    assert nutrition._energietabel.indexen["kcal"] is index
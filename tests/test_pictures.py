@@ -0,0 +1,114 @@
+"""Tests voor het verwerken van eigen foto's in app/pictures.py."""
+
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app import pictures
+
+
+def _jpeg(breedte, hoogte, oriëntatie=None):
+    beeld = Image.new("RGB", (breedte, hoogte), (200, 120, 40))
+    exif = Image.Exif()
+    exif[0x010F] = "Telefoon"
+    if oriëntatie:
+        exif[0x0112] = oriëntatie
+    buffer = io.BytesIO()
+    beeld.save(buffer, "JPEG", exif=exif.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture(autouse=True)
+def _leeg_geheugen(monkeypatch):
+    monkeypatch.setattr(pictures, "_gevonden", {})
+
+
+def test_upload_wordt_begrensd_rechtgezet_en_zonder_exif(tmp_path):
+    """Oriëntatie 6 is 90 graden gedraaid: 4000x3000 wordt staand 1536x2048."""
+    naam = pictures.bewaar_upload(_jpeg(4000, 3000, oriëntatie=6), tmp_path, "custom_1_abc", ".jpg")
+
+    assert naam == "custom_1_abc.jpg"
+    with Image.open(tmp_path / naam) as beeld:
+        assert beeld.size == (1536, 2048)
+        assert dict(beeld.getexif()) == {}
+
+
+def test_upload_krijgt_varianten_per_breedte_en_formaat(tmp_path):
+    pictures.bewaar_upload(_jpeg(3000, 2000), tmp_path, "custom_1_abc", ".jpg")
+
+    for breedte in pictures.BREEDTES:
+        for extensie in pictures.FORMATEN:
+            with Image.open(tmp_path / f"custom_1_abc-{breedte}.{extensie}") as beeld:
+                assert beeld.width == breedte
+                assert dict(beeld.getexif()) == {}
+
+
+def test_kleine_foto_wordt_niet_opgeblazen(tmp_path):
+    """Een foto van 500 px krijgt een variant van 320 en één van 500, niet van 1280."""
+    pictures.bewaar_upload(_jpeg(500, 400), tmp_path, "klein", ".jpg")
+
+    with Image.open(tmp_path / "klein-640.webp") as beeld:
+        assert beeld.width == 500
+    assert not (tmp_path / "klein-1280.webp").exists()
+    assert pictures.varianten("/pictures/klein.jpg", tmp_path)["webp"] == (
+        "/pictures/klein-320.webp 320w, /pictures/klein-640.webp 500w"
+    )
+
+
+def test_transparante_png_wordt_jpeg_op_wit(tmp_path):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (10, 10), (0, 0, 0, 0)).save(buffer, "PNG")
+    buffer.seek(0)
+
+    naam = pictures.bewaar_upload(buffer, tmp_path, "png", ".png")
+
+    with Image.open(tmp_path / naam) as beeld:
+        assert naam == "png.jpg"
+        assert beeld.getpixel((5, 5)) == (255, 255, 255)
+
+
+def test_geen_afbeelding_geeft_onleesbarefoto(tmp_path):
+    with pytest.raises(pictures.OnleesbareFoto):
+        pictures.bewaar_upload(io.BytesIO(b"geen foto"), tmp_path, "stuk", ".jpg")
+
+
+def test_varianten_geeft_srcsets_per_formaat(tmp_path):
+    pictures.bewaar_upload(_jpeg(3000, 2000), tmp_path, "custom_1_abc", ".jpg")
+
+    srcsets = pictures.varianten("/pictures/custom_1_abc.jpg", tmp_path)
+
+    assert srcsets["webp"] == (
+        "/pictures/custom_1_abc-320.webp 320w, /pictures/custom_1_abc-640.webp 640w, "
+        "/pictures/custom_1_abc-1280.webp 1280w"
+    )
+    assert set(srcsets) == set(pictures.FORMATEN)
+
+
+@pytest.mark.parametrize(
+    "image_url",
+    ["", None, "https://images.unsplash.com/photo.jpg", "/pictures/bestaat_niet.jpg", "/pictures/../geheim.jpg"],
+)
+def test_geen_varianten_voor_externe_of_onbekende_fotos(tmp_path, image_url):
+    assert pictures.varianten(image_url, tmp_path) is None
+
+
+def test_varianten_zonder_lijst_tellen_niet(tmp_path):
+    """Een afgebroken schrijfbeurt: de lijst komt pas als alle varianten er zijn."""
+    pictures.bewaar_upload(_jpeg(800, 600), tmp_path, "half", ".jpg")
+    (tmp_path / "half.json").unlink()
+
+    assert pictures.varianten("/pictures/half.jpg", tmp_path) is None
+    assert pictures.maak_varianten(tmp_path / "half.jpg") == len(pictures.BREEDTES) * len(pictures.FORMATEN)
+    assert pictures.varianten("/pictures/half.jpg", tmp_path)["webp"].endswith("half-1280.webp 800w")
+
+
+def test_oude_foto_krijgt_achteraf_varianten(tmp_path):
+    (tmp_path / "custom_2_oud.jpg").write_bytes(_jpeg(2000, 1500).getvalue())
+    assert pictures.varianten("/pictures/custom_2_oud.jpg", tmp_path) is None
+
+    assert pictures.maak_varianten(tmp_path / "custom_2_oud.jpg") == len(pictures.BREEDTES) * len(pictures.FORMATEN)
+    assert pictures.maak_varianten(tmp_path / "custom_2_oud.jpg") == 0
+    assert pictures.varianten("/pictures/custom_2_oud.jpg", tmp_path)["webp"].startswith("/pictures/custom_2_oud-320.webp")
@@ -4,8 +4,14 @@ Bewust zonder netwerk: alle functies die het internet raken zijn gescheiden van
 de functies die tekst omzetten, en alleen die laatste worden hier getest.
 """
 
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
+from app import recipe_import
 from app.recipe_import import (
     _dagelijksekost_stappen,
     _GEEN_RECEPT,
@@ -248,3 +254,168 @@ def test_gerecht_met_saus_blijft_hoofdgerecht(naam):
     from app.recipe_import import _classificeer_gang
 
     assert _classificeer_gang(naam) == "hoofdgerecht"
+
+
+# --- Beleefdheid per site en gelijktijdig importeren ---
+
+
+def test_sitelimiet_laat_hoogstens_twee_tegelijk_toe():
+    from app.recipe_import import _SiteLimiet
+
+    limiet = _SiteLimiet(gelijktijdig=2, interval=0.001)
+    bezig, piek = [0], [0]
+    lock = threading.Lock()
+
+    def verzoek(_):
+        with limiet.verzoek():
+            with lock:
+                bezig[0] += 1
+                piek[0] = max(piek[0], bezig[0])
+            time.sleep(0.05)
+            with lock:
+                bezig[0] -= 1
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(verzoek, range(6)))
+    assert piek[0] == 2
+
+
+def test_sitelimiet_houdt_de_crawl_delay_aan():
+    from app.recipe_import import _SiteLimiet
+
+    limiet = _SiteLimiet(gelijktijdig=2, interval=0.01)
+    limiet.stel_crawl_delay_in(0.1)
+    starts = []
+    for _ in range(3):
+        with limiet.verzoek():
+            starts.append(time.monotonic())
+    tussentijden = [b - a for a, b in zip(starts, starts[1:])]
+    assert min(tussentijden) >= 0.09
+
+
+def test_overzichtspagina_importeert_gelijktijdig_en_in_volgorde(monkeypatch):
+    from app import recipe_import
+
+    links = "".join(f'<a href="/recepten/gerecht-nummer-{i}">x</a>' for i in range(6))
+    overzicht = f"<html>{links}</html>".encode()
+
+    def haal(url):
+        with recipe_import._limiet_voor(url).verzoek():
+            time.sleep(0.2)
+        return b"recept"
+
+    def importeer(url, html=None):
+        if html is None:
+            html = recipe_import._haal_pagina(url)
+        if url.endswith("/overzicht"):
+            raise recipe_import.ImportFout("geen recept")
+        if url.endswith("-3"):
+            raise recipe_import.ImportFout("kapot")
+        return {"name": url.rsplit("/", 1)[-1], "ingredients": [{"name": "ui"}]}
+
+    monkeypatch.setattr(recipe_import, "_robots_voor", lambda url: None)
+    monkeypatch.setattr(recipe_import, "_haal_pagina", lambda url: overzicht if url.endswith("/overzicht") else haal(url))
+    monkeypatch.setattr(recipe_import, "importeer_recept", importeer)
+    monkeypatch.setattr(recipe_import, "_SITE_LIMIETEN", {"voorbeeld.be": recipe_import._SiteLimiet(2, 0.01)})
+
+    start = time.monotonic()
+    maaltijden, fouten = recipe_import.importeer_van_url("https://voorbeeld.be/overzicht")
+    duur = time.monotonic() - start
+
+    assert [m["name"] for m in maaltijden] == [f"gerecht-nummer-{i}" for i in (0, 1, 2, 4, 5)]
+    assert fouten == [{"url": "https://voorbeeld.be/recepten/gerecht-nummer-3", "reden": "kapot"}]
+    # Na elkaar zou 6 x 0.2 s duren; twee tegelijk ongeveer de helft.
+    assert duur < 4 * 0.2
+
+
+# --- JSON-LD ---
+
+
+_RECEPT_JSONLD = {
+    "@context": "https://schema.org",
+    "@graph": [
+        {"@type": "WebPage", "name": "Stoofvlees | Voorbeeld"},
+        {
+            "@type": ["Recipe", "NewsArticle"],
+            "name": "Stoofvlees met frietjes",
+            "description": "Klassiek &amp; Vlaams.",
+            "image": [{"@type": "ImageObject", "url": "https://v.be/stoofvlees.jpg"}],
+            "recipeYield": ["4", "4 personen"],
+            "recipeCategory": "Hoofdgerecht",
+            "keywords": "vlees, klassiek",
+            "recipeIngredient": ["1 kg runderstoofvlees", "2 el bloem", "33 cl <b>bruin</b> bier"],
+            "recipeInstructions": [
+                {"@type": "HowToSection", "name": "Vlees", "itemListElement": [
+                    {"@type": "HowToStep", "text": "Bak het vlees aan."},
+                    {"@type": "HowToStep", "text": "Blus met   het bier."},
+                ]},
+                {"@type": "HowToStep", "text": "Laat 3 uur sudderen."},
+            ],
+        },
+    ],
+}
+
+
+def _pagina(*blokken, extra=""):
+    scripts = "".join(
+        f'<script type="application/ld+json">{json.dumps(blok)}</script>' for blok in blokken
+    )
+    return f"<html><head><script>var x = 1;</script>{scripts}</head><body>{extra}</body></html>".encode()
+
+
+def test_jsonld_recept_in_graph_wordt_gevonden():
+    pagina = _pagina({"@type": "Organization", "name": "Voorbeeld"}, _RECEPT_JSONLD)
+    assert recipe_import._recept_uit_jsonld(pagina)["name"] == "Stoofvlees met frietjes"
+    assert recipe_import._porties_uit_jsonld(pagina) == "4"
+
+
+def test_jsonld_maaltijd_zonder_recipe_scrapers(monkeypatch):
+    def niet_nodig(*args, **kwargs):
+        raise AssertionError("recipe-scrapers had niet nodig mogen zijn")
+
+    monkeypatch.setattr("recipe_scrapers.scrape_html", niet_nodig)
+    maaltijd = recipe_import.importeer_recept("https://v.be/recepten/stoofvlees", _pagina(_RECEPT_JSONLD))
+
+    assert maaltijd["name"] == "Stoofvlees met frietjes"
+    assert maaltijd["description"] == "Klassiek & Vlaams."
+    assert maaltijd["image_url"] == "https://v.be/stoofvlees.jpg"
+    assert maaltijd["servings"] == 4
+    assert maaltijd["course"] == "hoofdgerecht"
+    assert maaltijd["preparation"] == ["Bak het vlees aan.", "Blus met het bier.", "Laat 3 uur sudderen."]
+    assert maaltijd["ingredients"][2] == {"name": "bruin bier", "quantity": 33.0, "unit": "cl"}
+
+
+def test_jsonld_tekst_wordt_maar_een_keer_ontsnapt():
+    assert recipe_import._schone_tekst("Meng &amp;lt;b&amp;gt; met <i>saus</i> &amp; room") == "Meng &lt;b&gt; met saus & room"
+
+
+def test_jsonld_geeft_hetzelfde_als_recipe_scrapers():
+    from recipe_scrapers import scrape_html
+
+    url = "https://v.be/recepten/stoofvlees"
+    # Zonder HowToSection: recipe-scrapers neemt de sectietitel als stap op, wij niet.
+    recept = {**_RECEPT_JSONLD["@graph"][1], "@context": "https://schema.org", "recipeInstructions": [
+        {"@type": "HowToStep", "text": "Bak het vlees aan."},
+        {"@type": "HowToStep", "text": "Laat 3 uur sudderen."},
+    ]}
+    pagina = _pagina(recept)
+    snel = recipe_import.importeer_recept(url, pagina)
+    traag = recipe_import._maaltijd_bouwen(
+        recipe_import._velden_uit_scraper(scrape_html(pagina, org_url=url, supported_only=False), pagina), url, pagina
+    )
+    assert snel == traag
+
+
+def test_onvolledige_jsonld_valt_terug_op_recipe_scrapers(monkeypatch):
+    zonder_stappen = {"@context": "https://schema.org", "@type": "Recipe", "name": "Soep",
+                      "recipeIngredient": ["1 ui"]}
+    gebruikt = []
+
+    def scrape_html(html, org_url):
+        gebruikt.append(org_url)
+        raise ValueError("geen recept")
+
+    monkeypatch.setattr("recipe_scrapers.scrape_html", scrape_html)
+    with pytest.raises(recipe_import.ImportFout):
+        recipe_import.importeer_recept("https://v.be/recepten/soep", _pagina(zonder_stappen))
+    assert gebruikt == ["https://v.be/recepten/soep"]
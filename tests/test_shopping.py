@@ -1,13 +1,15 @@
-"""Tests voor de boodschappenlijst-aggregatie in app/routes.py.
+"""Tests voor de boodschappenlijst-aggregatie in app/routes.py en app/shopping.py.
 
-_build_shopping_items hangt aan twee DB-functies. Die worden hier vervangen, zodat
+_build_shopping_items hangt aan twee DB-functies (planning en recepten). Die worden hier vervangen, zodat
 de aggregatie- en schaallogica geisoleerd getest wordt zonder data/app.db aan te raken.
 """
 
 import pytest
 
-from app import routes
-from app.routes import _build_shopping_items, _normalize_ingredient_name, _normalize_unit
+from app import db, routes
+from app.ingredients import boodschapnaam
+from app.routes import _build_shopping_items
+from app.shopping import boodschapvector, naar_canoniek, tel_samen, vector_json, vector_uit_json
 
 
 # --- Unitnormalisatie ---
@@ -24,16 +26,27 @@ from app.routes import _build_shopping_items, _normalize_ingredient_name, _norma
         (1, "l", (1000.0, "ml")),
         (1, "liter", (1000.0, "ml")),
         (2, "stuks", (2.0, "stuk")),
-        (3, "el", (3.0, "eetlepel")),
-        (1, "tbsp", (1.0, "eetlepel")),
-        (2, "tl", (2.0, "theelepel")),
+        (3, "el", (45.0, "ml")),
+        (1, "tbsp", (15.0, "ml")),
+        (1, "Tbsp.", (15.0, "ml")),
+        (2, "tl", (10.0, "ml")),
+        (1, "cup", (236.588, "ml")),
         (2, "cloves", (2.0, "teentje")),
         (1, "snufje", (1.0, "snufje")),
         (1, "zak", (1.0, "zak")),
+        (2, "", (2.0, "stuk")),
+        (0, "", (0.0, "")),
+        (1, "Doosje", (1.0, "doosje")),
     ],
 )
-def test_normalize_unit(hoeveelheid, unit, verwacht):
-    assert _normalize_unit(hoeveelheid, unit) == verwacht
+def test_naar_canoniek(hoeveelheid, unit, verwacht):
+    assert naar_canoniek(hoeveelheid, unit) == verwacht
+
+
+@pytest.mark.parametrize("unit", ["gelei", "blaadje", "sjalot", "tegel"])
+def test_eenheid_met_een_g_of_l_erin_is_geen_gram_of_liter(unit):
+    """Regressie: de oude substringcheck las alles met een 'g' als gram."""
+    assert naar_canoniek(1, unit) == (1.0, unit)
 
 
 @pytest.mark.parametrize("unit", ["milliliter", "millilitre"])
@@ -42,7 +55,7 @@ def test_milliliter_wordt_niet_als_liter_gelezen(unit):
 
     Toen de liter-check eerst stond, werd 500 milliliter 500000 ml op de lijst.
     """
-    assert _normalize_unit(500, unit) == (500.0, "ml")
+    assert naar_canoniek(500, unit) == (500.0, "ml")
 
 
 @pytest.mark.parametrize(
@@ -58,8 +71,8 @@ def test_milliliter_wordt_niet_als_liter_gelezen(unit):
         ("onbekend ingredient", "onbekend ingredient"),
     ],
 )
-def test_normalize_ingredient_name(invoer, verwacht):
-    assert _normalize_ingredient_name(invoer) == verwacht
+def test_boodschapnaam(invoer, verwacht):
+    assert boodschapnaam(invoer) == verwacht
 
 
 # --- Aggregatie ---
@@ -73,13 +86,19 @@ def shopping_env(monkeypatch):
     """
 
     def _setup(dagen_naar_meal, recepten):
-        monkeypatch.setattr(routes, "_recipe_map_for_user", lambda email: recepten)
         monkeypatch.setattr(
             routes,
-            "get_day",
-            lambda group_id, day: (
-                {"meal_id": dagen_naar_meal[day]} if dagen_naar_meal.get(day) else None
-            ),
+            "_shopping_vectors",
+            lambda group_id, ids: {
+                mid: (r.get("servings"), boodschapvector(r.get("ingredients"))) for mid, r in recepten.items()
+            },
+        )
+        monkeypatch.setattr(
+            routes,
+            "get_days_in",
+            lambda group_id, dates: [
+                {"day_date": day, "meal_id": dagen_naar_meal[day]} for day in dates if dagen_naar_meal.get(day)
+            ],
         )
 
     return _setup
@@ -93,7 +112,7 @@ def test_zelfde_ingredient_over_meerdere_dagen_wordt_opgeteld(shopping_env):
     recept = {"id": "m1", "ingredients": [_ingredient("kipfilet", 300, "g")]}
     shopping_env({"2026-08-03": "m1", "2026-08-04": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03", "2026-08-04"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 2, 2)
 
     assert len(items) == 1
     assert items[0]["name"] == "kipfilet"
@@ -106,7 +125,7 @@ def test_hoeveelheden_schalen_met_aantal_personen(shopping_env):
     recept = {"id": "m1", "ingredients": [_ingredient("kipfilet", 300, "g")]}
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 4, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 4, 2)
 
     assert items[0]["quantity"] == 600.0
 
@@ -115,7 +134,7 @@ def test_halve_portie_schaalt_naar_beneden(shopping_env):
     recept = {"id": "m1", "ingredients": [_ingredient("kipfilet", 300, "g")]}
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 1, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 1, 2)
 
     assert items[0]["quantity"] == 150.0
 
@@ -126,7 +145,7 @@ def test_eenheden_worden_genormaliseerd_voor_het_optellen(shopping_env):
     recept_b = {"id": "m2", "ingredients": [_ingredient("aardappelen", 500, "g")]}
     shopping_env({"2026-08-03": "m1", "2026-08-04": "m2"}, {"m1": recept_a, "m2": recept_b})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03", "2026-08-04"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 2, 2)
 
     assert len(items) == 1
     assert items[0]["quantity"] == 1500.0
@@ -139,32 +158,74 @@ def test_ingredientnamen_worden_genormaliseerd_voor_het_optellen(shopping_env):
     recept_b = {"id": "m2", "ingredients": [_ingredient("kip", 100, "g")]}
     shopping_env({"2026-08-03": "m1", "2026-08-04": "m2"}, {"m1": recept_a, "m2": recept_b})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03", "2026-08-04"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 2, 2)
 
     assert len(items) == 1
     assert items[0]["name"] == "kipfilet"
     assert items[0]["quantity"] == 300.0
 
 
-def test_verschillende_eenheden_blijven_gescheiden(shopping_env):
-    """Ingredienten in stuks en in gram kunnen niet opgeteld worden."""
+def test_stuks_gaan_op_in_gram_als_het_stukgewicht_gekend_is(shopping_env):
+    """Een ui weegt 110 g (GRAM_PER_STUK): 2 stuks en 100 g is 320 g ui."""
     recept = {
         "id": "m1",
         "ingredients": [_ingredient("ui", 2, "stuk"), _ingredient("ui", 100, "g")],
     }
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
+
+    assert len(items) == 1
+    assert items[0]["quantity"] == 320.0
+    assert items[0]["unit"] == "g"
+
+
+def test_stuks_zonder_gekend_gewicht_blijven_gescheiden(shopping_env):
+    """Liever twee regels dan een verzonnen gewicht."""
+    recept = {
+        "id": "m1",
+        "ingredients": [_ingredient("drakenvrucht", 2, "stuk"), _ingredient("drakenvrucht", 100, "g")],
+    }
+    shopping_env({"2026-08-03": "m1"}, {"m1": recept})
+
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
 
     assert len(items) == 2
     assert {item["unit"] for item in items} == {"stuk", "g"}
 
 
+def test_lepels_en_milliliter_vallen_samen(shopping_env):
+    recept_a = {"id": "m1", "ingredients": [_ingredient("olijfolie", 2, "el")]}
+    recept_b = {"id": "m2", "ingredients": [_ingredient("olive oil", 30, "ml")]}
+    shopping_env({"2026-08-03": "m1", "2026-08-04": "m2"}, {"m1": recept_a, "m2": recept_b})
+
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 2, 2)
+
+    assert len(items) == 1
+    assert (items[0]["name"], items[0]["quantity"], items[0]["unit"]) == ("olijfolie", 60.0, "ml")
+
+
+def test_zonder_gram_blijven_stuks_en_volume_wat_ze_zijn():
+    """Alleen naar gram als er al gram op de lijst staat; anders niets omrekenen.
+
+    "2 stuk ui" en "1 ui" zijn allebei een aantal en vallen samen.
+    """
+    totaal = tel_samen([("ui", 2, "stuk"), ("ui", 1, ""), ("melk", 1, "l"), ("melk", 2, "dl")])
+
+    assert totaal == {("ui", "stuk"): 3.0, ("melk", "ml"): 1200.0}
+
+
+def test_teentjes_en_blikken_gaan_mee_naar_gram():
+    totaal = tel_samen([("knoflook", 2, "teentjes"), ("knoflook", 10, "g"), ("tomaten", 1, "blik"), ("tomaten", 200, "g")])
+
+    assert totaal == {("knoflook", "g"): 16.0, ("tomaten", "g"): 600.0}
+
+
 def test_dagen_zonder_maaltijd_worden_overgeslagen(shopping_env):
     recept = {"id": "m1", "ingredients": [_ingredient("kipfilet", 300, "g")]}
     shopping_env({"2026-08-03": "m1", "2026-08-04": None}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03", "2026-08-04"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 2, 2)
 
     assert items[0]["quantity"] == 300.0
 
@@ -173,7 +234,7 @@ def test_onbekend_meal_id_wordt_overgeslagen(shopping_env):
     """Een verwijderd recept mag de lijst niet laten crashen."""
     shopping_env({"2026-08-03": "verdwenen"}, {})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
 
     assert items == []
 
@@ -189,7 +250,7 @@ def test_lijst_is_alfabetisch_met_oplopende_sort_order(shopping_env):
     }
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
 
     assert [item["name"] for item in items] == ["aardappelen", "kipfilet", "ui"]
     assert [item["sort_order"] for item in items] == [0, 1, 2]
@@ -200,7 +261,7 @@ def test_recept_schaalt_vanaf_zijn_eigen_porties(shopping_env):
     recept = {"id": "m1", "servings": 4, "ingredients": [_ingredient("kipfilet", 800, "g")]}
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
 
     assert items[0]["quantity"] == 400.0
 
@@ -211,7 +272,7 @@ def test_recepten_met_verschillende_porties_naast_elkaar(shopping_env):
     voor_zes = {"id": "m2", "servings": 6, "ingredients": [_ingredient("rijst", 600, "g")]}
     shopping_env({"2026-08-03": "m1", "2026-08-04": "m2"}, {"m1": voor_twee, "m2": voor_zes})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03", "2026-08-04"], 3, 2)
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 3, 2)
 
     # m1: 100 * 3/2 = 150, m2: 600 * 3/6 = 300
     assert items[0]["quantity"] == 450.0
@@ -222,7 +283,7 @@ def test_recept_zonder_porties_valt_terug_op_base_servings(shopping_env):
     recept = {"id": "m1", "ingredients": [_ingredient("kipfilet", 300, "g")]}
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 4, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 4, 2)
 
     assert items[0]["quantity"] == 600.0
 
@@ -241,11 +302,142 @@ def test_nieuwe_items_staan_niet_afgevinkt(shopping_env):
     recept = {"id": "m1", "ingredients": [_ingredient("kipfilet", 300, "g")]}
     shopping_env({"2026-08-03": "m1"}, {"m1": recept})
 
-    items = _build_shopping_items("x@y.be", 1, ["2026-08-03"], 2, 2)
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
 
     assert all(item["checked"] is False for item in items)
 
 
+# --- Tegen een echte database ---
+
+
+def _pasta_en_rijst():
+    meal_id = db.create_custom_meal("x@y.be", {
+        "name": "Pasta", "servings": 2,
+        "ingredients": [{"name": "pasta", "quantity": 200, "unit": "g"}],
+    })
+    db.upsert_generated_ai_meals(1, [
+        {"id": "ai_a", "name": "Rijst", "servings": 2, "ingredients": [{"name": "rijst", "quantity": 150, "unit": "g"}]},
+    ])
+    return f"custom_{meal_id}"
+
+
+def _tel_verbindingen(monkeypatch):
+    verbindingen = []
+    echte_get_conn = db.get_conn
+    monkeypatch.setattr(db, "get_conn", lambda: verbindingen.append(1) or echte_get_conn())
+    return verbindingen
+
+
+def test_lijst_over_een_maand_kost_twee_verbindingen(tijdelijke_db, monkeypatch):
+    """Eén query voor de planning, één voor de bewaarde vectoren: niet per dag."""
+    pasta = _pasta_en_rijst()
+    dagen = [f"2026-08-{d:02d}" for d in range(1, 31)]
+    for i, dag in enumerate(dagen):
+        db.set_day_meal(1, dag, [pasta, "ai_a", "chicken_pasta"][i % 3])
+    verbindingen = _tel_verbindingen(monkeypatch)
+
+    items = _build_shopping_items(1, dagen, 2, 2)
+
+    assert {(i["name"], i["quantity"]) for i in items} >= {("pasta", 2000.0), ("rijst", 1500.0)}
+    assert len(verbindingen) == 2
+
+
+def test_onbekende_maaltijd_wordt_overgeslagen(tijdelijke_db):
+    pasta = _pasta_en_rijst()
+    db.set_day_meal(1, "2026-08-03", pasta)
+    db.set_day_meal(1, "2026-08-04", "verdwenen")
+
+    items = _build_shopping_items(1, ["2026-08-03", "2026-08-04"], 2, 2)
+
+    assert [(i["name"], i["quantity"]) for i in items] == [("pasta", 200.0)]
+
+
+def test_vector_wordt_bewaard_bij_het_wegschrijven(tijdelijke_db):
+    pasta = _pasta_en_rijst()
+    meal_id = int(pasta.removeprefix("custom_"))
+    custom, ai = db.get_shopping_vectors(1, [meal_id], ["ai_a"])
+
+    assert custom[meal_id][0] == 2
+    assert vector_uit_json(custom[meal_id][1]) == (None, (("pasta", "g", 200.0),))
+    assert vector_uit_json(ai["ai_a"]) == (2, (("rijst", "g", 150.0),))
+
+
+def test_wijzigen_van_het_recept_vernieuwt_de_vector(tijdelijke_db):
+    pasta = _pasta_en_rijst()
+    meal_id = int(pasta.removeprefix("custom_"))
+    db.update_custom_meal("x@y.be", meal_id, {
+        "name": "Pasta", "servings": 4,
+        "ingredients": [{"name": "pasta", "quantity": 1, "unit": "kg"}],
+    })
+    db.set_day_meal(1, "2026-08-03", pasta)
+
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
+
+    assert [(i["name"], i["quantity"]) for i in items] == [("pasta", 500.0)]
+
+
+@pytest.mark.parametrize("bewaard", ["", '{"versie": "oud", "porties": null, "regels": [["pasta", "g", 1]]}'])
+def test_ontbrekende_of_verouderde_vector_wordt_herberekend(tijdelijke_db, bewaard):
+    """Maaltijden van voor de vectoren, of na een wijziging aan de normalisatie."""
+    pasta = _pasta_en_rijst()
+    meal_id = int(pasta.removeprefix("custom_"))
+    conn = db.get_conn()
+    conn.execute("UPDATE custom_meals SET shopping_json = ?", (bewaard,))
+    conn.commit()
+    conn.close()
+    db.set_day_meal(1, "2026-08-03", pasta)
+
+    items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
+
+    assert [(i["name"], i["quantity"]) for i in items] == [("pasta", 200.0)]
+    assert db.get_shopping_vectors(1, [meal_id])[0][meal_id][1] == vector_json(
+        [{"name": "pasta", "quantity": 200, "unit": "g"}]
+    )
+
+
+def test_vector_van_een_ai_maaltijd_uit_de_menucache_wordt_onthouden(tijdelijke_db, monkeypatch):
+    """Zonder rij in generated_ai_meals is er niets om de vector in te bewaren."""
+    gelezen = []
+    recept = {"id": "ext_llm_soep_ab12_0", "servings": 2, "ingredients": [_ingredient("prei", 2, "stuks")]}
+    monkeypatch.setattr(routes, "_ai_cache_vectoren", {})
+    monkeypatch.setattr(routes, "get_cached_ai_menu_recipes", lambda limit: gelezen.append(limit) or [recept])
+    db.set_day_meal(1, "2026-08-03", recept["id"])
+
+    for _ in range(2):
+        items = _build_shopping_items(1, ["2026-08-03"], 2, 2)
+        assert [(i["name"], i["quantity"], i["unit"]) for i in items] == [("prei", 2.0, "stuk")]
+
+    assert gelezen == [24]
+
+
+def test_boodschapvector_telt_per_naam_en_eenheid_op():
+    vector = boodschapvector([
+        {"name": "Olive oil", "quantity": 2, "unit": "el"},
+        {"name": "olijfolie", "quantity": 30, "unit": "ml"},
+        {"name": "ui", "quantity": 1, "unit": ""},
+        "peper",
+    ])
+
+    assert vector == (("olijfolie", "ml", 60.0), ("ui", "stuk", 1.0), ("peper", "", 0.0))
+
+
+def test_maaltijden_van_een_andere_groep_worden_niet_gevonden(tijdelijke_db):
+    meal_id = db.create_custom_meal("x@y.be", {"name": "Pasta", "ingredients": []})
+
+    assert db.get_meals_by_ids(2, [meal_id], ["ai_a"]) == ([], [])
+    assert [m["name"] for m in db.get_meals_by_ids(1, [meal_id])[0]] == ["Pasta"]
+
+
+def test_get_days_in_geeft_alleen_geplande_dagen(tijdelijke_db):
+    db.set_day_meal(1, "2026-08-03", "m1")
+    db.set_day_meal(1, "2026-08-05", "m2")
+
+    rijen = db.get_days_in(1, ["2026-08-05", "2026-08-03", "2026-08-04", "2026-08-03"])
+
+    assert [(r["day_date"], r["meal_id"]) for r in rijen] == [("2026-08-03", "m1"), ("2026-08-05", "m2")]
+    assert db.get_days_in(1, []) == []
+
+
 # --- De planner plant alleen hoofdgerechten ---
 
 
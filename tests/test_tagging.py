@@ -144,3 +144,21 @@ def test_geen_allergenen_bij_een_schoon_recept():
 def test_bestaande_allergenen_blijven_staan():
     resultaat = bepaal_allergenen(recept("Kip", ["kipfilet"]), bestaande=["gluten"])
     assert "gluten" in resultaat
+
+
+# --- Gecompileerde regels ---
+
+
+def test_patronen_staan_in_kleine_letters():
+    """De zoekers werken zonder re.I; een hoofdletter in een patroon vindt dan nooit iets."""
+    from app import tagging
+
+    for regels in (tagging._INGREDIENT_TAGS, tagging._STIJL_TAGS, tagging._ALLERGEEN_REGELS):
+        for tag, patroon in regels:
+            assert patroon == patroon.lower(), tag
+
+
+def test_hoofdletters_in_het_recept_vinden_nog_steeds_tags():
+    r = recept("KIPFILET uit de Oven", ["Gerookte ZALM", "Volle MELK"], ["Zet in de OVEN."])
+    assert {"kip", "zalm", "oven"} <= set(bepaal_tags(r))
+    assert {"vis", "lactose"} <= set(bepaal_allergenen(r))
@@ -0,0 +1,32 @@
+"""Tests voor app/units.py: getallen lezen en omrekenen naar metrisch."""
+
+import pytest
+
+from app.units import ontleed_regel, parse_getal, tekst_naar_metriek
+
+
+@pytest.mark.parametrize(
+    "tekst,verwacht",
+    [("2", 2.0), ("1.5", 1.5), ("1,5", 1.5), ("½", 0.5), ("1½", 1.5), ("1 1/2", 1.5), ("3/4", 0.75),
+     ("⅕", 0.2), ("", None), ("een", None)],
+)
+def test_parse_getal(tekst, verwacht):
+    if verwacht is None:
+        assert parse_getal(tekst) is None
+    else:
+        assert parse_getal(tekst) == pytest.approx(verwacht)
+
+
+def test_regels_worden_metrisch():
+    assert [ontleed_regel(r) for r in ["500 g bloem", "", "4 oz butter", "peper", "1 ½ cups (360ml) milk"]] == [
+        {"name": "bloem", "quantity": 500.0, "unit": "g"},
+        None,
+        {"name": "butter", "quantity": 115.0, "unit": "g"},
+        {"name": "peper", "quantity": 0, "unit": ""},
+        {"name": "milk", "quantity": 360.0, "unit": "ml"},
+    ]
+
+
+def test_temperatuur_en_inches_in_een_stap():
+    assert tekst_naar_metriek("Preheat the oven to 450°F (232°C).") == "Preheat the oven to 232 °C."
+    assert tekst_naar_metriek("Cut into ½ inch pieces at 350 F") == "Cut into 1,3 cm pieces at 175 °C"